@@ -0,0 +1,285 @@
+# -*- coding: utf-8 -*-
+###########################################################################
+## admin_logic.py - 管理員畫面的邏輯
+## 由 app_logic.IdentityChoiceFrame 在第一次登入管理員時才匯入
+###########################################################################
+import functools
+import logging
+import wx
+from gui_admin import * # 匯入 gui_admin.py 中所有的管理員 Base 類別
+from book_importer import import_books, open_records
+from db_manager import DBManager
+from instrumentation import format_report
+from paged_cache import VirtualListModel
+
+log = logging.getLogger(__name__)
+
+# =======================================================================
+# 管理員流程類別
+# =======================================================================
+
+class AdminLoginForm(AdminLoginFormBase):
+    def __init__(self, parent):
+        AdminLoginFormBase.__init__(self, parent)
+        self.main_frame = parent
+        self.login_submit_button.Bind(wx.EVT_BUTTON, self.OnAdminLoginSubmit)
+        self.back_btn.Bind(wx.EVT_BUTTON, self.OnBackToChoice)
+    def OnBackToChoice(self, event):
+        """點擊返回鍵：回到主畫面"""
+        self.Hide()
+        # 直接顯示中央管理器 MainFrame
+        self.main_frame.Show()
+    def OnAdminLoginSubmit(self, event):
+        acc = self.account_input.GetValue()
+        pwd = self.password_input.GetValue()
+        if acc != 'admin':
+            wx.MessageBox("管理員密碼錯誤。", "錯誤")
+            return
+        # 密碼雜湊驗證刻意很慢，在背景執行，避免畫面卡住
+        self.login_submit_button.Disable()
+        self.main_frame.worker.submit(self.main_frame.db.verify_login, acc, pwd, on_done=self.OnAdminLoginResult,
+                                      on_error=self.OnAdminLoginFailed)
+
+    def OnAdminLoginResult(self, user):
+        self.login_submit_button.Enable()
+        if user:
+            self.Hide()
+            self.main_frame.GetFrame('AdminPanel', AdminPanelFrame).Show()
+        else:
+            wx.MessageBox("管理員密碼錯誤。", "錯誤")
+
+    def OnAdminLoginFailed(self, error):
+        self.login_submit_button.Enable()
+        log.error("管理員登入失敗: %s", error, exc_info=error)
+        wx.MessageBox(f"登入時發生錯誤，請稍後再試。\n({error})", "錯誤")
+
+class AdminPanelFrame(AdminPanelFrameBase):
+    def __init__(self, parent):
+        AdminPanelFrameBase.__init__(self, parent)
+        self.main_frame = parent
+        # 確保綁定新增讀者按鈕
+        self.add_reader_button.Bind(wx.EVT_BUTTON, self.OnAddReader)
+    def OnAddReader(self, event):
+        # 開啟 EditReaderForm 並傳入 None 代表「新增」模式
+        dlg = EditReaderForm(self.main_frame, None)
+        dlg.Show()
+    def OnViewReaders(self, event):
+        self.Hide()
+        self.main_frame.GetFrame('ReaderList', ReaderListFrame).Show()
+    def OnViewPerformance(self, event):
+        self.Hide()
+        self.main_frame.GetFrame('Performance', PerformanceFrame).Show()
+    def OnAddBook(self, event):
+        """從 CSV / MARC 檔案批次匯入書目 (在背景執行，進度顯示在標題列)"""
+        with wx.FileDialog(self, "選擇要匯入的書目檔案",
+                           wildcard="書目檔案 (*.csv;*.mrc)|*.csv;*.mrc|CSV (*.csv)|*.csv|MARC (*.mrc)|*.mrc",
+                           style=wx.FD_OPEN | wx.FD_FILE_MUST_EXIST) as dlg:
+            if dlg.ShowModal() != wx.ID_OK:
+                return
+            path = dlg.GetPath()
+
+        title = self.GetTitle()
+        def progress(count, rate):
+            # 在背景執行緒被呼叫，更新畫面要排回 UI 執行緒
+            wx.CallAfter(self.SetTitle, f"匯入中... {count} 筆 ({rate:.0f} 筆/秒)")
+        def done(count):
+            self.SetTitle(title)
+            self.add_book_button.Enable()
+            self.main_frame.RefreshSuggestions()
+            message = f"匯入完成，共 {count} 筆書目。"
+            if errors:
+                lines = "、".join(str(line) for line, _ in errors[:10]) + (" ..." if len(errors) > 10 else "")
+                message += f"\n略過 {len(errors)} 列格式錯誤的資料 (第 {lines} 行)。"
+            wx.MessageBox(message, "匯入書目")
+        def failed(error):
+            self.SetTitle(title)
+            self.add_book_button.Enable()
+            wx.MessageBox(f"匯入失敗：{error}", "錯誤")
+
+        errors = []  # 略過的列 (行號, 原因)，由背景執行緒填入，匯入完成後才讀
+        self.add_book_button.Disable()
+        self.main_frame.worker.submit(import_books, self.main_frame.db, open_records(path, errors=errors),
+                                      progress=progress,
+                                      on_done=done, on_error=failed)
+    def OnLogout(self, event):
+        self.Hide(); self.main_frame.ShowMainFrame()
+
+class ReaderListFrame(ReaderListFrameBase):
+    PAGE_SIZE = 100
+    FILTER_DELAY_MS = 250  # 停止打字多久後才送出搜尋
+
+    def __init__(self, parent):
+        ReaderListFrameBase.__init__(self, parent)
+        self.main_frame = parent
+        # 排序與搜尋條件 (都在資料庫端處理)
+        self.sort_col = 0
+        self.sort_desc = False
+        self.filter_text = ""
+        self.filter_timer = None
+        # 虛擬清單：依排序欄位 keyset 一次讀一頁，只有畫面上看得到的部分會被讀取
+        self.readers = VirtualListModel(self.reader_list_ctrl, self.main_frame.worker,
+                                        self.FetchPage(), page_size=self.PAGE_SIZE)
+        
+        self.edit_button.Bind(wx.EVT_BUTTON, self.OnEditReader)
+        # 綁定顯示事件，確保每次切換到這畫面都會刷新列表
+        self.Bind(wx.EVT_SHOW, self.OnShow)
+        self.back_button.Bind(wx.EVT_BUTTON, self.OnBackClick)
+
+    def OnShow(self, event):
+        """當視窗顯示時觸發，重新計算讀者數量 (資料等畫面要顯示時才讀取)"""
+        if event.IsShown():
+            self.RefreshReaderTable()
+        event.Skip()
+
+    def FetchPage(self):
+        """依目前的排序/搜尋條件產生分頁讀取函式"""
+        return functools.partial(self.main_frame.db.get_readers_page,
+                                 sort=DBManager.READER_SORT_COLUMNS[self.sort_col],
+                                 descending=self.sort_desc, filter_text=self.filter_text)
+
+    def RefreshReaderTable(self):
+        """在背景取得讀者總數，清除快取並重設清單筆數"""
+        fetch_page = self.FetchPage()
+        self.main_frame.worker.submit(self.main_frame.db.count_readers, self.filter_text,
+                                      on_done=lambda count: self.OnReaderCount(count, fetch_page), key='reader_list')
+
+    def OnReaderCount(self, count, fetch_page):
+        self.readers.reset(count, fetch_page)
+        self.reader_count_label.SetLabel(f"共 {count} 筆")
+        self.Layout()
+        log.debug("讀者清單共 %d 筆 (搜尋: %r)", count, self.filter_text)
+
+    def OnFilterText(self, event):
+        """打字時不馬上查詢：最後一次按鍵後 FILTER_DELAY_MS 沒有再輸入才送出"""
+        if self.filter_timer and self.filter_timer.IsRunning():
+            self.filter_timer.Stop()
+        self.filter_timer = wx.CallLater(self.FILTER_DELAY_MS, self.ApplyFilter)
+        event.Skip()
+
+    def ApplyFilter(self):
+        text = self.filter_input.GetValue().strip()
+        if text != self.filter_text:
+            self.filter_text = text
+            self.RefreshReaderTable()
+
+    def OnColumnClick(self, event):
+        """點欄位標題排序；再點一次同一欄切換遞增/遞減"""
+        col = event.GetColumn()
+        if col < 0:
+            return
+        self.sort_desc = (not self.sort_desc) if col == self.sort_col else False
+        self.sort_col = col
+        if hasattr(self.reader_list_ctrl, 'ShowSortIndicator'):
+            self.reader_list_ctrl.ShowSortIndicator(col, not self.sort_desc)
+        self.RefreshReaderTable()
+
+    def RefreshReaderRow(self, rid):
+        """只重新讀取並重畫一位讀者 (修改資料後呼叫)"""
+        self.main_frame.worker.submit(self.main_frame.db.get_reader_row, rid,
+                                      on_done=lambda row: self.OnReaderRow(rid, row))
+
+    def OnReaderRow(self, rid, row):
+        if row is None or self.readers.replace_row(lambda r: r[0] == rid, row) is None:
+            # 已經被刪除，或不在目前的快取裡：整個清單重新計算
+            self.RefreshReaderTable()
+
+    def OnBackClick(self, event):
+        """處理返回按鈕，回到管理面板"""
+        self.Hide()
+        self.main_frame.GetFrame('AdminPanel', AdminPanelFrame).Show()
+
+    def OnEditReader(self, event):
+        selected = self.reader_list_ctrl.GetFirstSelected()
+        reader = self.readers.get_row(selected) if selected != -1 else None
+        if reader:
+            # 1. 抓取該行讀者資料 (ID, 姓名, Email, 信用分)
+            # 2. 透過 MainFrame 開啟視窗，確保資源正確對接
+            # 修正點：必須明確傳入選中的 reader_data
+            edit_form = EditReaderForm(self.main_frame, reader)
+            edit_form.Show()
+        else:
+            # 💡 增加提示：如果沒選中任何一行，按鈕點擊會看起來像「沒反應」
+            wx.MessageBox("請先從列表中選擇一位讀者！", "提示")
+class PerformanceFrame(PerformanceFrameBase):
+    """每個資料庫方法的呼叫次數與延遲 (p50/p95/p99)，以及最慢的幾次呼叫；連線到服務時顯示服務端的統計"""
+
+    def __init__(self, parent):
+        PerformanceFrameBase.__init__(self, parent)
+        self.main_frame = parent
+        self.Bind(wx.EVT_SHOW, self.OnShow)
+
+    def OnShow(self, event):
+        if event.IsShown():
+            self.OnRefresh(None)
+        event.Skip()
+
+    def OnRefresh(self, event):
+        self.main_frame.worker.submit(self.main_frame.db.perf_stats, on_done=self.ShowReport, key='perf_stats')
+
+    def ShowReport(self, result):
+        stats, slowest = result
+        self.report_text.SetValue(format_report(stats, slowest) if stats else "目前還沒有任何資料庫呼叫紀錄。")
+
+    def OnBackClick(self, event):
+        self.Hide()
+        self.main_frame.GetFrame('AdminPanel', AdminPanelFrame).Show()
+
+class EditReaderForm(EditReaderFormBase):
+    def __init__(self, parent, reader_data=None):
+        EditReaderFormBase.__init__(self, parent)
+        self.main_frame = parent
+        self.reader_id = None
+        
+        self.complete_button.Bind(wx.EVT_BUTTON, self.OnComplete)
+        self.cancel_button.Bind(wx.EVT_BUTTON, self.OnCancel)
+        
+        # 判斷是修改還是新增
+        if reader_data:
+            self.SetTitle("修改讀者資料")
+            self.reader_id = reader_data[0]
+            self.reader_name_input.SetValue(str(reader_data[1]))
+            # 讀者編號欄位叫 reader_id_input
+            self.reader_id_input.SetValue(str(reader_data[0]))
+            self.reader_id_input.SetEditable(False) # ID 通常不給改
+            self.email_input.SetValue(str(reader_data[2]))
+            self.credit_score_input.SetValue(str(reader_data[3]))
+        else:
+            self.SetTitle("新增讀者資料")
+
+    def OnComplete(self, event): 
+        # 1. 取得畫面上的最新輸入值
+        name = self.reader_name_input.GetValue()
+        email = self.email_input.GetValue()
+        credit = self.credit_score_input.GetValue()
+        rid = self.reader_id_input.GetValue()
+
+        # 2. 真正呼叫資料庫 (修正 image_fa66a5.png 只有註解的問題)
+        db = self.main_frame.db
+        if self.reader_id:
+            self.main_frame.worker.submit(db.update_reader_info, rid, name, email, credit, on_done=self.OnSaved)
+        else:
+            self.main_frame.worker.submit(db.add_reader, rid, name, email, credit, on_done=self.OnSaved)
+
+    def OnSaved(self, success):
+        # 3. 處理結果並刷新列表
+        if success:
+            wx.MessageBox("資料儲存成功！", "成功")
+            # 💡 這裡加入刷新列表的程式碼
+            reader_list = self.main_frame.frames.get('ReaderList')
+            if reader_list:
+                if self.reader_id:
+                    reader_list.RefreshReaderRow(self.reader_id)  # 修改：只更新那一列
+                else:
+                    reader_list.RefreshReaderTable()  # 新增：筆數改變，重新計算
+            self.Destroy()
+        else:
+            wx.MessageBox("資料儲存失敗，請檢查編號是否重複或縮排錯誤。", "錯誤")
+
+    def OnCancel(self, event):
+        self.Destroy()
+
+# =======================================================================
+# 備用類別：防止未定義錯誤
+# =======================================================================
+class AdminBookDetail(AdminBookDetailBase): pass
+class EditBookForm(EditBookFormBase): pass
@@ -1,51 +1,135 @@
 # -*- coding: utf-8 -*-
+import logging
+import os
 import wx
 import builtins
+from datetime import date
 builtins.__dict__['_'] = lambda s: s
 from gui import * # 匯入 gui.py 中所有的 Base 類別
-from db_manager import DBManager
+from db_manager import HOLD_DAYS, DBManager
+from db_worker import DBWorker
+from instrumentation import format_report, timings
+from paged_cache import VirtualListModel
+
+log = logging.getLogger(__name__)
 
 # =======================================================================
 # 中央管理器：MainFrame
 # =======================================================================
 class MainFrame(MainFrameBase):
+    SUGGEST_DELAY_MS = 150  # 停止打字多久後才更新搜尋建議
+    SUGGEST_LIMIT = 10
+
     def __init__(self, parent):
         MainFrameBase.__init__(self, parent)
-        self.db = DBManager()
+        # 設定 LIBRARY_SERVICE_URL 時當 library_service 的用戶端 (多個櫃台共用)，否則直接開資料庫檔案
+        service_url = os.environ.get('LIBRARY_SERVICE_URL')
+        if service_url:
+            from service_client import ServiceClient
+            self.db = ServiceClient(service_url)
+        else:
+            self.db = DBManager()
+        # 所有資料庫呼叫都透過 worker 丟到背景執行緒，結果用 wx.CallAfter 送回來
+        self.worker = DBWorker(wx.CallAfter, on_busy=self.OnBusy)
         self.current_user = None  # 儲存登入讀者的 ID
         self.frames = {}
+        # 搜尋建議：啟動後在背景讀出所有書名/作者/ISBN 建立前綴索引，建好之前不顯示建議
+        self.suggestions = None
+        self.suggestions_loading = False
+        self.suggest_timer = None
+        self.RefreshSuggestions()
 
         # 確保搜尋按鈕綁定 (假設按鈕名為 query_button，若不同請修改)
         if hasattr(self, 'query_button'):
             self.query_button.Bind(wx.EVT_BUTTON, self.OnQueryButtonClick)
+        self.Bind(wx.EVT_CLOSE, self.OnClose)
+
+    def OnClose(self, event):
+        # 關閉主視窗時取消還在排隊的資料庫工作
+        self.worker.shutdown()
+        # 這次執行的資料庫呼叫統計寫進日誌 (LIBRARY_LOG_FILE 設定時也會留在檔案裡)
+        stats = timings.snapshot()
+        if stats:
+            log.info("本次執行的資料庫呼叫統計:\n%s", format_report(stats, timings.slowest()))
+        # LIBRARY_PROFILE_SQL 開啟時另外列出每個 SQL 的統計與查詢計畫 (連線到服務時沒有 profiler)
+        profiler = getattr(self.db, 'profiler', None)
+        if profiler is not None:
+            log.info("本次執行的 SQL 統計:\n%s", profiler.report())
+        event.Skip()
 
     def ShowMainFrame(self):
         self.Show(True)
 
+    def OnBusy(self, busy):
+        """背景查詢進行中時顯示忙碌游標"""
+        if busy:
+            wx.BeginBusyCursor()
+        elif wx.IsBusy():
+            wx.EndBusyCursor()
+
     def GetFrame(self, name, FrameClass):
         if name not in self.frames or self.frames[name] is None:
             self.frames[name] = FrameClass(self)
         return self.frames[name]
 
+    # --- 搜尋建議 ---
+    def RefreshSuggestions(self):
+        """在背景 (重新) 建立搜尋建議索引；建立期間繼續使用舊的索引"""
+        if self.suggestions_loading:
+            return
+        self.suggestions_loading = True
+        self.worker.submit(self.db.load_suggest_index, on_done=self.OnSuggestionsReady,
+                           on_error=self.OnSuggestionsFailed, busy=False)
+
+    def OnSuggestionsReady(self, index):
+        self.suggestions_loading = False
+        self.suggestions = index
+
+    def OnSuggestionsFailed(self, error):
+        self.suggestions_loading = False
+        log.error("建立搜尋建議失敗: %s", error, exc_info=error)
+
+    def OnSearchText(self, event):
+        """打字時不必每個字都更新：最後一次按鍵後 SUGGEST_DELAY_MS 沒有再輸入才查建議"""
+        if self.suggest_timer and self.suggest_timer.IsRunning():
+            self.suggest_timer.Stop()
+        self.suggest_timer = wx.CallLater(self.SUGGEST_DELAY_MS, self.ShowSuggestions)
+        event.Skip()
+
+    def ShowSuggestions(self):
+        index = self.suggestions
+        if index is None:
+            return
+        # 匯入過書目：先用舊索引回應，背景重建好之後自動換上新的
+        if index.version != self.db.catalogue_version:
+            self.RefreshSuggestions()
+        # 記憶體內的二分搜尋只要幾微秒，直接在 UI 執行緒上做
+        self.book_search_input.AutoComplete(index.suggest(self.book_search_input.GetValue(), self.SUGGEST_LIMIT))
+
     # --- 搜尋書籍功能 ---
     def OnQueryButtonClick(self, event):
         query = self.book_search_input.GetValue().strip()
         if not query:
             wx.MessageBox("請輸入書名關鍵字再進行查詢！", "提示")
             return
-        print(f"🔍 正在搜尋書籍: {query}")
-        
-        book = self.db.get_book_by_title(query)
-        if book:
-            print(f"✅ 找到書籍: {book}")
+        log.debug("搜尋書籍: %s", query)
+
+        self.GetFrame('QueryBook', QueryBookFrame).Search(query, on_done=self.OnSearchDone)
+
+    def OnSearchDone(self, query, total):
+        if total:
+            log.debug("找到 %d 本書籍", total)
             self.Hide()
-            detail = self.GetFrame('BookDetail', BookDetailFrame)
-            detail.UpdateInfo(book) # 將資料庫數據傳入詳情頁
-            detail.Show()
+            self.frames['QueryBook'].Show()
         else:
-            print("❌ 找不到該書籍")
+            log.debug("找不到書籍: %s", query)
             wx.MessageBox(f"找不到關於 '{query}' 的書籍。\n請試試搜尋: Python", "查無此書")
 
+    def ShowBookDetail(self, book):
+        detail = self.GetFrame('BookDetail', BookDetailFrame)
+        detail.UpdateInfo(book) # 將資料庫數據傳入詳情頁
+        detail.Show()
+
     def OnLoginButtonClick(self, event):
         self.Hide()
         self.GetFrame('IdentityChoice', IdentityChoiceFrame).Show()
@@ -57,6 +141,61 @@ class MainFrame(MainFrameBase):
         self.Hide()
         self.GetFrame('BorrowRecord', BorrowRecordFrame).Show()
 
+# =======================================================================
+# 書籍查詢結果
+# =======================================================================
+class QueryBookFrame(QueryBookFrameBase):
+    PAGE_SIZE = 50
+
+    def __init__(self, parent):
+        QueryBookFrameBase.__init__(self, parent)
+        self.main_frame = parent
+        self.query = ""
+        # 清單是虛擬模式：只記錄筆數，真正的資料捲到哪裡才讀到哪裡
+        self.results = VirtualListModel(self.result_list_ctrl, self.main_frame.worker,
+                                        self.FetchPage, page_size=self.PAGE_SIZE)
+
+    def Search(self, query, on_done=None):
+        """
+        在背景計算符合的筆數 (只算筆數，不讀取資料)，完成後呼叫 on_done(query, total)
+        連續查詢時，只有最後一次的結果會送回來
+        """
+        def done(total):
+            self.query = query
+            self.m_textCtrl2.SetValue(query)
+            self.results.reset(total)
+            self.m_staticText13.SetLabel(f"「{query}」共找到 {total} 本書籍")
+            if on_done:
+                on_done(query, total)
+        self.main_frame.worker.submit(self.main_frame.db.count_books, query, on_done=done, key='search')
+
+    def FetchPage(self, after_key, limit):
+        """
+        row 內容格式: (BookID, Title, Author, ISBN, Available)，剛好對應清單的 5 個欄位
+        """
+        return self.main_frame.db.search_books_after(self.query, after_key, limit)
+
+    def OnResultActivated(self, event):
+        """雙擊某一列：開啟書籍詳情"""
+        book = self.results.get_row(event.GetIndex())
+        if book:
+            self.Hide()
+            self.main_frame.ShowBookDetail(book)
+
+    def OnReQuery(self, event):
+        query = self.m_textCtrl2.GetValue().strip()
+        if not query:
+            wx.MessageBox("請輸入書名關鍵字再進行查詢！", "提示")
+            return
+        self.Search(query, on_done=self.OnReQueryDone)
+
+    def OnReQueryDone(self, query, total):
+        if not total:
+            wx.MessageBox(f"找不到關於 '{query}' 的書籍。", "查無此書")
+
+    def OnBackToMain(self, event):
+        self.Hide(); self.main_frame.ShowMainFrame()
+
 # =======================================================================
 # 讀者流程類別
 # =======================================================================
@@ -68,6 +207,8 @@ class IdentityChoiceFrame(IdentityChoiceFrameBase):
     def OnReaderLogin(self, event):
         self.Hide(); self.main_frame.GetFrame('ReaderLogin', ReaderLoginForm).Show()
     def OnAdminLogin(self, event):
+        # 管理員畫面很少用到，第一次點選時才載入，縮短程式啟動時間
+        from admin_logic import AdminLoginForm
         self.Hide(); self.main_frame.GetFrame('AdminLogin', AdminLoginForm).Show()
     def OnClose(self, event):
         self.Hide(); self.main_frame.ShowMainFrame()
@@ -85,13 +226,26 @@ class ReaderLoginForm(ReaderLoginFormBase):
         self.Hide(); self.main_frame.GetFrame('Register', RegisterForm).Show()
     def OnLoginSubmit(self, event):
         rid = self.account_input.GetValue()
-        user = self.main_frame.db.get_reader_by_id(rid)
+        pwd = self.password_input.GetValue()
+        self.login_submit_button.Disable()
+        # 密碼雜湊驗證刻意很慢 (數十毫秒)，在背景執行
+        self.main_frame.worker.submit(self.main_frame.db.verify_login, rid, pwd,
+                                      on_done=lambda user: self.OnLoginResult(rid, user),
+                                      on_error=self.OnLoginFailed)
+
+    def OnLoginResult(self, rid, user):
+        self.login_submit_button.Enable()
         if user:
             self.main_frame.current_user = rid
             wx.MessageBox(f"登入成功！歡迎回來, {user[1]}", "提示")
             self.Hide(); self.main_frame.ShowMainFrame()
         else:
-            wx.MessageBox("帳號錯誤或不存在，請先註冊。", "登入失敗")
+            wx.MessageBox("帳號或密碼錯誤；還沒有帳號請先註冊。", "登入失敗")
+
+    def OnLoginFailed(self, error):
+        self.login_submit_button.Enable()
+        log.error("登入失敗: %s", error, exc_info=error)
+        wx.MessageBox(f"登入時發生錯誤，請稍後再試。\n({error})", "錯誤")
 
 class RegisterForm(RegisterFormBase):
     def __init__(self, parent):
@@ -101,7 +255,11 @@ class RegisterForm(RegisterFormBase):
         rid = self.account_name_input.GetValue()
         email = self.email_input.GetValue()
         pwd = self.password_input.GetValue()
-        if self.main_frame.db.register_reader(rid, rid, email, pwd):
+        self.main_frame.worker.submit(self.main_frame.db.register_reader, rid, rid, email, pwd,
+                                      on_done=lambda ok: self.OnRegisterResult(rid, ok))
+
+    def OnRegisterResult(self, rid, ok):
+        if ok:
             wx.MessageBox(f"註冊成功！您的 ID 為: {rid}", "提示")
             self.Hide(); self.main_frame.ShowMainFrame()
         else:
@@ -123,7 +281,7 @@ class BookDetailFrame(BookDetailFrameBase):
         索引對應:      [0]     [1]    [2]     [3]    [4]
         """
         self.current_book_data = data
-        print(f"📖 正在更新介面元件，資料: {data}")
+        log.debug("顯示書籍資料: %s", data)
 
         # --- 根據你提供的 gui.py 變數名稱進行對接 ---
         # data[1] 是 Title, data[2] 是 Author... 以此類推
@@ -160,187 +318,122 @@ class BookDetailFrame(BookDetailFrameBase):
 
         if self.current_book_data:
             book_id = self.current_book_data[0]
-            # 呼叫資料庫執行借閱
-            if self.main_frame.db.borrow_book(self.main_frame.current_user, book_id):
-                wx.MessageBox(f"《{self.current_book_data[1]}》借閱成功！", "通知")
-                self.Hide()
-                self.main_frame.ShowMainFrame()
-            else:
-                wx.MessageBox("借閱失敗：可能目前無庫存。", "提示")
-
-class BorrowRecordFrame(BorrowRecordFrameBase):
-    def __init__(self, parent):
-        BorrowRecordFrameBase.__init__(self, parent)
-        self.main_frame = parent
-        self.Bind(wx.EVT_SHOW, self.OnShow)
-
-    def OnShow(self, event):
-        if event.IsShown() and self.main_frame.current_user:
-            history = self.main_frame.db.get_borrow_history(self.main_frame.current_user)
-            if history and hasattr(self, 'm_staticText6'):
-                h = history[-1]
-                self.m_staticText6.SetLabel(f"最新紀錄: {h[0]} (借閱日: {h[1]})")
-        event.Skip()
+            # 呼叫資料庫執行借閱 (背景執行，避免按鈕連點重複借閱先停用)
+            self.borrow_button.Disable()
+            self.main_frame.worker.submit(self.main_frame.db.borrow_book, self.main_frame.current_user, book_id,
+                                          on_done=self.OnBorrowResult, on_error=self.OnBorrowFailed)
+
+    def OnBorrowResult(self, result):
+        self.borrow_button.Enable()
+        if result:
+            wx.MessageBox(f"《{self.current_book_data[1]}》借閱成功！(館藏條碼 {result.barcode})", "通知")
+            self.Hide()
+            self.main_frame.ShowMainFrame()
+        elif result.status == result.OUT_OF_STOCK:
+            wx.MessageBox(f"借閱失敗：{result.message}。\n可以按「預約」排隊，書還回來時會保留給您。", "提示")
+        else:
+            wx.MessageBox(f"借閱失敗：{result.message}。", "提示")
 
-    def OnBackClick(self, event):
-        self.Hide(); self.main_frame.ShowMainFrame()
+    def OnBorrowFailed(self, error):
+        self.borrow_button.Enable()
+        log.error("借閱失敗: %s", error, exc_info=error)
+        wx.MessageBox(f"借閱時發生錯誤，請稍後再試。\n({error})", "錯誤")
 
-# =======================================================================
-# 管理員流程類別
-# =======================================================================
+    def OnReserveClick(self, event):
+        """處理預約按鈕點擊：沒有庫存時排隊，結果顯示在預約結果視窗"""
+        if not self.main_frame.current_user:
+            wx.MessageBox("請先登入讀者帳號再進行預約！", "提示")
+            return
 
-class AdminLoginForm(AdminLoginFormBase):
-    def __init__(self, parent):
-        AdminLoginFormBase.__init__(self, parent)
-        self.main_frame = parent
-        self.login_submit_button.Bind(wx.EVT_BUTTON, self.OnAdminLoginSubmit)
-        self.back_btn.Bind(wx.EVT_BUTTON, self.OnBackToChoice)
-    def OnBackToChoice(self, event):
-        """點擊返回鍵：回到主畫面"""
-        self.Hide()
-        # 直接顯示中央管理器 MainFrame
-        self.main_frame.Show()
-    def OnAdminLoginSubmit(self, event):
-        acc = self.account_input.GetValue()
-        pwd = self.password_input.GetValue()
-        if acc == 'admin' and pwd == 'admin123':
-            self.Hide()
-            self.main_frame.GetFrame('AdminPanel', AdminPanelFrame).Show()
-        else:
-            wx.MessageBox("管理員密碼錯誤。", "錯誤")
+        if self.current_book_data:
+            self.reserve_button.Disable()
+            self.main_frame.worker.submit(self.main_frame.db.reserve_book, self.main_frame.current_user,
+                                          self.current_book_data[0], on_done=self.OnReserveResult,
+                                          on_error=self.OnReserveFailed)
+
+    def OnReserveResult(self, result):
+        self.reserve_button.Enable()
+        frame = self.main_frame.GetFrame('ReserveResult', ReserveResultFrame)
+        frame.ShowResult(self.current_book_data[1], result)
+        frame.Show()
+        frame.Raise()
+
+    def OnReserveFailed(self, error):
+        self.reserve_button.Enable()
+        log.error("預約失敗: %s", error, exc_info=error)
+        wx.MessageBox(f"預約時發生錯誤，請稍後再試。\n({error})", "錯誤")
 
-class AdminPanelFrame(AdminPanelFrameBase):
-    def __init__(self, parent):
-        AdminPanelFrameBase.__init__(self, parent)
-        self.main_frame = parent
-        # 確保綁定新增讀者按鈕
-        self.add_reader_button.Bind(wx.EVT_BUTTON, self.OnAddReader)
-    def OnAddReader(self, event):
-        # 開啟 EditReaderForm 並傳入 None 代表「新增」模式
-        dlg = EditReaderForm(self.main_frame, None)
-        dlg.Show()
-    def OnViewReaders(self, event):
-        self.Hide()
-        self.main_frame.GetFrame('ReaderList', ReaderListFrame).Show()
-    def OnLogout(self, event):
-        self.Hide(); self.main_frame.ShowMainFrame()
+class BorrowRecordFrame(BorrowRecordFrameBase):
+    PAGE_SIZE = 50
 
-class ReaderListFrame(ReaderListFrameBase):
     def __init__(self, parent):
-        ReaderListFrameBase.__init__(self, parent)
+        BorrowRecordFrameBase.__init__(self, parent)
         self.main_frame = parent
-        
-        self.edit_button.Bind(wx.EVT_BUTTON, self.OnEditReader)
-        # 綁定顯示事件，確保每次切換到這畫面都會刷新列表
+        # 借閱紀錄新的在前，捲動到哪裡才在背景讀哪一頁
+        self.history = VirtualListModel(self.history_list_ctrl, self.main_frame.worker,
+                                        self.FetchPage(None), page_size=self.PAGE_SIZE, loading_col=0)
         self.Bind(wx.EVT_SHOW, self.OnShow)
-        self.back_button.Bind(wx.EVT_BUTTON, self.OnBackClick)
 
     def OnShow(self, event):
-        """當視窗顯示時觸發，從資料庫撈取資料填入表格"""
-        if event.IsShown():
-            print("📊 管理員正在刷新讀者清單表格...")
-            self.RefreshReaderTable()
+        if event.IsShown() and self.main_frame.current_user:
+            rid = self.main_frame.current_user
+            db = self.main_frame.db
+            fetch_page = self.FetchPage(rid)
+            # 只查筆數、最新一筆與借閱中本數 (連線到服務時是一個請求)，清單內容等畫面要顯示時才分頁讀取
+            self.main_frame.worker.submit(db.get_borrow_summary, rid,
+                                          on_done=lambda result: self.ShowHistory(*result, fetch_page),
+                                          key='borrow_history')
         event.Skip()
 
-    def RefreshReaderTable(self):
-        """清除舊資料並載入資料庫中所有讀者"""
-        # 1. 先清空 ListCtrl 中的所有項目
-        self.reader_list_ctrl.DeleteAllItems()
-        
-        # 2. 從資料庫獲取所有讀者資料
-        # 資料格式: [(ID1, Name1, Email1, Credit1), (ID2, Name2, Email2, Credit2), ...]
-        readers = self.main_frame.db.get_all_readers()
-        
-        if not readers:
-            print("⚠️ 資料庫目前沒有任何讀者紀錄。")
-            return
-
-        # 3. 循環每一筆資料並填入表格
-        for i, r in enumerate(readers):
-            # InsertItem 建立新的一列，並填入第一欄 (讀者編號)
-            index = self.reader_list_ctrl.InsertItem(i, str(r[0]))
-            
-            # SetItem 填入後續欄位 (姓名、Email、信用分)
-            self.reader_list_ctrl.SetItem(index, 1, str(r[1])) # 姓名
-            self.reader_list_ctrl.SetItem(index, 2, str(r[2])) # E-Mail
-            self.reader_list_ctrl.SetItem(index, 3, str(r[3])) # 信用分
-            
-        print(f"✅ 已成功載入 {len(readers)} 筆讀者資料。")
+    def FetchPage(self, rid):
+        """產生某位讀者的分頁讀取函式 (在背景執行緒呼叫)，順便把日期整理成清單上顯示的文字"""
+        db = self.main_frame.db
+
+        def fetch_page(after_key, limit):
+            if rid is None:
+                return [], after_key
+            rows, last_key = db.get_borrow_history_page(rid, after_key, limit)
+            today = date.today()
+            return [(title, borrowed, due, self.StatusText(due, returned, today))
+                    for _, title, borrowed, due, returned in rows], last_key
+        return fetch_page
+
+    @staticmethod
+    def StatusText(due, returned, today):
+        if returned:
+            return f"已歸還 {returned}"
+        return "逾期未還" if due < today else "借閱中"
+
+    def ShowHistory(self, count, latest, active, fetch_page):
+        self.history.reset(count, fetch_page)
+        limit = self.main_frame.db.loan_limit
+        self.m_staticText5.SetLabel(f"借閱紀錄 (借閱中 {active} 本" + (f"，上限 {limit} 本)" if limit is not None else ")"))
+        if latest:
+            title, borrowed, due, returned = latest
+            status = self.StatusText(due, returned, date.today())
+            self.m_staticText6.SetLabel(f"最新紀錄: {title} (借閱日: {borrowed}，{status})，共 {count} 筆")
+        else:
+            self.m_staticText6.SetLabel("目前沒有借閱紀錄")
         self.Layout()
 
     def OnBackClick(self, event):
-        """處理返回按鈕，回到管理面板"""
-        self.Hide()
-        self.main_frame.GetFrame('AdminPanel', AdminPanelFrame).Show()
-
-    def OnEditReader(self, event):
-        selected = self.reader_list_ctrl.GetFirstSelected()
-        if selected != -1:
-            # 1. 抓取該行讀者資料
-            rid = self.reader_list_ctrl.GetItemText(selected, 0)
-            name = self.reader_list_ctrl.GetItemText(selected, 1)
-            email = self.reader_list_ctrl.GetItemText(selected, 2)
-            credit = self.reader_list_ctrl.GetItemText(selected, 3)
-        
-            # 2. 透過 MainFrame 開啟視窗，確保資源正確對接
-            # 修正點：必須明確傳入選中的 reader_data
-            edit_form = EditReaderForm(self.main_frame, (rid, name, email, credit))
-            edit_form.Show()
-        else:
-            # 💡 增加提示：如果沒選中任何一行，按鈕點擊會看起來像「沒反應」
-            wx.MessageBox("請先從列表中選擇一位讀者！", "提示")
-class EditReaderForm(EditReaderFormBase):
-    def __init__(self, parent, reader_data=None):
-        EditReaderFormBase.__init__(self, parent)
-        self.main_frame = parent
-        self.reader_id = None
-        
-        self.complete_button.Bind(wx.EVT_BUTTON, self.OnComplete)
-        self.cancel_button.Bind(wx.EVT_BUTTON, self.OnCancel)
-        
-        # 判斷是修改還是新增
-        if reader_data:
-            self.SetTitle("修改讀者資料")
-            self.reader_id = reader_data[0]
-            self.reader_name_input.SetValue(str(reader_data[1]))
-            # 讀者編號欄位叫 reader_id_input
-            self.reader_id_input.SetValue(str(reader_data[0]))
-            self.reader_id_input.SetEditable(False) # ID 通常不給改
-            self.email_input.SetValue(str(reader_data[2]))
-            self.credit_score_input.SetValue(str(reader_data[3]))
-        else:
-            self.SetTitle("新增讀者資料")
-
-    def OnComplete(self, event): 
-        # 1. 取得畫面上的最新輸入值
-        name = self.reader_name_input.GetValue()
-        email = self.email_input.GetValue()
-        credit = self.credit_score_input.GetValue()
-        rid = self.reader_id_input.GetValue()
-
-        # 2. 真正呼叫資料庫 (修正 image_fa66a5.png 只有註解的問題)
-        if self.reader_id:
-            success = self.main_frame.db.update_reader_info(rid, name, email, credit)
-        else:
-            success = self.main_frame.db.add_reader(rid, name, email, credit)
-            
-        # 3. 處理結果並刷新列表
-        if success:
-            wx.MessageBox("資料儲存成功！", "成功")
-            # 💡 這裡加入刷新列表的程式碼
-            reader_list = self.main_frame.frames.get('ReaderList')
-            if reader_list:
-                reader_list.RefreshReaderTable()
-            self.Destroy()
-        else:
-            wx.MessageBox("資料儲存失敗，請檢查編號是否重複或縮排錯誤。", "錯誤")
+        self.Hide(); self.main_frame.ShowMainFrame()
 
-    def OnCancel(self, event):
-        self.Destroy()
 # =======================================================================
 # 備用類別：防止未定義錯誤
 # =======================================================================
 class BorrowResultFrame(BorrowResultFrameBase): pass
-class ReserveResultFrame(ReserveResultFrameBase): pass
-class AdminBookDetail(AdminBookDetailBase): pass
-class EditBookForm(EditBookFormBase): pass
+class ReserveResultFrame(ReserveResultFrameBase):
+    def __init__(self, parent):
+        ReserveResultFrameBase.__init__(self, parent)
+        # 關閉時只隱藏，下次預約重複使用同一個視窗
+        self.Bind(wx.EVT_CLOSE, lambda event: self.Hide())
+
+    def ShowResult(self, title, result):
+        if result:
+            self.m_staticText7.SetLabel(f"《{title}》預約成功！")
+            self.m_staticText2.SetLabel(f"您排在第 {result.position} 位，書還回來時會保留 {HOLD_DAYS} 天給您。")
+        else:
+            self.m_staticText7.SetLabel("預約失敗！")
+            self.m_staticText2.SetLabel(result.message)
+        self.Layout()
@@ -0,0 +1,2 @@
+# -*- coding: utf-8 -*-
+# 效能測試腳本，從專案根目錄以 python -m benchmarks.<名稱> 執行
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+###########################################################################
+## bench_bulk.py - 逐本借還 vs borrow_many/return_many 批次借還的吞吐量
+## 執行: python -m benchmarks.bench_bulk --batch 5 10 20 --rounds 200
+###########################################################################
+
+import argparse
+import contextlib
+import io
+import os
+import random
+import tempfile
+import time
+
+from db_manager import DBManager
+
+
+def make_db(db_path, n_books, n_readers):
+    db = DBManager(db_path)
+    db.loan_limit = None  # 這裡量的是吞吐量，不受借閱上限影響
+    with db.pool.transaction() as conn:
+        conn.executemany("INSERT INTO Books VALUES (?,?,?,?,0)",
+                         ((f"K{i:05d}", f"書名 {i}", "作者", f"978-{i:05d}") for i in range(n_books)))
+        conn.executemany("INSERT INTO Readers VALUES (?,?,?,?,?)",
+                         ((f"R{i:05d}", f"讀者{i}", "", "", 100) for i in range(n_readers)))
+    # 每一籃都會還回去，每本書幾冊就夠同一籃重複刷到
+    db.add_copies([(f"K{i:05d}", 5) for i in range(n_books)])
+    return db
+
+
+def run(db, baskets, bulk):
+    """baskets: [(讀者, [書...]), ...]，回傳每秒處理的書本數 (借 + 還)"""
+    items = sum(len(bids) for _, bids in baskets)
+    # 借還時的 print 不列入計時
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        for rid, bids in baskets:
+            if bulk:
+                borrowed = db.borrow_many(rid, bids)
+                db.return_many([res.borrow_id for _, res in borrowed])
+            else:
+                borrow_ids = [db.borrow_book(rid, bid).borrow_id for bid in bids]
+                for borrow_id in borrow_ids:
+                    db.return_book(borrow_id)
+        elapsed = time.perf_counter() - start
+    return items / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="批次借還吞吐量比較")
+    parser.add_argument('--batch', type=int, nargs='+', default=[5, 10, 20])
+    parser.add_argument('--rounds', type=int, default=200, help="每種批次大小模擬幾位讀者")
+    parser.add_argument('--books', type=int, default=10000)
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp()
+    with contextlib.redirect_stdout(io.StringIO()):
+        db = make_db(os.path.join(tmp_dir, 'bench_bulk.db'), args.books, 1000)
+    rnd = random.Random(1)
+
+    print(f"{'每批本數':<10}{'逐本 (本/秒)':>16}{'批次 (本/秒)':>16}{'倍數':>8}")
+    for size in args.batch:
+        baskets = [(f"R{rnd.randrange(1000):05d}", [f"K{rnd.randrange(args.books):05d}" for _ in range(size)])
+                   for _ in range(args.rounds)]
+        single = run(db, baskets, bulk=False)
+        bulk = run(db, baskets, bulk=True)
+        print(f"{size:<10}{single:>16.0f}{bulk:>16.0f}{bulk / single:>8.1f}")
+
+    db.close()
+    for name in os.listdir(tmp_dir):
+        os.remove(os.path.join(tmp_dir, name))
+    os.rmdir(tmp_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+###########################################################################
+## bench_dates.py - 借閱日期存文字 (第 5 版) 與存整數天數 (第 6 版) 的資料庫大小與查詢速度
+## 執行: python -m benchmarks.bench_dates --loans 2000000
+###########################################################################
+
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+from datetime import date
+
+from benchmarks.bench_indexes import fill
+from db_manager import to_day
+from migrations import current_version, migrate
+
+# (說明, SQL, 參數)；參數是 date，依版本轉成文字或整數天數；
+# SQL 裡的 {day} 是日期欄位的運算形式 (文字要先經過 julianday() 才能相減)
+QUERIES = [
+    ('逾期未還筆數', "SELECT COUNT(*) FROM Borrows WHERE ReturnDate IS NULL AND DueDate < ?",
+     (date(2025, 1, 1),)),
+    ('讀者某年的借閱', "SELECT COUNT(*) FROM Borrows WHERE ReaderID = ? AND BorrowDate >= ? AND BorrowDate < ?",
+     ('R00042', date(2020, 1, 1), date(2021, 1, 1))),
+    ('某年全部借閱 (全表)', "SELECT COUNT(*) FROM Borrows WHERE BorrowDate >= ? AND BorrowDate < ?",
+     (date(2020, 1, 1), date(2021, 1, 1))),
+    ('平均借閱天數 (全表)',
+     "SELECT AVG({day}(ReturnDate) - {day}(BorrowDate)) FROM Borrows WHERE ReturnDate IS NOT NULL", ()),
+]
+
+
+def sizes(conn):
+    """回傳 (檔案大小, Borrows 資料表大小, Borrows 索引大小)，單位 MB"""
+    conn.execute("VACUUM")
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    total = conn.execute("PRAGMA page_count").fetchone()[0] * page_size
+    table = conn.execute("SELECT SUM(pgsize) FROM dbstat WHERE name = 'Borrows'").fetchone()[0]
+    indexes = conn.execute("""
+        SELECT SUM(pgsize) FROM dbstat
+        WHERE name IN (SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'Borrows')
+    """).fetchone()[0]
+    return total / 2**20, table / 2**20, indexes / 2**20
+
+
+def report(conn, convert, day_sql, repeat):
+    total, table, indexes = sizes(conn)
+    print(f"  檔案 {total:.1f} MB，Borrows 資料表 {table:.1f} MB，Borrows 索引 {indexes:.1f} MB")
+    for name, sql, params in QUERIES:
+        args = [convert(p) if isinstance(p, date) else p for p in params]
+        start = time.perf_counter()
+        for _ in range(repeat):
+            conn.execute(sql.format(day=day_sql), args).fetchall()
+        print(f"  {name:<14} {(time.perf_counter() - start) / repeat * 1000:>9.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="日期存文字與存整數的比較")
+    parser.add_argument('--books', type=int, default=50000)
+    parser.add_argument('--readers', type=int, default=20000)
+    parser.add_argument('--loans', type=int, default=2000000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(), 'bench_dates.db')
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    migrate(conn, target=5)
+    print(f"📦 產生 {args.loans} 筆借閱紀錄中...")
+    fill(conn, args.books, args.readers, args.loans)
+    conn.execute("ANALYZE")
+
+    print(f"\n第 {current_version(conn)} 版 (日期為 'YYYY-MM-DD' 文字):")
+    report(conn, date.isoformat, 'julianday', args.repeat)
+
+    start = time.perf_counter()
+    migrate(conn)
+    print(f"\n轉換耗時 {time.perf_counter() - start:.1f}s")
+    print(f"第 {current_version(conn)} 版 (日期為整數天數):")
+    report(conn, to_day, '', args.repeat)
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+###########################################################################
+## bench_fines.py - 逾期罰款批次工作 (fines.py) 在大量借閱紀錄上的執行時間
+## 執行: python -m benchmarks.bench_fines --loans 10000000
+###########################################################################
+
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+from datetime import date, timedelta
+
+from benchmarks.bench_indexes import fill
+from db_manager import DBManager, to_day
+from fines import overdue_loans, run_overdue_fines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="逾期罰款批次工作效能")
+    parser.add_argument('--books', type=int, default=50000)
+    parser.add_argument('--readers', type=int, default=20000)
+    parser.add_argument('--loans', type=int, default=2000000)
+    parser.add_argument('--nights', type=int, default=5, help="模擬連續執行幾個晚上")
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        db = DBManager(os.path.join(tempfile.mkdtemp(), 'bench_fines.db'))
+    print(f"📦 產生 {args.loans} 筆借閱紀錄中 (約 2% 未歸還)...")
+    with db.pool.connection() as conn:
+        conn.execute("DELETE FROM Books")
+        fill(conn, args.books, args.readers, args.loans, day=to_day)
+        conn.execute("ANALYZE")
+
+    day = date(2025, 1, 1)
+    start = time.perf_counter()
+    overdue = overdue_loans(db, day, limit=args.loans)
+    print(f"🔍 查出全部 {len(overdue)} 筆逾期未還: {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    for night in range(args.nights):
+        start = time.perf_counter()
+        result = run_overdue_fines(db, as_of=day)
+        elapsed = time.perf_counter() - start
+        label = "第一次執行" if night == 0 else f"第 {night + 1} 晚"
+        print(f"🌙 {label} ({result.as_of}): {elapsed:.2f}s，{result.loans} 筆借閱、{result.readers} 位讀者，"
+              f"新增逾期 {result.days} 天、罰款 {result.amount} 元")
+        day += timedelta(days=1)
+
+    start = time.perf_counter()
+    result = run_overdue_fines(db, as_of=day - timedelta(days=1))
+    print(f"🔁 同一天重複執行: {(time.perf_counter() - start) * 1000:.0f} ms，{result.loans} 筆 (應為 0)")
+    db.close()
+
+
+if __name__ == '__main__':
+    main()
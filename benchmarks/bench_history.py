@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+###########################################################################
+## bench_history.py - 借閱紀錄畫面：整份 fetchall 與 keyset 分頁 (第一頁 / 最新一筆) 的比較
+## 執行: python -m benchmarks.bench_history --loans 2000000 --heavy 20000
+###########################################################################
+
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+from benchmarks.bench_indexes import fill
+from db_manager import DBManager, to_day
+
+HEAVY_READER = 'R-HEAVY'
+
+
+def timed(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="借閱紀錄分頁效能")
+    parser.add_argument('--books', type=int, default=50000)
+    parser.add_argument('--readers', type=int, default=20000)
+    parser.add_argument('--loans', type=int, default=2000000)
+    parser.add_argument('--heavy', type=int, default=20000, help="借閱量特別多的那位讀者有幾筆紀錄")
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        db = DBManager(os.path.join(tempfile.mkdtemp(), 'bench_history.db'))
+    print(f"📦 產生 {args.loans} 筆借閱紀錄，其中一位讀者 {args.heavy} 筆...")
+    with db.pool.connection() as conn:
+        conn.execute("DELETE FROM Books")
+        fill(conn, args.books, args.readers, args.loans, day=to_day)
+        conn.execute("INSERT INTO Readers VALUES (?, '老讀者', '', '', 100)", (HEAVY_READER,))
+        conn.execute("BEGIN")
+        conn.executemany("INSERT INTO Borrows (BookID, ReaderID, BorrowDate, DueDate, ReturnDate) VALUES (?, ?, ?, ?, ?)",
+                         ((f"B{i % args.books:05d}", HEAVY_READER, 10000 + i // 4, 10014 + i // 4, 10010 + i // 4)
+                          for i in range(args.heavy)))
+        conn.execute("COMMIT")
+        conn.execute("ANALYZE")
+
+    def fetch_all():
+        # 舊的做法：整份 JOIN 後 fetchall，畫面只用其中一筆
+        with db.pool.connection() as conn:
+            return conn.execute("""
+                SELECT Books.Title, Borrows.BorrowDate, Borrows.DueDate FROM Borrows
+                JOIN Books ON Borrows.BookID = Books.BookID WHERE Borrows.ReaderID = ?
+            """, (HEAVY_READER,)).fetchall()
+
+    cases = [
+        ('整份 fetchall (舊)', fetch_all),
+        ('筆數 + 最新一筆', lambda: (db.count_borrows(HEAVY_READER), db.get_latest_borrow(HEAVY_READER))),
+        ('第一頁 (50 筆)', lambda: db.get_borrow_history_page(HEAVY_READER, limit=50)),
+    ]
+    for name, func in cases:
+        ms, _ = timed(func, args.repeat)
+        print(f"  {name:<16} {ms:>9.2f} ms")
+
+    _, (rows, key) = timed(lambda: db.get_borrow_history_page(HEAVY_READER, limit=50), 1)
+    for _ in range(args.heavy // 100):
+        rows, key = db.get_borrow_history_page(HEAVY_READER, key, 50)
+    ms, _ = timed(lambda: db.get_borrow_history_page(HEAVY_READER, key, 50), args.repeat)
+    print(f"  {'捲到中間的一頁':<16} {ms:>9.2f} ms")
+
+    with db.pool.connection() as conn:
+        plan = conn.execute("""
+            EXPLAIN QUERY PLAN SELECT BorrowID FROM Borrows WHERE ReaderID = ? AND (BorrowDate, BorrowID) < (?, ?)
+            ORDER BY BorrowDate DESC, BorrowID DESC LIMIT 50
+        """, (HEAVY_READER, key[0], key[1])).fetchall()
+    print(f"🔍 分頁查詢計畫: {'; '.join(row[3] for row in plan)}")
+    db.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+###########################################################################
+## bench_indexes.py - 比較加索引 (第 3 版結構) 前後的查詢計畫與速度
+## 執行: python -m benchmarks.bench_indexes --loans 2000000
+###########################################################################
+
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from datetime import date, timedelta
+
+from migrations import SCHEMA_VERSION, current_version, migrate
+
+QUERIES = {
+    '讀者借閱歷史': ("""
+        SELECT Books.Title, Borrows.BorrowDate, Borrows.DueDate FROM Borrows
+        JOIN Books ON Borrows.BookID = Books.BookID WHERE Borrows.ReaderID = ?
+        ORDER BY Borrows.BorrowDate DESC
+    """, ('R00042',)),
+    '某本書借出中的紀錄': ("SELECT BorrowID, ReaderID FROM Borrows WHERE BookID = ? AND ReturnDate IS NULL", ('B00042',)),
+    '書名精確查詢': ("SELECT * FROM Books WHERE Title = ?", ('書名 00042',)),
+}
+
+
+def fill(conn, n_books, n_readers, n_loans, seed=7, day=date.isoformat):
+    """day: 日期寫入資料庫的格式 (第 6 版以前是 'YYYY-MM-DD'，之後用 db_manager.to_day)"""
+    rnd = random.Random(seed)
+    start = date(2015, 1, 1)
+    conn.execute("BEGIN")
+    conn.executemany("INSERT INTO Books VALUES (?,?,?,?,?)",
+                     ((f"B{i:05d}", f"書名 {i:05d}", "作者", f"978-{i:05d}", 3) for i in range(n_books)))
+    conn.executemany("INSERT INTO Readers VALUES (?,?,?,?,?)",
+                     ((f"R{i:05d}", f"讀者{i}", f"r{i}@mail.com", "x", 100) for i in range(n_readers)))
+
+    def loans():
+        for _ in range(n_loans):
+            b = start + timedelta(days=rnd.randint(0, 3650))
+            returned = rnd.random() < 0.98
+            yield (f"B{rnd.randrange(n_books):05d}", f"R{rnd.randrange(n_readers):05d}", day(b),
+                   day(b + timedelta(days=14)), day(b + timedelta(days=10)) if returned else None)
+    conn.executemany("INSERT INTO Borrows (BookID, ReaderID, BorrowDate, DueDate, ReturnDate) VALUES (?,?,?,?,?)", loans())
+    conn.commit()
+
+
+def report(conn, repeat):
+    for name, (sql, params) in QUERIES.items():
+        plan = [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+        start = time.perf_counter()
+        for _ in range(repeat):
+            conn.execute(sql, params).fetchall()
+        ms = (time.perf_counter() - start) / repeat * 1000
+        print(f"  {name:<12} {ms:>9.2f} ms   {' / '.join(plan)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="索引遷移前後的查詢計畫比較")
+    parser.add_argument('--books', type=int, default=50000)
+    parser.add_argument('--readers', type=int, default=20000)
+    parser.add_argument('--loans', type=int, default=2000000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp()
+    db_path = os.path.join(tmp_dir, 'bench_indexes.db')
+    conn = sqlite3.connect(db_path, isolation_level=None)
+
+    # 模擬還沒加索引的舊資料庫 (第 2 版)
+    migrate(conn, target=2)
+    print(f"📦 產生 {args.loans} 筆借閱紀錄中...")
+    fill(conn, args.books, args.readers, args.loans)
+
+    print(f"\n第 {current_version(conn)} 版 (無索引):")
+    report(conn, args.repeat)
+
+    start = time.perf_counter()
+    migrate(conn)
+    print(f"\n升級到第 {SCHEMA_VERSION} 版耗時 {time.perf_counter() - start:.1f}s")
+    print(f"第 {current_version(conn)} 版 (有索引):")
+    report(conn, args.repeat)
+
+    conn.close()
+    for name in os.listdir(tmp_dir):
+        os.remove(os.path.join(tmp_dir, name))
+    os.rmdir(tmp_dir)
+
+
+if __name__ == '__main__':
+    main()
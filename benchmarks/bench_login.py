@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+###########################################################################
+## bench_login.py - 登入驗證的吞吐量：選定的雜湊成本下每個核心每秒能處理幾次登入
+## 執行: python -m benchmarks.bench_login --budget-ms 100 --logins 200 --threads 4
+##       python -m benchmarks.bench_login --cost scrypt:14
+## 也量舊明文密碼第一次登入 (含重新雜湊) 與查無帳號的時間；查無帳號應該和密碼錯誤一樣慢
+###########################################################################
+
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from credentials import HashCost, calibrate_cost, hash_password, is_hashed
+from db_manager import DBManager
+
+
+def timed(func, items):
+    """回傳 (每次平均毫秒, 每秒次數)"""
+    start = time.perf_counter()
+    for item in items:
+        func(item)
+    elapsed = time.perf_counter() - start
+    return elapsed / len(items) * 1000, len(items) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="登入驗證吞吐量")
+    parser.add_argument('--budget-ms', type=float, default=100, help="校正成本用的單次登入時間預算")
+    parser.add_argument('--cost', type=HashCost.parse, help="直接指定成本 (例如 scrypt:14)，不校正")
+    parser.add_argument('--logins', type=int, default=100, help="每種情境量幾次登入")
+    parser.add_argument('--threads', type=int, default=os.cpu_count() or 1, help="同時登入的執行緒數")
+    args = parser.parse_args()
+
+    cost = args.cost or calibrate_cost(args.budget_ms)
+    print(f"🔐 雜湊成本 {cost} (時間預算 {args.budget_ms:.0f} ms，CPU {os.cpu_count()} 核)")
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        db = DBManager(os.path.join(tempfile.mkdtemp(), 'bench_login.db'))
+    db.password_cost = cost
+    n = args.logins
+    # 每位讀者的雜湊都要各算一次太久，量測用同一個雜湊字串 (驗證成本不變)
+    hashed = hash_password('secret', cost)
+    with db.pool.transaction() as conn:
+        conn.executemany("INSERT INTO Readers VALUES (?, ?, '', ?, 100)",
+                         [(f"H{i:05d}", f"讀者{i}", hashed) for i in range(n * (args.threads + 1))]
+                         + [(f"L{i:05d}", f"舊讀者{i}", 'secret') for i in range(n)])
+
+    cases = [
+        ('正確密碼', lambda i: db.verify_login(f"H{i:05d}", 'secret'), range(n)),
+        ('密碼錯誤', lambda i: db.verify_login(f"H{i:05d}", 'wrong'), range(n)),
+        ('查無帳號', lambda i: db.verify_login(f"X{i:05d}", 'secret'), range(n)),
+        ('舊明文密碼第一次 (含重新雜湊)', lambda i: db.verify_login(f"L{i:05d}", 'secret'), range(n)),
+        ('舊明文密碼第二次', lambda i: db.verify_login(f"L{i:05d}", 'secret'), range(n)),
+    ]
+    single = None
+    for name, func, items in cases:
+        ms, rate = timed(func, items)
+        single = single or rate
+        print(f"  {name:<20} {ms:>8.1f} ms/次  {rate:>7.1f} 次/秒")
+
+    with db.pool.connection() as conn:
+        legacy = conn.execute("SELECT Password FROM Readers WHERE ReaderID LIKE 'L%'").fetchall()
+    if not all(is_hashed(password) for password, in legacy):
+        print("❌ 舊明文密碼登入後沒有改存雜湊")
+
+    # hashlib 計算時放開 GIL，多執行緒可以用到多個核心 (服務的執行緒池、GUI 的 DBWorker 都是這樣跑)
+    ids = [f"H{i:05d}" for i in range(n, n * (args.threads + 1))]
+    with ThreadPoolExecutor(args.threads) as pool:
+        start = time.perf_counter()
+        results = list(pool.map(lambda rid: db.verify_login(rid, 'secret'), ids))
+        elapsed = time.perf_counter() - start
+    if not all(results):
+        print("❌ 有登入驗證失敗")
+    rate = len(ids) / elapsed
+    cores = min(args.threads, os.cpu_count() or 1)
+    print(f"  {args.threads} 條執行緒同時登入: {rate:.1f} 次/秒 (每核 {rate / cores:.1f} 次/秒，"
+          f"單執行緒的 {rate / single:.1f} 倍)")
+    db.close()
+
+
+if __name__ == '__main__':
+    main()
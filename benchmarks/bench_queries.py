@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+###########################################################################
+## bench_queries.py - 用 QueryProfiler 跑一輪櫃台常見操作，列出每個 SQL 的時間、筆數與查詢計畫
+## 執行: python -m benchmarks.bench_queries --books 20000 --loans 200000
+## 有 SQL 對大表整張掃描 (ALLOWED_SCANS 以外) 時以非 0 結束碼離開，CI 用它擋下查詢計畫的退步
+###########################################################################
+
+import argparse
+import contextlib
+import io
+import os
+import random
+import sys
+import tempfile
+from datetime import date
+
+from benchmarks.bench_indexes import fill
+from db_manager import DBManager, to_day
+from query_profiler import QueryProfiler
+
+# 可以接受的整張掃描：小的暫存表、遞迴 CTE 產生的序號、本來就要讀整張表的維護工作
+ALLOWED_SCANS = {
+    'new_copies', 'seq',   # add_copies 的暫存表與編號序列
+}
+
+
+def workload(db, args, rng):
+    """櫃台一天會做的事：搜尋、看書、登入、借還書、預約、讀者清單、借閱紀錄"""
+    rids = [f"R{rng.randrange(args.readers):05d}" for _ in range(50)]
+    bids = [f"B{rng.randrange(args.books):05d}" for _ in range(50)]
+    for i in range(args.rounds):
+        rid, bid = rids[i % len(rids)], bids[i % len(bids)]
+        query = f"書名 {rng.randrange(args.books):05d}"[:6]
+        rows, key = db.search_books_after(query, limit=20)
+        db.search_books_after(query, key, limit=20)
+        db.count_books(f"作者 {rng.randrange(args.books):05d}")
+        # 1~2 個字的查詢不能用 trigram 索引，改比對書名開頭，也不能整張掃描
+        rows, key = db.search_books_after("書名", limit=20)
+        db.search_books_after("書名", key, limit=20)
+        db.count_books("書名")
+        db.get_book_by_id(bid)
+        db.get_copies(bid)
+        db.verify_login(rid, 'wrong')
+        db.reader_cache.clear()
+        db.get_reader_by_id(rid)
+        result = db.borrow_book(rid, bid)
+        if result:
+            db.return_by_barcode(result.barcode)
+        if not db.borrow_book(rid, bids[-1]):
+            db.reserve_book(rid, bids[-1])
+        db.get_borrow_history_page(rid, limit=50)
+        db.count_borrows(rid)
+        db.get_latest_borrow(rid)
+        db.get_active_loans(rid)
+        rows, key = db.get_readers_page(limit=100, sort='Name', filter_text='讀者1')
+        db.get_readers_page(key, limit=100, sort='Name', filter_text='讀者1')
+        db.count_readers('讀者1')
+    db.expire_holds(date.today())
+    db.return_many(bids[:5], by_book=True)
+    db.add_copies([(bid, 1) for bid in bids[:10]])
+    # 不含 load_suggest_index / get_all_readers：它們本來就要讀整張表，而且只在背景或管理畫面偶爾執行
+
+
+def prepare(db, books, readers, loans):
+    """在剛建立的 DBManager 裡填入 workload() 用的資料 (書號 B00000、讀者 R00000 起)，統計資料也更新好"""
+    with db.pool.connection() as conn:
+        conn.execute("DELETE FROM Books")
+        fill(conn, books, readers, loans, day=to_day)
+    db.add_copies([(f"B{i:05d}", 2) for i in range(books)])
+    with db.pool.connection() as conn:
+        conn.execute("ANALYZE")
+    db.check_loan_counters()
+    db.rebuild_search_index()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="常見操作的 SQL 剖析與全表掃描檢查")
+    parser.add_argument('--books', type=int, default=20000)
+    parser.add_argument('--readers', type=int, default=5000)
+    parser.add_argument('--loans', type=int, default=200000)
+    parser.add_argument('--rounds', type=int, default=100, help="操作循環幾輪")
+    parser.add_argument('--slow-ms', type=float, default=50)
+    args = parser.parse_args()
+
+    profiler = QueryProfiler(slow_ms=args.slow_ms, explain_all=True)
+    with contextlib.redirect_stdout(io.StringIO()):
+        db = DBManager(os.path.join(tempfile.mkdtemp(), 'bench_queries.db'), profiler=profiler)
+    print(f"📦 產生 {args.books} 本書、{args.readers} 位讀者、{args.loans} 筆借閱紀錄...")
+    prepare(db, args.books, args.readers, args.loans)
+    # 只看櫃台操作，準備資料的 SQL 不算
+    profiler.reset()
+
+    workload(db, args, random.Random(7))
+    print(profiler.report(limit=40))
+    db.close()
+
+    try:
+        profiler.assert_no_full_scans(allow=ALLOWED_SCANS)
+    except AssertionError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    print(f"✅ {len(profiler.stats())} 個 SQL 都沒有整張掃描大表")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+###########################################################################
+## bench_reader_list.py - 讀者清單排序/搜尋 (第一頁與深層分頁) 的回應時間
+## 執行: python -m benchmarks.bench_reader_list --readers 1000000
+## 目標: 每次按鍵搜尋 (筆數 + 第一頁) 在 50 ms 以內
+###########################################################################
+
+import argparse
+import contextlib
+import io
+import os
+import random
+import tempfile
+import time
+
+from db_manager import DBManager
+
+SURNAMES = '王李張劉陳楊黃趙吳周徐孫馬朱胡郭何高林羅'
+GIVEN = '家豪志明怡君淑芬俊傑雅婷建宏冠宇宗翰承恩佳穎詩涵'
+
+
+def make_db(db_path, n_readers, seed=3):
+    rnd = random.Random(seed)
+    with contextlib.redirect_stdout(io.StringIO()):
+        db = DBManager(db_path)
+
+    def rows():
+        for i in range(n_readers):
+            name = rnd.choice(SURNAMES) + rnd.choice(GIVEN) + rnd.choice(GIVEN)
+            yield (f"R{i:07d}", name, f"user{i}@mail{i % 50}.com", "x", rnd.randint(0, 200))
+    with db.pool.transaction() as conn:
+        conn.executemany("INSERT INTO Readers VALUES (?,?,?,?,?)", rows())
+    return db
+
+
+def measure(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="讀者清單排序/搜尋效能")
+    parser.add_argument('--readers', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp()
+    print(f"📦 產生 {args.readers} 位讀者中...")
+    db = make_db(os.path.join(tmp_dir, 'bench_readers.db'), args.readers)
+
+    print(f"{'情境':<28}{'筆數':>10}{'筆數+第一頁 (ms)':>20}{'第 50 頁 (ms)':>16}")
+    cases = [('預設排序', 'ReaderID', False, ''),
+             ('姓名排序', 'Name', False, ''),
+             ('信用分遞減', 'Credit', True, ''),
+             ('前綴 "R00012"', 'ReaderID', False, 'R00012'),
+             ('前綴 "王"', 'Name', False, '王'),
+             ('子字串 "user12345"', 'Name', False, 'user12345'),
+             ('子字串 "家豪怡"', 'Credit', True, '家豪怡')]
+    for label, sort, desc, text in cases:
+        def first_page():
+            db.count_readers(text)
+            db.get_readers_page(None, 100, sort=sort, descending=desc, filter_text=text)
+        total = db.count_readers(text)
+        first_ms = measure(first_page, args.repeat)
+
+        # 深層分頁：先走到第 50 頁的起點，再量讀取這一頁的時間
+        key = None
+        for _ in range(49):
+            rows, key = db.get_readers_page(key, 100, sort=sort, descending=desc, filter_text=text)
+            if not rows:
+                break
+        deep_ms = measure(lambda: db.get_readers_page(key, 100, sort=sort, descending=desc, filter_text=text),
+                          args.repeat)
+        flag = '' if first_ms < 50 else '  ⚠️ 超過 50 ms'
+        print(f"{label:<28}{total:>10}{first_ms:>20.2f}{deep_ms:>16.2f}{flag}")
+
+    db.close()
+    for name in os.listdir(tmp_dir):
+        os.remove(os.path.join(tmp_dir, name))
+    os.rmdir(tmp_dir)
+
+
+if __name__ == '__main__':
+    main()
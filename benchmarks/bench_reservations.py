@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+###########################################################################
+## bench_reservations.py - 暢銷書大量預約：多個行程同時排隊，再逐本還書分配保留
+## 執行: python -m benchmarks.bench_reservations --readers 5000 --procs 8
+## 檢查排隊順序 (先到先得) 與還書時間不隨隊伍長度變慢；結果不一致時以非 0 結束碼離開
+###########################################################################
+
+import argparse
+import contextlib
+import io
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+from db_manager import DBManager
+
+
+def desk(db_path, readers, start_event, results):
+    """模擬一個預約入口：替分到的讀者預約同一本暢銷書"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        db = DBManager(db_path)
+        start_event.wait()
+        made = []
+        for rid in readers:
+            result = db.reserve_book(rid, 'HOT')
+            if result:
+                made.append((result.reservation_id, rid, result.position))
+        db.close()
+    results.put(made)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="預約排隊併發與還書分配效能")
+    parser.add_argument('--readers', type=int, default=5000)
+    parser.add_argument('--procs', type=int, default=8)
+    parser.add_argument('--returns', type=int, default=200, help="量測幾次還書")
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(), 'bench_reservations.db')
+    with contextlib.redirect_stdout(io.StringIO()):
+        db = DBManager(db_path)
+    with db.pool.transaction() as conn:
+        conn.execute("INSERT INTO Books VALUES ('HOT', '暢銷書', '某作者', '978-HOT', 0)")
+        conn.executemany("INSERT INTO Readers VALUES (?, ?, ?, ?, ?)",
+                         [(f"R{i:05d}", f"讀者{i}", "", "", 100) for i in range(args.readers + 1)])
+    # 唯一的一冊已經被借走
+    with contextlib.redirect_stdout(io.StringIO()):
+        db.add_copies([('HOT', 1)])
+        db.borrow_book('R00000', 'HOT')
+
+    readers = [f"R{i:05d}" for i in range(1, args.readers + 1)]
+    start_event = multiprocessing.Event()
+    results = multiprocessing.Queue()
+    procs = [multiprocessing.Process(target=desk, args=(db_path, readers[i::args.procs], start_event, results))
+             for i in range(args.procs)]
+    for p in procs:
+        p.start()
+    start = time.perf_counter()
+    start_event.set()
+    made = sorted(r for _ in procs for r in results.get())
+    for p in procs:
+        p.join()
+    elapsed = time.perf_counter() - start
+    print(f"📌 {args.procs} 個行程同時預約 {len(made)} 次: {elapsed:.2f}s ({len(made) / elapsed:.0f} 次/秒)")
+
+    ok = True
+    if [position for _, _, position in made] != list(range(1, args.readers + 1)):
+        print("❌ 排隊位置與預約順序不一致")
+        ok = False
+
+    # 逐本還書：每次都是「還書 -> 保留給下一位 -> 那位讀者借走」，量還書花多少時間
+    queue = [rid for _, rid, _ in made]
+    timings = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        holder = 'R00000'
+        for expected in queue[:args.returns]:
+            with db.pool.connection() as conn:
+                borrow_id = conn.execute("SELECT BorrowID FROM Borrows WHERE ReaderID = ? AND ReturnDate IS NULL",
+                                         (holder,)).fetchone()[0]
+            t = time.perf_counter()
+            result = db.return_book(borrow_id)
+            timings.append((time.perf_counter() - t) * 1000)
+            if result.hold_for != expected or not db.borrow_book(expected, 'HOT'):
+                ok = False
+                break
+            holder = expected
+
+    timings.sort()
+    print(f"📚 隊伍 {len(queue)} 人，還書並分配保留 {len(timings)} 次: "
+          f"中位數 {timings[len(timings) // 2]:.2f} ms，最慢 {timings[-1]:.2f} ms")
+    with db.pool.connection() as conn:
+        plan = conn.execute("""
+            EXPLAIN QUERY PLAN SELECT ReservationID FROM Reservations
+            WHERE BookID = 'HOT' AND Status = 'waiting' ORDER BY ReservationID LIMIT 1
+        """).fetchall()
+    print(f"🔍 下一位預約者的查詢計畫: {plan[0][3]}")
+    db.close()
+
+    if not ok:
+        print("❌ 還書保留的順序與預約順序不一致")
+        sys.exit(1)
+    print("✅ 先到先得順序正確")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+###########################################################################
+## bench_search.py - 比較 LIKE 全表掃描與 FTS5 全文檢索的搜尋速度
+## 執行: python -m benchmarks.bench_search --books 1000000
+###########################################################################
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from db_manager import DBManager
+
+WORDS = ['Python', '資料庫', '演算法', '網路', '作業系統', '機器學習', '程式設計', '入門', '實務', '指南',
+         '進階', '圖解', '深度學習', '資料結構', '計算機', '系統分析', 'Linux', 'Java', '統計', '經濟學']
+SURNAMES = ['張', '李', '王', '陳', '林', '黃', '吳', '劉', '蔡', '楊']
+GIVEN = ['大文', '小美', '老五', '志明', '春嬌', '家豪', '淑芬', '建國', '雅婷', '冠宇']
+
+
+def build_catalogue(db_path, n_books, seed=42):
+    """產生 n_books 本假書，直接寫入 Books (觸發器會同步更新全文索引)"""
+    rnd = random.Random(seed)
+    db = DBManager(db_path)
+    def rows():
+        for i in range(n_books):
+            title = " ".join(rnd.sample(WORDS, 3)) + f" 第{rnd.randint(1, 9)}版"
+            author = rnd.choice(SURNAMES) + rnd.choice(GIVEN)
+            yield (f"S{i:07d}", title, author, f"978-{i:07d}", rnd.randint(0, 5))
+    with db.pool.transaction() as conn:
+        conn.executemany("INSERT INTO Books VALUES (?,?,?,?,?)", rows())
+    return db
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LIKE vs FTS5 搜尋效能比較")
+    parser.add_argument('--books', type=int, default=1000000, help="假資料書籍數量")
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp()
+    db_path = os.path.join(tmp_dir, 'bench_search.db')
+    print(f"📦 產生 {args.books} 本書籍中...")
+    start = time.perf_counter()
+    db = build_catalogue(db_path, args.books)
+    print(f"   完成，耗時 {time.perf_counter() - start:.1f}s")
+
+    queries = ['深度學習', '機器學習 入門', 'Python', '張大文', '978-0000123']
+    print(f"{'查詢':<16}{'LIKE (ms)':>12}{'FTS5 (ms)':>12}{'LIKE 筆數':>10}{'FTS5 筆數':>10}")
+    for q in queries:
+        def like_scan():
+            with db.pool.connection() as conn:
+                return conn.execute("SELECT * FROM Books WHERE Title LIKE ? OR Author LIKE ? OR ISBN LIKE ?",
+                                    ('%' + q + '%',) * 3).fetchall()
+        like_ms, like_rows = timed(like_scan, args.repeat)
+        # 搜尋畫面一次只取一頁 (20 筆)，FTS 端就比較「取第一頁」的時間
+        fts_ms, fts_rows = timed(lambda: db.search_books(q, limit=20), args.repeat)
+        print(f"{q:<16}{like_ms:>12.2f}{fts_ms:>12.2f}{len(like_rows):>10}{len(fts_rows):>10}")
+
+    db.close()
+    for name in os.listdir(tmp_dir):
+        os.remove(os.path.join(tmp_dir, name))
+    os.rmdir(tmp_dir)
+
+
+if __name__ == '__main__':
+    main()
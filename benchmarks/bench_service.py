@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+###########################################################################
+## bench_service.py - library_service 的多櫃台負載：每個行程模擬一個櫃台 (搜尋、借書、看紀錄、還書)
+## 執行: python -m benchmarks.bench_service --desks 8 --ops 500 --workers 8
+## 印出整體吞吐量與服務自己量到的各端點 p50/p95/p99；庫存或借閱中本數對不上時以非 0 結束碼離開
+###########################################################################
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+from db_manager import DBManager
+from library_service import LibraryService
+from service_client import ServiceClient
+
+
+def desk(url, desk_no, books, ops, start_event, results):
+    """一個櫃台：隨機搜尋、借書、翻借閱紀錄，借到的書稍後還掉"""
+    client = ServiceClient(url)
+    rng = random.Random(desk_no)
+    rid = f"DESK{desk_no:02d}"
+    client.register_reader(rid, rid, '', 'pw')
+    start_event.wait()
+    borrowed, failed = [], 0
+    for _ in range(ops):
+        action = rng.random()
+        if action < 0.4:
+            client.search_books_after(f"書名{rng.randrange(books)}", limit=20)
+        elif action < 0.7:
+            result = client.borrow_book(rid, f"B{rng.randrange(books):05d}")
+            if result:
+                borrowed.append(result.barcode)
+            elif result.status not in (result.OUT_OF_STOCK, result.LIMIT_REACHED):
+                failed += 1
+        elif action < 0.85:
+            client.get_borrow_history_page(rid, limit=50)
+        elif borrowed:
+            if not client.return_by_barcode(borrowed.pop(rng.randrange(len(borrowed)))):
+                failed += 1
+    client.close()
+    results.put((len(borrowed), failed))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="圖書館服務多櫃台負載")
+    parser.add_argument('--books', type=int, default=2000)
+    parser.add_argument('--copies', type=int, default=2, help="每本書幾冊")
+    parser.add_argument('--desks', type=int, default=8, help="同時幾個櫃台 (各一個行程)")
+    parser.add_argument('--ops', type=int, default=500, help="每個櫃台送幾個請求")
+    parser.add_argument('--workers', type=int, default=8, help="服務的資料庫執行緒數")
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        db = DBManager(os.path.join(tempfile.mkdtemp(), 'bench_service.db'))
+        with db.pool.transaction() as conn:
+            conn.executemany("INSERT INTO Books VALUES (?, ?, '作者', ?, 0)",
+                             [(f"B{i:05d}", f"書名{i}", f"978-{i:06d}") for i in range(args.books)])
+        db.add_copies([(f"B{i:05d}", args.copies) for i in range(args.books)])
+        db.rebuild_search_index()
+    db.loan_limit = None
+    with db.pool.connection() as conn:
+        shelved = conn.execute("SELECT SUM(Available) FROM Books").fetchone()[0]  # 含內建範例書
+
+    # 服務跑在這個行程的背景執行緒，櫃台各自是獨立行程 (不和服務搶 GIL)
+    service = LibraryService(db, max_workers=args.workers)
+    loop = asyncio.new_event_loop()
+    ready = threading.Event()
+    address = []
+
+    async def serve():
+        server = await asyncio.start_server(service._connection, '127.0.0.1', 0)
+        address.append(server.sockets[0].getsockname()[1])
+        ready.set()
+        async with server:
+            await server.serve_forever()
+    threading.Thread(target=loop.run_until_complete, args=(serve(),), daemon=True).start()
+    ready.wait()
+    url = f"http://127.0.0.1:{address[0]}"
+
+    start_event = multiprocessing.Event()
+    results = multiprocessing.Queue()
+    procs = [multiprocessing.Process(target=desk, args=(url, n, args.books, args.ops, start_event, results))
+             for n in range(args.desks)]
+    for p in procs:
+        p.start()
+    time.sleep(0.5)  # 等每個櫃台都註冊好讀者
+    start = time.perf_counter()
+    start_event.set()
+    outcomes = [results.get() for _ in procs]
+    elapsed = time.perf_counter() - start
+    for p in procs:
+        p.join()
+
+    total = args.desks * args.ops
+    print(f"🌐 {args.desks} 個櫃台 x {args.ops} 個請求，服務 {args.workers} 條資料庫執行緒: "
+          f"{elapsed:.2f}s ({total / elapsed:.0f} 請求/秒)")
+    metrics = json.loads(urllib.request.urlopen(url + '/metrics').read())
+    for route, m in metrics['routes'].items():
+        print(f"  {route:<32} {m['count']:>6} 次  p50 {m['p50_ms']:>7.2f}  p95 {m['p95_ms']:>7.2f}  "
+              f"p99 {m['p99_ms']:>7.2f}  最慢 {m['max_ms']:>7.2f} ms  錯誤 {m['errors']}")
+
+    ok = True
+    held = sum(kept for kept, _ in outcomes)
+    failed = sum(f for _, f in outcomes)
+    with db.pool.connection() as conn:
+        available, copies_available = conn.execute("""
+            SELECT (SELECT SUM(Available) FROM Books), (SELECT COUNT(*) FROM Copies WHERE Status = 'available')
+        """).fetchone()
+        open_loans, active = conn.execute("""
+            SELECT (SELECT COUNT(*) FROM Borrows WHERE ReturnDate IS NULL), (SELECT SUM(ActiveLoans) FROM ReaderLoans)
+        """).fetchone()
+    if failed:
+        print(f"❌ {failed} 個借還書請求失敗 (不是庫存不足)")
+        ok = False
+    if available != copies_available or available != shelved - held:
+        print(f"❌ 庫存對不上: Books.Available 合計 {available}，在架冊數 {copies_available}，應為 {shelved - held}")
+        ok = False
+    if open_loans != held or active != held:
+        print(f"❌ 借閱中本數對不上: 未還紀錄 {open_loans}，ReaderLoans 合計 {active}，櫃台手上 {held}")
+        ok = False
+
+    # 服務的事件迴圈在 daemon 執行緒上，行程結束時一起結束
+    service.executor.shutdown()
+    db.close()
+    if not ok:
+        sys.exit(1)
+    print(f"✅ 庫存與借閱中本數一致 (借出未還 {held} 冊)")
+
+
+if __name__ == '__main__':
+    main()
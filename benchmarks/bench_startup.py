@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+###########################################################################
+## bench_startup.py - 程式啟動時間：模組匯入 (python -X importtime) 與第一次畫面繪製
+## 執行: python -m benchmarks.bench_startup --books 100000
+## 沒有螢幕的環境 (CI) 用虛擬顯示器: xvfb-run -a python -m benchmarks.bench_startup
+###########################################################################
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 啟動時不應該被載入的模組 (管理員畫面、匯入工具要用到時才載入)
+LAZY_MODULES = ('admin_logic', 'gui_admin', 'book_importer')
+
+
+def run_child():
+    """子行程：啟動主程式，主視窗第一次繪製時印出各階段耗時 (ms) 後結束"""
+    start = time.perf_counter()
+    import wx
+    from main import MyApp
+    imported = time.perf_counter()
+
+    timings = {'import_ms': (imported - start) * 1000}
+    app = MyApp(0)
+    frame = app.GetTopWindow()
+    timings['init_ms'] = (time.perf_counter() - imported) * 1000
+
+    def on_paint(event):
+        wx.PaintDC(frame)
+        if 'paint_ms' not in timings:
+            timings['paint_ms'] = (time.perf_counter() - start) * 1000
+            timings['loaded'] = [m for m in LAZY_MODULES if m in sys.modules]
+            print(json.dumps(timings), flush=True)
+            wx.CallAfter(app.ExitMainLoop)
+        event.Skip()
+
+    frame.Bind(wx.EVT_PAINT, on_paint)
+    frame.Refresh()
+    wx.CallLater(10000, app.ExitMainLoop)  # 萬一一直沒有繪製 (例如沒有顯示器) 也不要卡住
+    app.MainLoop()
+    frame.worker.shutdown()
+
+
+def measure_importtime(env, module='app_logic'):
+    """python -X importtime 匯入 module，回傳 (總耗時 ms, 它直接匯入的模組 [(累計 ms, 名稱)]，由慢到快)"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    children = []
+    for line in result.stderr.splitlines():
+        # 格式: "import time: self [us] | cumulative | imported package"，子模組以縮排表示，
+        # 而且先列出子模組、最後才是匯入它們的模組
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 1:
+            children.append((int(cumulative) / 1000, name.strip()))
+        elif depth == 0:
+            if name.strip() == module:
+                return int(cumulative) / 1000, sorted(children, reverse=True)
+            children = []
+    raise RuntimeError(f"importtime 輸出裡找不到 {module}")
+
+
+def measure_first_paint(env, runs):
+    """啟動 runs 次子行程，回傳每次的 (從啟動行程到第一次繪製的 ms, 子行程回報的各階段)"""
+    results = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        proc = subprocess.Popen([sys.executable, '-m', 'benchmarks.bench_startup', '--child'],
+                                cwd=ROOT, env=env, stdout=subprocess.PIPE, text=True)
+        report = None
+        for line in proc.stdout:
+            if line.startswith('{'):
+                report = json.loads(line)
+                break
+        wall = (time.perf_counter() - start) * 1000
+        proc.wait()
+        if report is None:
+            raise RuntimeError("主視窗沒有繪製 (沒有顯示器？請用 xvfb-run 執行)")
+        results.append((wall, report))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="程式啟動時間")
+    parser.add_argument('--books', type=int, default=100000, help="測試資料庫的書籍數量 (0 = 使用空資料庫)")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child()
+        return
+
+    from benchmarks.bench_search import build_catalogue
+
+    db_path = os.path.join(tempfile.mkdtemp(), 'bench_startup.db')
+    print(f"📦 產生 {args.books} 本書的測試資料庫...")
+    with contextlib.redirect_stdout(io.StringIO()):
+        build_catalogue(db_path, args.books).close()
+    env = dict(os.environ, LIBRARY_DB=db_path)
+
+    total, modules = measure_importtime(env)
+    print(f"📥 import app_logic: {total:.0f} ms，其中:")
+    for ms, name in modules[:10]:
+        print(f"   {ms:8.1f} ms  {name}")
+
+    results = sorted(measure_first_paint(env, args.runs), key=lambda r: r[0])
+    wall, report = results[len(results) // 2]
+    print(f"🖼️ 啟動到第一次繪製 (中位數，{args.runs} 次): {wall:.0f} ms "
+          f"(匯入 {report['import_ms']:.0f} ms，建立主視窗 {report['init_ms']:.0f} ms)")
+
+    loaded = sorted({m for _, r in results for m in r['loaded']})
+    if loaded:
+        print(f"⚠️ 啟動時載入了應該延後載入的模組: {', '.join(loaded)}")
+        sys.exit(1)
+    print(f"✅ 啟動時沒有載入 {', '.join(LAZY_MODULES)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+###########################################################################
+## bench_suggest.py - 搜尋建議前綴索引 (PrefixIndex) 的建立時間、記憶體與查詢延遲
+## 執行: python -m benchmarks.bench_suggest --books 1000000
+## 目標: 一百萬本書時每次建議在 5 ms 以內
+###########################################################################
+
+import argparse
+import itertools
+import random
+import time
+import tracemalloc
+
+from benchmarks.bench_search import GIVEN, SURNAMES, WORDS
+from suggest_index import PrefixIndex
+
+
+def make_rows(n_books, seed=42):
+    rnd = random.Random(seed)
+    for i in range(n_books):
+        title = " ".join(rnd.sample(WORDS, 3)) + f" 第{rnd.randint(1, 9)}版 卷{i % 5000}"
+        author = rnd.choice(SURNAMES) + rnd.choice(GIVEN)
+        yield (title, author, f"978-{i:07d}")
+
+
+def percentile(sorted_values, p):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * p))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="搜尋建議前綴索引效能")
+    parser.add_argument('--books', type=int, default=1000000)
+    parser.add_argument('--queries', type=int, default=10000)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    index = PrefixIndex.build(make_rows(args.books))
+    build_time = time.perf_counter() - start
+
+    # 再建一次量記憶體 (tracemalloc 會拖慢建立速度，所以跟計時分開)；
+    # 字串在追蹤期間才產生，量到的是索引實際佔用的全部記憶體 (含字串本身)
+    del index
+    tracemalloc.start()
+    index = PrefixIndex.build(make_rows(args.books))
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"📚 {args.books} 本書 -> {len(index)} 個建議項目 (書名/作者/ISBN，重複的只收一次)")
+    print(f"🏗️ 建立時間 {build_time:.2f}s，建立時最高記憶體 {peak / 2**20:.0f} MB")
+    print(f"💾 索引記憶體 {current / 2**20:.0f} MB，平均每筆 {current / len(index):.0f} bytes")
+
+    # 用實際存在的書名/作者/ISBN 取 1~6 個字元的前綴，模擬使用者打字的每個階段
+    rnd = random.Random(7)
+    rows = list(itertools.islice(make_rows(args.books), 0, None, max(1, args.books // 10000)))
+    samples = [rnd.choice(rnd.choice(rows)) for _ in range(args.queries)]
+    prefixes = [s[:rnd.randint(1, 6)] for s in samples]
+
+    timings = []
+    for prefix in prefixes:
+        start = time.perf_counter()
+        index.suggest(prefix)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+
+    p50, p99, worst = percentile(timings, 0.50), percentile(timings, 0.99), timings[-1]
+    print(f"🔍 {args.queries} 次建議: p50 {p50:.3f} ms，p99 {p99:.3f} ms，最慢 {worst:.3f} ms")
+    print("✅ 符合 5 ms 目標" if p99 < 5 else "⚠️ p99 超過 5 ms")
+
+
+if __name__ == '__main__':
+    main()
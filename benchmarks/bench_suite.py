@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+###########################################################################
+## bench_suite.py - 端對端量測：在 datagen 產生的大型資料庫上跑櫃台常用的 DBManager 操作
+## 執行: python -m benchmarks.bench_suite --books 50000 --readers 20000 --loans 500000 --json result.json
+##       python -m benchmarks.bench_suite --baseline old.json    (和另一個 commit 的結果比較)
+## 每個操作輸出次數、每秒次數與 p50/p95/p99/最慢；JSON 另外記下 commit、Python/SQLite 版本與資料量
+###########################################################################
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import tempfile
+import time
+
+from benchmarks.datagen import READER_PASSWORD, book_id, generate, reader_id
+from credentials import HashCost
+from db_manager import DBManager
+from instrumentation import percentile
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def measure(func, items):
+    """對每個 item 呼叫 func 一次，回傳 (結果清單, 統計 dict)"""
+    results, samples = [], []
+    start = time.perf_counter()
+    for item in items:
+        t = time.perf_counter()
+        results.append(func(item))
+        samples.append((time.perf_counter() - t) * 1000)
+    elapsed = time.perf_counter() - start
+    ordered = sorted(samples)
+    return results, {
+        'ops': len(samples),
+        'ops_per_s': round(len(samples) / elapsed, 1) if elapsed else None,
+        'mean_ms': round(sum(samples) / len(samples), 3) if samples else None,
+        'p50_ms': percentile(ordered, 50),
+        'p95_ms': percentile(ordered, 95),
+        'p99_ms': percentile(ordered, 99),
+        'max_ms': round(ordered[-1], 3) if ordered else None,
+    }
+
+
+def run_suite(db, info, args):
+    """回傳 {操作名稱: 統計}；查詢對象依 Zipf 熱門度抽選 (熱門書常被查、重度讀者常來借)"""
+    rng = random.Random(args.seed)
+    book_pop, reader_pop = info['book_pop'], info['reader_pop']
+    hot_books = [book_id(book_pop.sample(rng)) for _ in range(args.ops)]
+    hot_readers = [reader_id(reader_pop.sample(rng)) for _ in range(args.ops)]
+    with db.pool.connection() as conn:
+        titles = [row[0] for row in conn.execute("SELECT Title FROM Books WHERE BookID IN (%s)" %
+                                                 ','.join('?' * len(set(hot_books))), sorted(set(hot_books)))]
+    # 櫃台常見的查詢：書名裡的一段 (3 個字以上才走全文索引)、一個短關鍵字、作者姓名
+    queries = []
+    for _ in range(args.ops):
+        title = rng.choice(titles).split()[0]
+        kind = rng.random()
+        if kind < 0.6 and len(title) >= 3:
+            cut = rng.randint(0, len(title) - 3)
+            queries.append(title[cut:cut + rng.randint(3, min(6, len(title) - cut))])
+        elif kind < 0.8:
+            queries.append(title[:2])
+        else:
+            queries.append(rng.choice(titles)[:4])
+
+    results = {}
+    _, results['search'] = measure(lambda q: db.search_books_after(q, limit=50), queries)
+    _, results['search_count'] = measure(db.count_books, queries)
+    _, results['book_detail'] = measure(lambda bid: (db.get_book_by_id(bid), db.get_copies(bid)), hot_books)
+
+    # 登入要算一次密碼雜湊，量的次數另外設定
+    logins = hot_readers[:args.logins]
+    ok, results['login'] = measure(lambda rid: db.verify_login(rid, READER_PASSWORD), logins)
+    if not all(ok):
+        raise RuntimeError("產生的讀者登入失敗")
+    _, results['login_wrong_password'] = measure(lambda rid: db.verify_login(rid, 'wrong'), logins)
+
+    borrowed, results['borrow'] = measure(lambda pair: db.borrow_book(*pair), list(zip(hot_readers, hot_books)))
+    barcodes = [result.barcode for result in borrowed if result]
+    _, results['return'] = measure(db.return_by_barcode, barcodes)
+    results['borrow']['succeeded'] = len(barcodes)
+
+    def history(rid):
+        rows, key = db.get_borrow_history_page(rid, limit=50)
+        return db.count_borrows(rid), db.get_latest_borrow(rid), rows
+    _, results['history'] = measure(history, hot_readers)
+
+    sorts = [(column, rng.random() < 0.3) for column in DBManager.READER_SORT_COLUMNS]
+    pages = [(rng.choice(sorts), rng.choice(['', '', '', '陳', 'user1', '家豪'])) for _ in range(args.ops)]
+
+    def reader_list(page):
+        (sort, descending), text = page
+        rows, key = db.get_readers_page(None, 100, sort, descending, text)
+        if key:
+            db.get_readers_page(key, 100, sort, descending, text)
+        return db.count_readers(text)
+    _, results['reader_list'] = measure(reader_list, pages)
+    return results
+
+
+def print_table(results, baseline=None):
+    header = f"{'操作':<22}{'次數':>7}{'次/秒':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'最慢 ms':>10}"
+    print(header + ("   vs 基準 p50" if baseline else ''))
+    for name, s in results.items():
+        line = (f"{name:<22}{s['ops']:>7}{s['ops_per_s'] or 0:>10.1f}{s['p50_ms'] or 0:>10.3f}"
+                f"{s['p95_ms'] or 0:>10.3f}{s['p99_ms'] or 0:>10.3f}{s['max_ms'] or 0:>10.3f}")
+        old = (baseline or {}).get(name)
+        if old and old.get('p50_ms') and s['p50_ms']:
+            line += f"   {(s['p50_ms'] / old['p50_ms'] - 1) * 100:+7.1f}%"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="端對端 DBManager 量測 (JSON 輸出)")
+    parser.add_argument('--books', type=int, default=50000)
+    parser.add_argument('--readers', type=int, default=20000)
+    parser.add_argument('--loans', type=int, default=500000)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--ops', type=int, default=500, help="每個操作量幾次")
+    parser.add_argument('--logins', type=int, default=30, help="登入量幾次 (每次都要算密碼雜湊)")
+    parser.add_argument('--password-cost', type=HashCost.parse, help="讀者密碼的雜湊成本 (預設同 DBManager)")
+    parser.add_argument('--json', help="結果寫到這個 JSON 檔 (預設只印表格)")
+    parser.add_argument('--baseline', help="之前的 JSON 結果，印出 p50 的變化")
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(), 'bench_suite.db')
+    with contextlib.redirect_stdout(io.StringIO()):
+        db = DBManager(db_path)
+    if args.password_cost:
+        db.password_cost = args.password_cost
+    print(f"📦 產生 {args.books} 本書、{args.readers} 位讀者、{args.loans} 筆借閱 (seed {args.seed})...")
+    info = generate(db, args.books, args.readers, args.loans, seed=args.seed)
+    print(f"   耗時 {info['seconds']} 秒: {info['counts']}")
+
+    results = run_suite(db, info, args)
+    db.close()
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+    print_table(results, baseline)
+
+    if args.json:
+        report = {
+            'commit': git_commit(),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'params': {k: (str(v) if isinstance(v, HashCost) else v) for k, v in vars(args).items()
+                       if k not in ('json', 'baseline')},
+            'password_cost': str(db.password_cost),
+            'data': {'counts': info['counts'], 'generate_s': info['seconds']},
+            'results': results,
+        }
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"💾 結果已寫入 {args.json}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,337 @@
+# -*- coding: utf-8 -*-
+###########################################################################
+## bench_ui.py - 畫面操作的延遲：用程式點按鈕、切換畫面，量「送出事件」到「畫面靜止 (wx.EVT_IDLE)」的時間
+## 執行: xvfb-run -a python -m benchmarks.bench_ui --books 50000 --readers 20000 --repeat 10 --json ui.json
+## 情境: 搜尋、開書籍詳情、UpdateInfo、登入、借書、借閱紀錄、N 筆讀者清單 (開啟/排序/捲到中間)、畫面切換
+## 任一情境的中位數超過 --budget-ms 或逾時時以非 0 結束碼離開，CI 用它擋下畫面的效能退步
+###########################################################################
+##
+## 「靜止」的定義：送出事件後，主迴圈處理完所有事件 (收到 EVT_IDLE)、DBWorker 沒有還沒送回的工作，
+## 而且這個情境要等的畫面狀態已經成立 (例如清單第一頁已經讀進來)。
+## 資料庫在主行程用 datagen 產生，畫面在子行程裡跑 (LIBRARY_DB 指向產生的資料庫，和 bench_startup 相同)。
+## wx.MessageBox 是 modal，會卡住腳本：子行程把它換成只記錄訊息內容的函式。
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import deque
+
+from instrumentation import percentile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ADMIN_PASSWORD = 'admin123'   # DBManager 建立資料庫時的預設管理員密碼
+
+
+class Step:
+    """一個要量測的操作：action() 送出事件，ready() 成立 (且畫面靜止) 時停止計時；name 為 None 的步驟不記錄"""
+    __slots__ = ('name', 'action', 'ready')
+
+    def __init__(self, name, action, ready=lambda: True):
+        self.name = name
+        self.action = action
+        self.ready = ready
+
+
+class UIHarness:
+    """依序執行 Step，每一步從送出事件開始計時，到 EVT_IDLE 時畫面狀態已經就緒為止"""
+    TIMEOUT_S = 60
+
+    def __init__(self, app, main_frame):
+        import wx
+        self.wx = wx
+        self.app = app
+        self.main = main_frame
+        self.steps = deque()
+        self.samples = {}
+        self.messages = []
+        self.error = None
+        self.current = None
+        self.started = 0.0
+        self.before = None
+        wx.MessageBox = self.on_message_box
+        app.Bind(wx.EVT_IDLE, self.OnIdle)
+
+    def on_message_box(self, message, caption='', *args, **kwargs):
+        self.messages.append(message)
+        return self.wx.OK
+
+    # --- 模擬使用者操作 ---
+    def click(self, button):
+        """和真的點擊一樣，把 EVT_BUTTON 排進事件佇列"""
+        event = self.wx.CommandEvent(self.wx.wxEVT_BUTTON, button.GetId())
+        event.SetEventObject(button)
+        self.wx.PostEvent(button.GetEventHandler(), event)
+
+    def list_event(self, list_ctrl, event_type, index=-1, column=-1):
+        event = self.wx.ListEvent(event_type, list_ctrl.GetId())
+        event.SetEventObject(list_ctrl)
+        # wxPython 4.1 以後有 SetIndex / SetColumn，舊版只能直接設定成員
+        if hasattr(event, 'SetIndex'):
+            event.SetIndex(index)
+            event.SetColumn(column)
+        else:
+            event.m_itemIndex = index
+            event.m_col = column
+        self.wx.PostEvent(list_ctrl.GetEventHandler(), event)
+
+    def frame(self, name):
+        return self.main.frames.get(name)
+
+    def shown(self, name):
+        frame = self.frame(name)
+        return frame is not None and frame.IsShown()
+
+    def remember(self, name, attr):
+        """記下某個畫面虛擬清單目前的快取，reloaded() 用它判斷清單是否已經換成新的查詢結果"""
+        frame = self.frame(name)
+        self.before = getattr(frame, attr).rows if frame is not None else None
+
+    def reloaded(self, name, attr, index=0):
+        frame = self.frame(name)
+        if frame is None or not frame.IsShown():
+            return False
+        model = getattr(frame, attr)
+        return model.rows is not self.before and self.list_ready(model, index)
+
+    @staticmethod
+    def list_ready(model, index=0):
+        """虛擬清單的第 index 列已經讀進來 (或清單是空的)，沒有還在讀的頁"""
+        return not model.pending_pages and (model.list_ctrl.GetItemCount() <= index or
+                                            model.get_row(index) is not None)
+
+    # --- 執行 ---
+    def run(self, steps):
+        self.steps.extend(steps)
+        self.wx.CallAfter(self.next)
+
+    def next(self):
+        if not self.steps:
+            self.finish()
+            return
+        self.current = self.steps.popleft()
+        self.started = time.perf_counter()
+        self.current.action()
+        self.wx.WakeUpIdle()
+
+    def OnIdle(self, event):
+        step = self.current
+        if step is None:
+            return
+        if self.main.worker.pending or not step.ready():
+            if time.perf_counter() - self.started > self.TIMEOUT_S:
+                self.error = f"{step.name or '準備步驟'} 超過 {self.TIMEOUT_S} 秒還沒完成"
+                self.current = None
+                self.finish()
+                return
+            # 還在等背景工作：讓出一點 CPU 給 DBWorker，再要求下一次 idle
+            time.sleep(0.0002)
+            event.RequestMore()
+            return
+        elapsed = (time.perf_counter() - self.started) * 1000
+        self.current = None
+        if step.name:
+            self.samples.setdefault(step.name, []).append(elapsed)
+        self.wx.CallAfter(self.next)
+
+    def finish(self):
+        print(json.dumps({'samples': self.samples, 'error': self.error, 'messages': self.messages[-5:]},
+                         ensure_ascii=False), flush=True)
+        self.app.ExitMainLoop()
+
+
+def build_steps(h, args):
+    """依 --repeat 產生各情境的步驟；書、讀者依 datagen 的編號隨機挑 (固定 seed)"""
+    from benchmarks.datagen import READER_PASSWORD, book_id, reader_id
+
+    main, rng = h.main, random.Random(args.seed)
+    db = main.db
+    steps = [Step(None, lambda: None)]   # 先等啟動時的背景工作 (搜尋建議索引) 做完
+
+    # 讀者登入 (密碼雜湊在背景執行，量的是按下登入到回到主畫面)
+    rid = reader_id(rng.randrange(args.readers))
+
+    def fill_login():
+        form = h.frame('ReaderLogin')
+        form.account_input.ChangeValue(rid)
+        form.password_input.ChangeValue(READER_PASSWORD)
+    steps += [
+        Step('switch_identity', lambda: h.click(main.login_button), lambda: h.shown('IdentityChoice')),
+        Step('switch_reader_login', lambda: h.click(h.frame('IdentityChoice').reader_login_button),
+             lambda: h.shown('ReaderLogin')),
+        Step(None, fill_login),
+        Step('login', lambda: h.click(h.frame('ReaderLogin').login_submit_button),
+             lambda: main.current_user == rid and main.IsShown()),
+    ]
+
+    # 搜尋 -> 詳情 -> UpdateInfo -> 借書 -> 借閱紀錄
+    for _ in range(args.repeat):
+        title = db.get_book_by_id(book_id(rng.randrange(args.books)))[1]
+        query = title.split()[0][:4]
+
+        def search(query=query):
+            h.remember('QueryBook', 'results')
+            main.book_search_input.ChangeValue(query)
+            h.click(main.query_button)
+
+        def detail_ready():
+            return h.shown('BookDetail') and h.frame('BookDetail').current_book_data is not None
+
+        def update_info(books=[db.get_book_by_id(book_id(rng.randrange(args.books))) for _ in range(5)]):
+            detail = h.frame('BookDetail')
+            for book in books:
+                h.wx.CallAfter(detail.UpdateInfo, book)
+
+        def open_borrow_record():
+            h.remember('BorrowRecord', 'history')
+            h.click(main.borrow_record_button)
+
+        def borrow():
+            del h.messages[:]
+            h.click(h.frame('BookDetail').borrow_button)
+
+        steps += [
+            Step('search', search, lambda: h.reloaded('QueryBook', 'results')),
+            Step('open_detail', lambda: h.list_event(h.frame('QueryBook').result_list_ctrl,
+                                                     h.wx.wxEVT_LIST_ITEM_ACTIVATED, index=0), detail_ready),
+            Step('detail_update_x5', update_info),
+            Step('borrow', borrow, lambda: bool(h.messages) and h.frame('BookDetail').borrow_button.IsEnabled()),
+            # 借書成功時已經回到主畫面；失敗 (沒有庫存) 時還在詳情頁，點返回
+            Step(None, lambda: main.IsShown() or h.click(h.frame('BookDetail').m_button3), main.IsShown),
+            Step('open_borrow_record', open_borrow_record, lambda: h.reloaded('BorrowRecord', 'history')),
+            Step('switch_to_main', lambda: h.click(h.frame('BorrowRecord').back_button), main.IsShown),
+        ]
+
+    # 管理員：N 筆讀者的清單
+    def fill_admin():
+        form = h.frame('AdminLogin')
+        form.account_input.ChangeValue('admin')
+        form.password_input.ChangeValue(ADMIN_PASSWORD)
+
+    def open_reader_list():
+        h.remember('ReaderList', 'readers')
+        h.click(h.frame('AdminPanel').view_reader_button)
+
+    def sort_readers(column):
+        h.remember('ReaderList', 'readers')
+        h.list_event(h.frame('ReaderList').reader_list_ctrl, h.wx.wxEVT_LIST_COL_CLICK, column=column)
+
+    def reader_list():
+        return h.reloaded('ReaderList', 'readers')
+
+    steps += [
+        Step(None, lambda: h.click(main.login_button), lambda: h.shown('IdentityChoice')),
+        # 第一次開管理員畫面要載入 admin_logic / gui_admin
+        Step('open_admin_login', lambda: h.click(h.frame('IdentityChoice').admin_login_button),
+             lambda: h.shown('AdminLogin')),
+        Step(None, fill_admin),
+        Step('admin_login', lambda: h.click(h.frame('AdminLogin').login_submit_button), lambda: h.shown('AdminPanel')),
+    ]
+    for i in range(args.repeat):
+        column = i % 4
+
+        def scroll_middle():
+            ctrl = h.frame('ReaderList').reader_list_ctrl
+            ctrl.EnsureVisible(ctrl.GetItemCount() // 2)
+
+        steps += [
+            Step('open_reader_list', open_reader_list, reader_list),
+            Step('reader_sort', lambda column=column: sort_readers(column), reader_list),
+            Step('reader_scroll_middle', scroll_middle,
+                 lambda: h.list_ready(h.frame('ReaderList').readers, h.frame('ReaderList').readers.list_ctrl
+                                      .GetItemCount() // 2)),
+            Step('switch_to_admin_panel', lambda: h.click(h.frame('ReaderList').back_button),
+                 lambda: h.shown('AdminPanel')),
+        ]
+    return steps
+
+
+def run_child(args):
+    """子行程：啟動主程式，跑完所有步驟後把每個情境的樣本 (ms) 以一行 JSON 印出"""
+    from main import MyApp
+
+    app = MyApp(0)
+    harness = UIHarness(app, app.GetTopWindow())
+    harness.run(build_steps(harness, args))
+    app.MainLoop()
+    harness.main.worker.shutdown()
+
+
+def summarize(samples):
+    result = {}
+    for name, values in samples.items():
+        ordered = sorted(values)
+        result[name] = {'runs': len(values), 'median_ms': percentile(ordered, 50), 'p95_ms': percentile(ordered, 95),
+                        'max_ms': round(ordered[-1], 3), 'samples_ms': [round(v, 3) for v in values]}
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="畫面操作延遲 (事件到靜止)")
+    parser.add_argument('--books', type=int, default=50000)
+    parser.add_argument('--readers', type=int, default=20000, help="讀者清單的筆數")
+    parser.add_argument('--loans', type=int, default=200000)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--repeat', type=int, default=10, help="每個情境做幾次")
+    parser.add_argument('--budget-ms', type=float, default=1000, help="任一情境的中位數超過就算失敗")
+    parser.add_argument('--json', help="結果寫到這個 JSON 檔")
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args)
+        return
+
+    from benchmarks.bench_suite import git_commit
+    from benchmarks.datagen import generate
+    from db_manager import DBManager
+
+    db_path = os.path.join(tempfile.mkdtemp(), 'bench_ui.db')
+    print(f"📦 產生 {args.books} 本書、{args.readers} 位讀者、{args.loans} 筆借閱...")
+    with contextlib.redirect_stdout(io.StringIO()):
+        db = DBManager(db_path)
+    generate(db, args.books, args.readers, args.loans, seed=args.seed)
+    db.close()
+
+    env = dict(os.environ, LIBRARY_DB=db_path)
+    cmd = [sys.executable, '-m', 'benchmarks.bench_ui', '--child', '--books', str(args.books),
+           '--readers', str(args.readers), '--seed', str(args.seed), '--repeat', str(args.repeat)]
+    proc = subprocess.run(cmd, cwd=ROOT, env=env, stdout=subprocess.PIPE, text=True)
+    report = next((json.loads(line) for line in proc.stdout.splitlines() if line.startswith('{')), None)
+    if report is None:
+        print(f"❌ 畫面沒有跑完 (結束碼 {proc.returncode})；需要 wxPython，沒有顯示器時請用 xvfb-run 執行")
+        sys.exit(1)
+
+    results = summarize(report['samples'])
+    print(f"{'情境':<26}{'次數':>6}{'中位數 ms':>12}{'p95 ms':>10}{'最慢 ms':>10}")
+    for name, s in results.items():
+        print(f"{name:<26}{s['runs']:>6}{s['median_ms']:>12.1f}{s['p95_ms']:>10.1f}{s['max_ms']:>10.1f}")
+
+    over = [name for name, s in results.items() if s['median_ms'] > args.budget_ms]
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'commit': git_commit(), 'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                       'python': platform.python_version(), 'platform': platform.platform(),
+                       'params': {k: v for k, v in vars(args).items() if k not in ('json', 'child')},
+                       'error': report['error'], 'over_budget': over, 'results': results},
+                      f, ensure_ascii=False, indent=2)
+        print(f"💾 結果已寫入 {args.json}")
+
+    if report['error']:
+        print(f"❌ {report['error']} (最後的訊息: {report['messages']})")
+        sys.exit(1)
+    if over:
+        print(f"❌ 中位數超過 {args.budget_ms:.0f} ms: {', '.join(over)}")
+        sys.exit(1)
+    print(f"✅ 所有情境的中位數都在 {args.budget_ms:.0f} ms 以內")
+
+
+if __name__ == '__main__':
+    main()
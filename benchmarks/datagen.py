@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+###########################################################################
+## datagen.py - 產生可重現的假圖書館 (書籍、讀者、館藏、借閱紀錄)，給效能量測用
+## 同一組參數與 seed 每次產生完全相同的資料，不同 commit 的量測結果才能互相比較
+## 執行: python -m benchmarks.datagen --books 50000 --readers 20000 --loans 500000 --out /tmp/library.db
+##       (其他量測程式直接呼叫 generate())
+###########################################################################
+##
+## - 書名、作者、讀者姓名是中文 (夾雜少數英文技術名詞)，全文索引與排序走到和真實資料一樣的路徑
+## - 書與讀者的熱門程度符合 Zipf 分布：少數暢銷書、少數重度讀者佔大部分借閱，
+##   熱門度的排名隨機打散到編號上，不會剛好是編號最小的那幾本
+## - 歷史借閱都已歸還；另外有 active_ratio 比例的借閱透過 DBManager.borrow_many 正常借出，
+##   館藏狀態、Books.Available、ReaderLoans 計數都由原本的流程維護，資料保持一致
+
+import argparse
+import bisect
+import contextlib
+import io
+import itertools
+import os
+import random
+import time
+from datetime import date
+
+from credentials import HashCost, hash_password
+from db_manager import LOAN_DAYS, DBManager, to_day
+
+# 書名用的詞，依類別分組讓組出來的書名看起來像一回事
+TOPICS = ['資料庫', '演算法', '作業系統', '計算機網路', '機器學習', '深度學習', '資料結構', '程式設計', '統計學',
+          '經濟學', '會計學', '心理學', '台灣史', '世界史', '哲學', '微積分', '線性代數', '有機化學', '天文學',
+          '植物圖鑑', '料理', '攝影', '投資理財', '日語', '英文文法', '城市規劃', '建築設計', '社會學']
+TECH = ['Python', 'Java', 'Linux', 'SQL', 'Rust', 'Go', 'JavaScript', 'C++']
+PREFIXES = ['圖解', '實戰', '精通', '深入淺出', '一次看懂', '零基礎學', '徹底研究', '新手的']
+SUFFIXES = ['入門', '指南', '實務', '概論', '原理', '手冊', '全書', '精要', '應用', '案例集']
+NOVEL_WORDS = ['夜', '海', '風', '城', '雨', '山', '月', '光', '夢', '河', '島', '花', '雪', '星', '霧', '燈']
+NOVEL_PATTERNS = ['{0}之{1}', '{0}的{1}', '最後的{0}', '{0}{1}紀事', '{0}與{1}', '那年的{0}']
+SURNAMES = '王李張劉陳楊黃趙吳周徐孫馬朱胡郭何高林羅鄭梁謝宋唐許韓馮鄧曹彭曾蕭田董潘袁蔡蔣余杜葉程'
+GIVEN = '家豪志明怡君淑芬俊傑雅婷建宏冠宇宗翰承恩佳穎詩涵文彥宜庭子軒品妤柏翰欣怡育誠美玲'
+MAIL_DOMAINS = ['gmail.com', 'yahoo.com.tw', 'ms1.hinet.net', 'outlook.com', 'nccu.edu.tw']
+
+READER_PASSWORD = 'reader-pw'   # 產生的讀者都用這個密碼 (量測登入時用)
+
+
+class Zipf:
+    """
+    1..n 名的 Zipf 分布 (第 k 名的機率和 1/k^s 成正比)，sample() 回傳 0..n-1 的編號
+    排名到編號的對應用 seed 打散；累積權重先算好，抽一次只要一次二分搜尋
+    """
+
+    def __init__(self, n, s=1.1, rng=None):
+        rng = rng or random.Random(0)
+        self.cumulative = list(itertools.accumulate(1 / k ** s for k in range(1, n + 1)))
+        self.order = list(range(n))
+        rng.shuffle(self.order)
+
+    def sample(self, rng):
+        rank = bisect.bisect(self.cumulative, rng.random() * self.cumulative[-1])
+        return self.order[min(rank, len(self.order) - 1)]
+
+    def top(self, count):
+        """最熱門的 count 個編號"""
+        return self.order[:count]
+
+
+def book_id(i):
+    return f"B{i:06d}"
+
+
+def reader_id(i):
+    return f"R{i:06d}"
+
+
+def isbn13(i):
+    """978 開頭、檢查碼正確的 ISBN-13"""
+    digits = f"978957{i:06d}"
+    check = (10 - sum(int(d) * (3 if n % 2 else 1) for n, d in enumerate(digits)) % 10) % 10
+    return f"{digits}{check}"
+
+
+def person_name(rng):
+    return rng.choice(SURNAMES) + rng.choice(GIVEN[::2]) + rng.choice(GIVEN[1::2])
+
+
+def book_title(rng):
+    kind = rng.random()
+    if kind < 0.55:
+        topic = rng.choice(TOPICS + TECH)
+        title = f"{rng.choice(PREFIXES)}{topic}{rng.choice(SUFFIXES)}" if rng.random() < 0.4 else \
+            f"{topic}{rng.choice(SUFFIXES)}"
+    elif kind < 0.85:
+        title = rng.choice(NOVEL_PATTERNS).format(*rng.sample(NOVEL_WORDS, 2))
+    else:
+        title = f"{rng.choice(TOPICS)}與{rng.choice(TOPICS)}"
+    if rng.random() < 0.3:
+        title += f" 第{rng.randint(2, 9)}版"
+    return title
+
+
+def generate(db, books=10000, readers=5000, loans=100000, seed=1, copies=2, active_ratio=0.01, zipf_s=1.1,
+             password_cost=None, today=None):
+    """
+    在 db (DBManager，結構已是最新版) 裡產生假資料，回傳 dict: 各資料表筆數、熱門書與讀者的編號、耗時
+    book_id(i) / reader_id(i) 可以換算編號；讀者密碼都是 READER_PASSWORD
+    password_cost: 讀者密碼的雜湊成本 (預設用 db.password_cost)；所有讀者共用同一個雜湊字串，產生資料不必逐筆雜湊
+    """
+    start = time.perf_counter()
+    today = today or date.today()
+    rng = random.Random(seed)
+    book_pop = Zipf(books, zipf_s, random.Random(seed + 1))
+    reader_pop = Zipf(readers, zipf_s, random.Random(seed + 2))
+    hashed = hash_password(READER_PASSWORD, password_cost or db.password_cost)
+
+    with db.pool.transaction() as conn:
+        # Available 由 Copies 的觸發器維護，先寫 0
+        conn.executemany("INSERT INTO Books VALUES (?, ?, ?, ?, 0)",
+                         ((book_id(i), book_title(rng), person_name(rng), isbn13(i)) for i in range(books)))
+        conn.executemany("INSERT INTO Readers VALUES (?, ?, ?, ?, ?)",
+                         ((reader_id(i), person_name(rng), f"user{i}@{rng.choice(MAIL_DOMAINS)}", hashed,
+                           rng.randint(60, 120)) for i in range(readers)))
+    db.add_copies([(book_id(i), copies) for i in range(books)])
+
+    # 歷史借閱：過去五年內，全部已歸還 (沒有館藏狀態要維護，直接寫入)
+    active = int(loans * active_ratio)
+    last_day = to_day(today) - 1
+    first_day = last_day - 5 * 365
+
+    def history():
+        for _ in range(loans - active):
+            day = rng.randint(first_day, last_day - LOAN_DAYS)
+            yield (book_id(book_pop.sample(rng)), reader_id(reader_pop.sample(rng)), day, day + LOAN_DAYS,
+                   day + rng.randint(1, LOAN_DAYS + 3))
+    with db.pool.transaction() as conn:
+        conn.executemany("INSERT INTO Borrows (BookID, ReaderID, BorrowDate, DueDate, ReturnDate) VALUES (?, ?, ?, ?, ?)",
+                         history())
+
+    # 借出中的書走正常的借書流程 (每次一位讀者借 1~5 本)，館藏與計數器都由 DBManager 維護
+    borrowed = 0
+    while borrowed < active:
+        picks = [book_id(book_pop.sample(rng)) for _ in range(min(rng.randint(1, 5), active - borrowed))]
+        results = db.borrow_many(reader_id(reader_pop.sample(rng)), picks)
+        borrowed += max(1, sum(1 for _, result in results if result))
+
+    with db.pool.connection() as conn:
+        conn.execute("ANALYZE")
+        counts = {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                  for table in ('Books', 'Readers', 'Copies', 'Borrows')}
+        counts['active_loans'] = conn.execute("SELECT COUNT(*) FROM Borrows WHERE ReturnDate IS NULL").fetchone()[0]
+    db.clear_book_caches()
+    db.reader_cache.clear()
+    return {
+        'counts': counts,
+        'seed': seed,
+        'zipf_s': zipf_s,
+        'popular_books': [book_id(i) for i in book_pop.top(20)],
+        'heavy_readers': [reader_id(i) for i in reader_pop.top(20)],
+        'book_pop': book_pop,
+        'reader_pop': reader_pop,
+        'seconds': round(time.perf_counter() - start, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="產生假圖書館資料庫")
+    parser.add_argument('--books', type=int, default=50000)
+    parser.add_argument('--readers', type=int, default=20000)
+    parser.add_argument('--loans', type=int, default=500000)
+    parser.add_argument('--copies', type=int, default=2, help="每本書幾冊")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--zipf', type=float, default=1.1, help="Zipf 指數，越大越集中在少數熱門書")
+    parser.add_argument('--password-cost', type=HashCost.parse, help="讀者密碼的雜湊成本 (預設同 DBManager)")
+    parser.add_argument('--out', required=True, help="資料庫檔案 (不可已存在)")
+    args = parser.parse_args()
+
+    if os.path.exists(args.out):
+        parser.error(f"{args.out} 已經存在")
+    with contextlib.redirect_stdout(io.StringIO()):
+        db = DBManager(args.out)
+    info = generate(db, args.books, args.readers, args.loans, seed=args.seed, copies=args.copies,
+                    zipf_s=args.zipf, password_cost=args.password_cost)
+    db.close()
+    counts = info['counts']
+    print(f"📦 {args.out}: {counts['Books']} 本書 ({counts['Copies']} 冊)、{counts['Readers']} 位讀者、"
+          f"{counts['Borrows']} 筆借閱 (借出中 {counts['active_loans']})，耗時 {info['seconds']} 秒")
+    print(f"   讀者密碼: {READER_PASSWORD}；最熱門的書: {', '.join(info['popular_books'][:5])}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+###########################################################################
+## stress_borrow.py - 多個行程同時搶借同一本書，檢查庫存不會變成負數
+## 執行: python -m benchmarks.stress_borrow --procs 8 --attempts 200 --stock 50
+## 結果不一致時以非 0 結束碼離開
+###########################################################################
+
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+
+from db_manager import DBManager
+
+
+def desk(db_path, desk_no, attempts, start_event, results):
+    """模擬一個借閱櫃台：不停借同一本書"""
+    db = DBManager(db_path)
+    db.loan_limit = None  # 每個櫃台都用同一位讀者一直借
+    start_event.wait()
+    statuses = Counter()
+    for _ in range(attempts):
+        statuses[db.borrow_book(f"R{desk_no}", 'HOT').status] += 1
+    db.close()
+    results.put(dict(statuses))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="借閱交易併發壓力測試")
+    parser.add_argument('--procs', type=int, default=8)
+    parser.add_argument('--attempts', type=int, default=200)
+    parser.add_argument('--stock', type=int, default=50)
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp()
+    db_path = os.path.join(tmp_dir, 'stress.db')
+    db = DBManager(db_path)
+    with db.pool.transaction() as conn:
+        conn.execute("INSERT INTO Books VALUES ('HOT', '暢銷書', '某作者', '978-HOT', 0)")
+        conn.executemany("INSERT INTO Readers VALUES (?, ?, ?, ?, ?)",
+                         [(f"R{i}", f"讀者{i}", "", "", 100) for i in range(args.procs)])
+    db.add_copies([('HOT', args.stock)])
+
+    start_event = multiprocessing.Event()
+    results = multiprocessing.Queue()
+    procs = [multiprocessing.Process(target=desk, args=(db_path, i, args.attempts, start_event, results))
+             for i in range(args.procs)]
+    for p in procs:
+        p.start()
+    time.sleep(1)  # 等所有行程都連上資料庫再一起開始
+    started = time.perf_counter()
+    start_event.set()
+    totals = Counter()
+    for _ in procs:
+        totals.update(results.get())
+    for p in procs:
+        p.join()
+    elapsed = time.perf_counter() - started
+
+    with db.pool.connection() as conn:
+        available = conn.execute("SELECT Available FROM Books WHERE BookID = 'HOT'").fetchone()[0]
+        loans = conn.execute("SELECT COUNT(*) FROM Borrows WHERE BookID = 'HOT'").fetchone()[0]
+        counted = conn.execute("SELECT COALESCE(SUM(ActiveLoans), 0) FROM ReaderLoans").fetchone()[0]
+        # 每一冊只能被借出一次
+        copies_out = conn.execute("""
+            SELECT COUNT(DISTINCT Barcode) FROM Borrows WHERE BookID = 'HOT' AND ReturnDate IS NULL
+        """).fetchone()[0]
+    db.close()
+    for name in os.listdir(tmp_dir):
+        os.remove(os.path.join(tmp_dir, name))
+    os.rmdir(tmp_dir)
+
+    attempts = args.procs * args.attempts
+    print(f"{attempts} 次借閱 / {elapsed:.2f}s ({attempts / elapsed:.0f} 次/秒): {dict(totals)}")
+    print(f"剩餘庫存 {available}，借閱紀錄 {loans} 筆，讀者借閱中本數合計 {counted}")
+    ok = (available == 0 and loans == args.stock == totals['ok'] == counted == copies_out and not totals['error'])
+    print("✅ 庫存與借閱紀錄一致" if ok else "❌ 庫存與借閱紀錄不一致！")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
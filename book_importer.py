@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+###########################################################################
+## book_importer.py - 大量匯入書目 (CSV / MARC21 ISO2709)
+## 命令列: python book_importer.py catalogue.csv
+##         python book_importer.py catalogue.mrc --format marc --batch 100000
+###########################################################################
+
+import argparse
+import csv
+import logging
+import os
+import time
+
+from migrations import restore_search_index
+
+log = logging.getLogger(__name__)
+
+# CSV 欄位名稱 (不分大小寫，中英文皆可)
+CSV_COLUMNS = {
+    'bookid': 0, '書號': 0,
+    'title': 1, '書名': 1,
+    'author': 2, '作者': 2,
+    'isbn': 3,
+    'available': 4, '庫存': 4,
+}
+
+FIELD_TERMINATOR = b'\x1e'
+SUBFIELD_DELIMITER = b'\x1f'
+RECORD_TERMINATOR = b'\x1d'
+
+
+# =======================================================================
+# 讀取器：都是 generator，一次只讀一筆，檔案再大記憶體用量也固定
+# 每筆產生 (BookID, Title, Author, ISBN, Available)
+# =======================================================================
+def read_csv(path, encoding='utf-8-sig', errors=None):
+    """
+    第一列是欄位名稱 (見 CSV_COLUMNS)。格式錯誤的列 (缺 BookID/書名、庫存不是非負整數) 會略過並寫進日誌，
+    不會讓匯入做到一半才中斷 (前面的批次已經寫進資料庫了)；
+    傳入 errors (list) 時，略過的列以 (行號, 原因) 加進去
+    """
+    def skip(reason):
+        log.warning("CSV 第 %d 行略過：%s", reader.line_num, reason)
+        if errors is not None:
+            errors.append((reader.line_num, reason))
+
+    with open(path, newline='', encoding=encoding) as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return
+        positions = {}
+        for i, name in enumerate(header):
+            key = CSV_COLUMNS.get(name.strip().lower())
+            if key is not None:
+                positions[key] = i
+        if 0 not in positions or 1 not in positions:
+            raise ValueError("CSV 至少要有 BookID 與 Title 欄位")
+
+        for row in reader:
+            if not row:
+                continue
+            values = [row[positions[k]].strip() if k in positions and positions[k] < len(row) else '' for k in range(5)]
+            if not values[0] or not values[1]:
+                skip("缺少 BookID 或書名")
+                continue
+            try:
+                values[4] = int(values[4]) if values[4] else 1
+            except ValueError:
+                values[4] = -1
+            if values[4] < 0:
+                skip(f"庫存不是非負整數: {row[positions[4]]!r}")
+                continue
+            yield tuple(values)
+
+
+def read_marc(path):
+    """
+    MARC21 交換格式 (ISO 2709)
+    001 控制號 -> BookID (沒有時用 ISBN)，245 $a$b -> 書名，100/110/700 $a -> 作者，020 $a -> ISBN
+    只支援 UTF-8 編碼的紀錄 (Leader 第 9 碼為 'a')；MARC-8 紀錄以 UTF-8 盡量解碼
+    """
+    with open(path, 'rb') as f:
+        while True:
+            length = f.read(5)
+            if len(length) < 5 or not length.strip(b'\r\n '):
+                return
+            record = length + f.read(int(length) - 5)
+            book = _parse_marc_record(record)
+            if book:
+                yield book
+
+
+def _parse_marc_record(record):
+    base = int(record[12:17])
+    directory = record[24:base - 1]
+    fields = {}
+    for i in range(0, len(directory), 12):
+        entry = directory[i:i + 12]
+        tag = entry[:3].decode('ascii')
+        size, start = int(entry[3:7]), int(entry[7:12])
+        data = record[base + start:base + start + size].rstrip(FIELD_TERMINATOR + RECORD_TERMINATOR)
+        fields.setdefault(tag, []).append(data)
+
+    def text(data):
+        return data.decode('utf-8', errors='replace').strip()
+
+    def subfields(tag, codes):
+        """
+        回傳第一個 tag 欄位中指定子欄位的內容
+        編目時每個子欄位後面會接下一個子欄位的 ISBD 標點 (" /" " :" " ;")，接起來之前先去掉
+        """
+        for data in fields.get(tag, []):
+            parts = [text(p[1:]).rstrip(" /:;")
+                     for p in data[2:].split(SUBFIELD_DELIMITER) if p and chr(p[0]) in codes]
+            if parts:
+                return " ".join(parts).strip(" /:;,.")
+        return ''
+
+    isbn = subfields('020', 'a').split(' ')[0]
+    book_id = text(fields['001'][0]) if '001' in fields else isbn
+    title = subfields('245', 'ab')
+    if not book_id or not title:
+        return None
+    author = subfields('100', 'a') or subfields('110', 'a') or subfields('700', 'a')
+    return (book_id, title, author, isbn, 1)
+
+
+# =======================================================================
+# 匯入
+# =======================================================================
+def import_books(db, records, batch_size=50000, rebuild_indexes=True, progress=None):
+    """
+    把 records (可以是 generator) 分批寫進 Books，回傳匯入筆數。BookID 重複時以新資料覆蓋書目。
+    Available 欄位是館藏冊數：每批寫完書目後補足館藏 (Copies)，已經有的冊不會重複建立，也不會刪除。
+
+    rebuild_indexes=True (大量匯入用)：先拿掉書名索引與全文索引觸發器，全部寫完再一次重建，
+    比每筆都更新索引快很多；匯入期間搜尋不到新寫入的書。只加幾本書時傳 False，交給觸發器逐筆更新即可。
+    progress(已匯入筆數, 每秒筆數) 每批呼叫一次，預設寫進日誌。
+    """
+    if progress is None:
+        progress = lambda n, rate: log.info("已匯入 %d 筆 (%.0f 筆/秒)", n, rate)
+
+    if rebuild_indexes:
+        with db.pool.transaction() as conn:
+            conn.execute("DROP INDEX IF EXISTS idx_books_title")
+            for name in ('Books_fts_insert', 'Books_fts_update', 'Books_fts_delete'):
+                conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+
+    # Available 由館藏的觸發器計算，新書先寫 0
+    sql = """
+        INSERT INTO Books (BookID, Title, Author, ISBN, Available) VALUES (?, ?, ?, ?, 0)
+        ON CONFLICT(BookID) DO UPDATE SET Title = excluded.Title, Author = excluded.Author, ISBN = excluded.ISBN
+    """
+
+    def write(batch):
+        with db.pool.transaction() as conn:
+            conn.executemany(sql, (record[:4] for record in batch))
+        db.add_copies([(record[0], record[4]) for record in batch], top_up=True)
+
+    total = 0
+    start = time.perf_counter()
+    try:
+        batch = []
+        for record in records:
+            batch.append(record)
+            if len(batch) >= batch_size:
+                write(batch)
+                total += len(batch)
+                batch = []
+                progress(total, total / (time.perf_counter() - start))
+        if batch:
+            write(batch)
+            total += len(batch)
+            progress(total, total / (time.perf_counter() - start))
+    finally:
+        # 匯入中途失敗也要把索引裝回去，否則之後新增的書搜尋不到
+        # (整個程式被關掉、連這裡都沒跑到的話，下次啟動 DBManager 會用 check_search_index 補回)
+        if rebuild_indexes:
+            with db.pool.transaction() as conn:
+                restore_search_index(conn)
+
+    db.clear_book_caches()
+    elapsed = time.perf_counter() - start
+    log.info("匯入完成：%d 筆，耗時 %.1fs (%.0f 筆/秒)", total, elapsed, total / max(elapsed, 1e-9))
+    return total
+
+
+def open_records(path, fmt=None, errors=None):
+    """依副檔名 (或指定的 fmt) 選擇讀取器；errors 見 read_csv"""
+    if fmt is None:
+        fmt = 'marc' if os.path.splitext(path)[1].lower() in ('.mrc', '.marc', '.iso') else 'csv'
+    return read_marc(path) if fmt == 'marc' else read_csv(path, errors=errors)
+
+
+def main():
+    from db_manager import DB_PATH, DBManager
+    from instrumentation import setup_logging
+
+    parser = argparse.ArgumentParser(description="大量匯入書目到圖書館資料庫")
+    parser.add_argument('path', help="CSV 或 MARC (.mrc) 檔案")
+    parser.add_argument('--format', choices=['csv', 'marc'], help="預設依副檔名判斷")
+    parser.add_argument('--batch', type=int, default=50000, help="每個交易寫入的筆數")
+    parser.add_argument('--db', default=DB_PATH)
+    parser.add_argument('--keep-indexes', action='store_true', help="不拿掉索引 (少量匯入時使用)")
+    args = parser.parse_args()
+
+    setup_logging()
+    db = DBManager(args.db)
+    errors = []
+    import_books(db, open_records(args.path, args.format, errors), batch_size=args.batch,
+                 rebuild_indexes=not args.keep_indexes)
+    db.close()
+    if errors:
+        log.warning("共略過 %d 列格式錯誤的資料 (行號: %s)", len(errors),
+                    ", ".join(str(line) for line, _ in errors[:20]) + (" ..." if len(errors) > 20 else ""))
+
+
+if __name__ == '__main__':
+    main()
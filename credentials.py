@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+###########################################################################
+## credentials.py - 密碼雜湊 (加鹽 scrypt，不支援時用 PBKDF2) 與雜湊成本的校正
+## 校正: python credentials.py --budget-ms 100
+##       依這台機器的速度找出「一次登入驗證不超過 budget-ms」的最高成本，
+##       把印出的設定值放進環境變數 LIBRARY_PASSWORD_COST (例如 scrypt:14 或 pbkdf2:600000)
+###########################################################################
+##
+## Readers.Password 存的格式:
+##   scrypt$<log2 N>$<r>$<p>$<salt base64>$<hash base64>
+##   pbkdf2_sha256$<次數>$<salt base64>$<hash base64>
+##   其他 (沒有 $ 前綴的舊資料) 視為明文，登入成功時 DBManager.verify_login 會順便改存雜湊
+
+import argparse
+import base64
+import hashlib
+import hmac
+import logging
+import os
+import time
+from collections import namedtuple
+
+SALT_BYTES = 16
+HASH_BYTES = 32
+SCRYPT_R = 8
+SCRYPT_P = 1
+
+log = logging.getLogger(__name__)
+
+
+class HashCost(namedtuple('HashCost', ['scheme', 'work'])):
+    """
+    雜湊成本；scheme 為 'scrypt' (work = log2 N) 或 'pbkdf2_sha256' (work = 迭代次數)
+    成本越高每次登入越慢，被偷走的雜湊也越難暴力破解
+    """
+    __slots__ = ()
+
+    @classmethod
+    def parse(cls, text):
+        """'scrypt:14' / 'pbkdf2:600000' -> HashCost"""
+        scheme, _, work = text.partition(':')
+        scheme = {'pbkdf2': 'pbkdf2_sha256'}.get(scheme, scheme)
+        if scheme not in ('scrypt', 'pbkdf2_sha256') or not work.isdigit():
+            raise ValueError(f"無效的密碼雜湊成本: {text!r}")
+        if scheme == 'scrypt' and not hasattr(hashlib, 'scrypt'):
+            raise ValueError("這個 Python 的 hashlib 不支援 scrypt (需要 OpenSSL 1.1 以上)")
+        return cls(scheme, int(work))
+
+    def __str__(self):
+        return f"{'pbkdf2' if self.scheme == 'pbkdf2_sha256' else self.scheme}:{self.work}"
+
+
+# scrypt N = 2^14 (16 MB 記憶體，一般桌機約 50 ms)；沒有 scrypt 時用 OWASP 建議的 PBKDF2-SHA256 次數
+if os.environ.get('LIBRARY_PASSWORD_COST'):
+    DEFAULT_COST = HashCost.parse(os.environ['LIBRARY_PASSWORD_COST'])
+elif hasattr(hashlib, 'scrypt'):
+    DEFAULT_COST = HashCost('scrypt', 14)
+else:
+    DEFAULT_COST = HashCost('pbkdf2_sha256', 600000)
+
+
+def _b64(data):
+    return base64.b64encode(data).decode('ascii')
+
+
+def _derive(scheme, work, password, salt, r=SCRYPT_R, p=SCRYPT_P, length=HASH_BYTES):
+    password = password.encode('utf-8')
+    if scheme == 'scrypt':
+        n = 1 << work
+        # OpenSSL 預設只允許 32 MB，N 較大時要放寬 maxmem
+        return hashlib.scrypt(password, salt=salt, n=n, r=r, p=p, dklen=length, maxmem=129 * r * (n + p) + (1 << 20))
+    return hashlib.pbkdf2_hmac('sha256', password, salt, work, length)
+
+
+def hash_password(password, cost=None):
+    """產生要存進資料庫的雜湊字串 (每次都是新的隨機 salt)"""
+    cost = cost or DEFAULT_COST
+    salt = os.urandom(SALT_BYTES)
+    digest = _derive(cost.scheme, cost.work, password, salt)
+    if cost.scheme == 'scrypt':
+        return f"scrypt${cost.work}${SCRYPT_R}${SCRYPT_P}${_b64(salt)}${_b64(digest)}"
+    return f"pbkdf2_sha256${cost.work}${_b64(salt)}${_b64(digest)}"
+
+
+def is_hashed(stored):
+    return bool(stored) and stored.startswith(('scrypt$', 'pbkdf2_sha256$'))
+
+
+def verify_password(password, stored, cost=None):
+    """
+    檢查密碼，回傳 (是否正確, 是否需要重新雜湊)
+    需要重新雜湊：舊的明文資料，或雜湊成本和目前設定 (cost) 不同；呼叫端在登入成功後改存 hash_password() 的結果
+    比對一律用 hmac.compare_digest，花的時間不會透露比對到第幾個字元
+    """
+    cost = cost or DEFAULT_COST
+    if not stored:
+        return False, False
+    if not is_hashed(stored):
+        # 舊版直接存明文
+        return hmac.compare_digest(password.encode('utf-8'), stored.encode('utf-8')), True
+    try:
+        parts = stored.split('$')
+        if parts[0] == 'scrypt':
+            _, work, r, p, salt, digest = parts
+            expected = base64.b64decode(digest)
+            actual = _derive('scrypt', int(work), password, base64.b64decode(salt), int(r), int(p), len(expected))
+        else:
+            _, work, salt, digest = parts
+            expected = base64.b64decode(digest)
+            actual = _derive(parts[0], int(work), password, base64.b64decode(salt), length=len(expected))
+    except (ValueError, TypeError):
+        log.error("無法解析的密碼雜湊: %s...", stored[:20])
+        return False, False
+    ok = hmac.compare_digest(actual, expected)
+    return ok, ok and (parts[0], int(work)) != (cost.scheme, cost.work)
+
+
+# 查無此帳號時也跑一次同樣成本的雜湊，讓回應時間不會透露帳號是否存在
+_dummy_hashes = {}
+
+
+def dummy_verify(password, cost=None):
+    cost = cost or DEFAULT_COST
+    if cost not in _dummy_hashes:
+        _dummy_hashes[cost] = hash_password('', cost)
+    verify_password(password, _dummy_hashes[cost], cost)
+    return False
+
+
+def calibrate_cost(budget_ms=100, scheme=None):
+    """
+    依這台機器的速度，找出一次驗證不超過 budget_ms 毫秒的最高成本 (回傳 HashCost)
+    scrypt: 從 N = 2^12 往上加倍，取最後一個不超過預算的；PBKDF2: 量一次再依比例換算次數
+    """
+    scheme = scheme or DEFAULT_COST.scheme
+
+    def measure(work):
+        best = None
+        for _ in range(3):
+            start = time.perf_counter()
+            _derive(scheme, work, 'calibrate', b'\0' * SALT_BYTES)
+            elapsed = (time.perf_counter() - start) * 1000
+            best = elapsed if best is None else min(best, elapsed)
+        return best
+
+    if scheme == 'scrypt':
+        work = 12
+        while work < 20 and measure(work + 1) <= budget_ms:
+            work += 1
+        return HashCost(scheme, work)
+    elapsed = measure(50000)
+    return HashCost(scheme, max(10000, int(50000 * budget_ms / elapsed) // 1000 * 1000))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="依登入時間預算校正密碼雜湊成本")
+    parser.add_argument('--budget-ms', type=float, default=100, help="一次登入驗證最多花幾毫秒")
+    parser.add_argument('--scheme', choices=['scrypt', 'pbkdf2_sha256'], default=DEFAULT_COST.scheme)
+    args = parser.parse_args()
+
+    cost = calibrate_cost(args.budget_ms, args.scheme)
+    start = time.perf_counter()
+    verify_password('calibrate', hash_password('calibrate', cost), cost)
+    elapsed = (time.perf_counter() - start) * 1000 / 2
+    print(f"🔐 建議成本: LIBRARY_PASSWORD_COST={cost} (一次約 {elapsed:.0f} ms，單核每秒約 {1000 / elapsed:.0f} 次登入)")
+    print(f"   目前使用: {DEFAULT_COST}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+###########################################################################
+## db_cache.py - 查詢結果快取 (LRU + TTL)
+###########################################################################
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    容量有上限的 LRU 快取，每筆資料超過 ttl 秒就視為過期。可以被多個執行緒同時使用。
+
+    get_or_load(key, loader) 是主要用法：快取沒有時呼叫 loader() 讀資料庫並存起來。
+    寫入資料後呼叫 invalidate(key)。讀取資料庫的期間如果剛好有人 invalidate，
+    讀到的可能是舊資料，這時候就不存進快取，避免把過時的資料放回去。
+    loader() 回傳 None (查無資料) 時不快取，之後新增的資料可以馬上查到。
+    """
+
+    def __init__(self, maxsize=1024, ttl=300.0, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self._data = OrderedDict()   # key -> (過期時間, value)
+        self._lock = threading.Lock()
+        self._generation = 0         # 每次 invalidate/clear 加一
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_load(self, key, loader):
+        now = self.clock()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] > now:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            generation = self._generation
+
+        value = loader()
+        if value is not None:
+            with self._lock:
+                if generation == self._generation:
+                    self._put(key, value)
+        return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._put(key, value)
+
+    def _put(self, key, value):
+        self._data[key] = (self.clock() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def invalidate(self, *keys):
+        with self._lock:
+            self._generation += 1
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'size': len(self._data),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+            }
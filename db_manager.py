@@ -1,157 +1,994 @@
 # -*- coding: utf-8 -*-
-import sqlite3
+import logging
 import os
-from datetime import datetime, timedelta
+import sqlite3
+from collections import Counter, defaultdict, namedtuple
+from datetime import date, timedelta
+
+from credentials import DEFAULT_COST, dummy_verify, hash_password, verify_password
+from db_cache import LRUCache
+from db_pool import ConnectionPool
+from instrumentation import timed, timings
+from migrations import SCHEMA_VERSION, check_search_index, current_version, migrate
+from query_profiler import QueryProfiler
+from suggest_index import PrefixIndex
+
+log = logging.getLogger(__name__)
 
 # 1. 先設定路徑 (在類別外面)
 current_dir = os.path.dirname(os.path.abspath(__file__))
-DB_PATH = os.path.join(current_dir, 'library.db')
+# 可用環境變數 LIBRARY_DB 指定其他資料庫檔案 (測試、效能量測時使用)
+DB_PATH = os.environ.get('LIBRARY_DB') or os.path.join(current_dir, 'library.db')
+# 設定 LIBRARY_PROFILE_SQL=<毫秒> 時剖析每個 SQL (query_profiler.py)，超過這個時間的記下查詢計畫
+PROFILE_SQL_MS = os.environ.get('LIBRARY_PROFILE_SQL')
+
+LOAN_DAYS = 14  # 借期 (天)
+HOLD_DAYS = 3   # 預約的書到館後保留幾天
+LOAN_LIMIT = 20 # 每位讀者同時最多借幾本 (DBManager.loan_limit 可以另外設定，None 為不限)
+INITIAL_PASSWORD = '123456'  # 管理員新增的讀者預設密碼 (存雜湊)
+DEFAULT_BRANCH = '總館'  # 新增館藏時預設的分館
+# 館藏狀態中可以手動設定的 (借出中 on_loan、保留中 held 由借還書與預約流程處理)
+COPY_STATUSES = ('available', 'repair', 'lost', 'withdrawn')
+
+# 借閱日期在資料庫裡存成 1970-01-01 起算的天數 (整數)，進出資料庫時用下面兩個函式轉換
+EPOCH = date(1970, 1, 1)
+
+
+def to_day(d):
+    """date -> 資料庫的整數天數"""
+    return (d - EPOCH).days
+
+
+def from_day(n):
+    """資料庫的整數天數 -> date (None 維持 None)"""
+    return None if n is None else EPOCH + timedelta(days=n)
+
+
+class BorrowResult(namedtuple('BorrowResult', ['status', 'borrow_id', 'barcode'])):
+    """
+    借閱結果；沿用舊的寫法 if db.borrow_book(...) 時，只有成功才是 True
+    barcode: 借出的是哪一冊
+    """
+    OK = 'ok'
+    OUT_OF_STOCK = 'out_of_stock'
+    UNKNOWN_READER = 'unknown_reader'
+    UNKNOWN_BOOK = 'unknown_book'
+    UNKNOWN_COPY = 'unknown_copy'
+    COPY_UNAVAILABLE = 'copy_unavailable'
+    LIMIT_REACHED = 'limit_reached'
+    ERROR = 'error'
+
+    MESSAGES = {
+        OK: "借閱成功",
+        OUT_OF_STOCK: "目前已無庫存",
+        LIMIT_REACHED: "已達借閱本數上限，請先歸還部分書籍",
+        UNKNOWN_READER: "讀者帳號無效",
+        UNKNOWN_BOOK: "查無此書",
+        UNKNOWN_COPY: "查無此條碼",
+        COPY_UNAVAILABLE: "這一冊目前不能借出 (已借出、保留給其他讀者或不在架上)",
+        ERROR: "資料庫錯誤，請稍後再試",
+    }
+
+    def __new__(cls, status, borrow_id=None, barcode=None):
+        return super().__new__(cls, status, borrow_id, barcode)
+
+    def __bool__(self):
+        return self.status == self.OK
+
+    @property
+    def message(self):
+        return self.MESSAGES.get(self.status, self.status)
+
+
+class ReturnResult(namedtuple('ReturnResult', ['status', 'borrow_id', 'hold_for'])):
+    """
+    還書結果；成功時 bool(result) 為 True
+    hold_for: 這本書有人預約時，保留給哪位讀者 (ReaderID)，櫃台應該把書放到預約書架
+    """
+    OK = 'ok'
+    NOT_BORROWED = 'not_borrowed'
+    ERROR = 'error'
+
+    def __new__(cls, status, borrow_id=None, hold_for=None):
+        return super().__new__(cls, status, borrow_id, hold_for)
+
+    def __bool__(self):
+        return self.status == self.OK
+
+
+class ReserveResult(namedtuple('ReserveResult', ['status', 'reservation_id', 'position'])):
+    """預約結果；成功時 bool(result) 為 True，position 是排在第幾位 (從 1 開始)"""
+    OK = 'ok'
+    AVAILABLE = 'available'
+    ALREADY_RESERVED = 'already_reserved'
+    UNKNOWN_READER = 'unknown_reader'
+    UNKNOWN_BOOK = 'unknown_book'
+    ERROR = 'error'
+
+    MESSAGES = {
+        OK: "預約成功",
+        AVAILABLE: "這本書目前還有庫存，可以直接借閱",
+        ALREADY_RESERVED: "您已經預約過這本書",
+        UNKNOWN_READER: "讀者帳號無效",
+        UNKNOWN_BOOK: "查無此書",
+        ERROR: "資料庫錯誤，請稍後再試",
+    }
+
+    def __new__(cls, status, reservation_id=None, position=None):
+        return super().__new__(cls, status, reservation_id, position)
+
+    def __bool__(self):
+        return self.status == self.OK
+
+    @property
+    def message(self):
+        return self.MESSAGES.get(self.status, self.status)
+
+
+def _chunks(items, size=500):
+    """把 IN (...) 的參數切段，避免超過 SQLite 的參數數量上限"""
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
 
 class DBManager:
-    def __init__(self, db_name=DB_PATH):
+    def __init__(self, db_name=DB_PATH, profiler=None):
         self.db_name = db_name
+        # SQL 剖析 (預設關閉)：可直接傳入 QueryProfiler，或用環境變數 LIBRARY_PROFILE_SQL 開啟
+        if profiler is None and PROFILE_SQL_MS:
+            profiler = QueryProfiler(slow_ms=float(PROFILE_SQL_MS))
+        self.profiler = profiler
+        # 查詢快取：登入、熱門書籍重複查詢時不必每次都讀資料庫
+        # (只有經由這個 DBManager 的寫入會清除快取；其他程式直接改資料庫時，最多過 ttl 秒後才會看到)
+        self.reader_cache = LRUCache(maxsize=4096, ttl=300)   # ReaderID -> 讀者資料
+        self.book_cache = LRUCache(maxsize=4096, ttl=300)     # BookID -> 書籍資料
+        self.title_cache = LRUCache(maxsize=4096, ttl=300)    # 搜尋字串 -> 最相關的 BookID
+        # 書目 (書名/作者/ISBN) 每次變動加一，搜尋建議索引用它判斷自己是否過時
+        self.catalogue_version = 0
+        self.loan_limit = LOAN_LIMIT
+        # 密碼雜湊成本 (credentials.py；環境變數 LIBRARY_PASSWORD_COST 可調整)，成本不同的舊雜湊登入時會重算
+        self.password_cost = DEFAULT_COST
         try:
-            # 2. 建立連線 (在方法裡面，可以使用 self)
-            self.conn = sqlite3.connect(self.db_name)
-            self.cursor = self.conn.cursor()
+            # 2. 建立連線池 (每個執行緒各自一條連線，背景執行緒也能查詢)
+            self.pool = ConnectionPool(self.db_name,
+                                       factory=profiler.connection_factory() if profiler else sqlite3.Connection)
             self.initialize_db()
-            
-            # 這裡的 self 是正確的
-            print(f"✅ 資料庫連線成功！檔案位置: {os.path.abspath(self.db_name)}")
-            
-            # 測試是否真的有書
-            self.cursor.execute("SELECT Title FROM Books")
-            print(f"📚 目前資料庫內的書單: {self.cursor.fetchall()}")
-            
+            log.info("資料庫連線成功，檔案位置: %s", os.path.abspath(self.db_name))
         except Exception as e:
-            print(f"❌ 資料庫連線失敗: {e}")
+            log.exception("資料庫連線失敗: %s", e)
 
     def initialize_db(self):
-        """建立表格並初始化資料"""
-        self.cursor.execute("CREATE TABLE IF NOT EXISTS Books (BookID TEXT PRIMARY KEY, Title TEXT, Author TEXT, ISBN TEXT, Available INTEGER)")
-        self.cursor.execute("CREATE TABLE IF NOT EXISTS Readers (ReaderID TEXT PRIMARY KEY, Name TEXT, Email TEXT, Password TEXT, Credit INTEGER)")
-        self.cursor.execute("CREATE TABLE IF NOT EXISTS Borrows (BorrowID INTEGER PRIMARY KEY AUTOINCREMENT, BookID TEXT, ReaderID TEXT, BorrowDate TEXT, DueDate TEXT, ReturnDate TEXT)")
-        self.conn.commit()
-
-        # 檢查並插入初始資料
-        self.cursor.execute("SELECT COUNT(*) FROM Books")
-        if self.cursor.fetchone()[0] == 0:
-            books = [
-                ('B001', 'Python 入門指南', '張大文', '978-001', 5),
-                ('B002', 'C++ 入門指南', '李小美', '978-002', 2),
-                ('B003', '資料庫實務', '王老五', '978-003', 3)
-            ]
-            self.cursor.executemany("INSERT INTO Books VALUES (?,?,?,?,?)", books)
-            self.cursor.execute("INSERT OR IGNORE INTO Readers VALUES ('admin', '管理員', 'admin@mail.com', 'admin123', 999)")
-            self.conn.commit()
-
-    # ... (後續的 get_book_by_title 等方法請確保都在 class 內)
-
-        # 初始化書籍與管理員
-        self.cursor.execute("SELECT COUNT(*) FROM Books")
-        if self.cursor.fetchone()[0] == 0:
-            books = [
-                ('B001', 'Python 入門指南', '張大文', '978-001', 5),
-                ('B002', 'C++ 入門指南', '李小美', '978-002', 2),
-                ('B003', '資料庫實務', '王老五', '978-003', 3)
-            ]
-            self.cursor.executemany("INSERT INTO Books VALUES (?,?,?,?,?)", books)
-            self.cursor.execute("INSERT OR IGNORE INTO Readers VALUES ('admin', '管理員', 'admin@mail.com', 'admin123', 999)")
-            self.conn.commit()
+        """建立/升級資料表並初始化資料"""
+        with self.pool.connection() as conn:
+            # 結構已是最新版 (平常每次啟動都是這樣)：只讀一個 PRAGMA、確認批次匯入沒有中途中斷就結束
+            if current_version(conn) == SCHEMA_VERSION:
+                check_search_index(conn)
+                return
+            migrate(conn)
+            check_search_index(conn)
+
+        with self.pool.transaction() as conn:
+            # 檢查並插入初始資料
+            if conn.execute("SELECT 1 FROM Books LIMIT 1").fetchone() is None:
+                books = [
+                    ('B001', 'Python 入門指南', '張大文', '978-001', 5),
+                    ('B002', 'C++ 入門指南', '李小美', '978-002', 2),
+                    ('B003', '資料庫實務', '王老五', '978-003', 3)
+                ]
+                # Available 由館藏 (Copies) 的觸發器計算，先寫 0 再新增每一冊
+                conn.executemany("INSERT INTO Books VALUES (?,?,?,?,0)", [book[:4] for book in books])
+                conn.execute("INSERT OR IGNORE INTO Readers VALUES ('admin', '管理員', 'admin@mail.com', ?, 999)",
+                             (hash_password('admin123', self.password_cost),))
+            else:
+                books = []
+        if books:
+            self.add_copies([(book[0], book[4]) for book in books])
+
+    @timed
+    def rebuild_search_index(self):
+        """
+        從 Books / Readers 重建整個全文索引 (BooksFTS、ReadersFTS)
+        注意：兩個表都不是 INTEGER PRIMARY KEY，VACUUM 之後 rowid 可能會被重新編號，全文索引就對不上了；
+        要整理資料庫檔案請用 vacuum()，它會順便重建。
+        """
+        with self.pool.transaction() as conn:
+            conn.execute("INSERT INTO BooksFTS(BooksFTS) VALUES ('rebuild')")
+            conn.execute("INSERT INTO ReadersFTS(ReadersFTS) VALUES ('rebuild')")
+
+    @timed
+    def vacuum(self):
+        """整理資料庫檔案 (VACUUM)，完成後依新的 rowid 重建全文索引"""
+        with self.pool.connection() as conn:
+            conn.execute("VACUUM")
+        self.rebuild_search_index()
+
+    def _search_clause(self, query):
+        """
+        把搜尋字串轉成 FROM/WHERE 子句，回傳 (sql, params, 排序欄位)
+        排序欄位為 (主要排序, rowid)：走全文索引時依相關度 (bm25)，否則依書名
+        查詢欄位固定為 b.rowid, BookID, Title, Author, ISBN, Available
+        """
+        terms = query.split()
 
+        # trigram 至少要 3 個字元才能查索引；太短的關鍵字 (例如「入門」) 改成在候選結果上用 LIKE 過濾
+        long_terms = [t for t in terms if len(t) >= 3]
+        short_terms = [t for t in terms if len(t) < 3]
+
+        short_sql = ""
+        params = []
+        for t in short_terms[0 if long_terms else 1:]:
+            short_sql += " AND (b.Title LIKE ? OR b.Author LIKE ? OR b.ISBN LIKE ?)"
+            params += ['%' + t + '%'] * 3
+
+        if long_terms:
+            # 每個關鍵字當成一個片語 (雙引號跳脫)，多個關鍵字之間為 AND
+            match = " ".join('"' + t.replace('"', '""') + '"' for t in long_terms)
+            sql = f"FROM BooksFTS f JOIN Books b ON b.rowid = f.rowid WHERE BooksFTS MATCH ?{short_sql}"
+            return sql, [match] + params, ('f.rank', 'f.rowid')
+        # 全部關鍵字都太短：用不到全文索引，LIKE '%..%' 每次捲動、計算筆數都要掃描整張表，
+        # 所以退而求其次，第一個關鍵字只比對書名開頭 (走 idx_books_title 的範圍查詢，區分大小寫)
+        prefix = short_terms[0]
+        sql = f"FROM Books b WHERE b.Title >= ? AND b.Title < ?{short_sql}"
+        return sql, [prefix, prefix + '\U0010ffff'] + params, ('b.Title', 'b.rowid')
+
+    @timed
+    def search_books(self, query, limit=20, offset=0):
+        """
+        全文搜尋書名、作者、ISBN，依相關度 (bm25) 排序並分頁
+        回傳: [(BookID, Title, Author, ISBN, Available), ...]
+        """
+        if not query.split():
+            return []
+        clause, params, (order, _) = self._search_clause(query)
+        with self.pool.connection() as conn:
+            return conn.execute(
+                f"SELECT b.BookID, b.Title, b.Author, b.ISBN, b.Available {clause} ORDER BY {order} LIMIT ? OFFSET ?",
+                params + [limit, offset]).fetchall()
+
+    @timed
+    def search_books_after(self, query, after_key=None, limit=50):
+        """
+        keyset 分頁版的搜尋：和 search_books 一樣依相關度排序，從 after_key 之後取 limit 筆
+        key 是 (相關度或書名, rowid)，不需要 OFFSET，給結果清單捲動時逐頁讀取用
+        相關度要算完所有符合的列才能排序，每一頁的成本和 count_books 差不多，但不會隨頁數增加
+        回傳: (rows, 最後一筆的 key)
+        """
+        if not query.split():
+            return [], after_key
+        clause, params, (order, rowid) = self._search_clause(query)
+        if after_key is not None:
+            # FTS5 的 rank 不支援 (rank, rowid) > (?, ?) 這種 row value 比較 (會查不到資料)，要展開來寫
+            clause += f" AND ({order} > ? OR ({order} = ? AND {rowid} > ?))"
+            params = params + [after_key[0], after_key[0], after_key[1]]
+        with self.pool.connection() as conn:
+            result = conn.execute(
+                f"SELECT {order}, {rowid}, b.BookID, b.Title, b.Author, b.ISBN, b.Available {clause} "
+                f"ORDER BY {order}, {rowid} LIMIT ?",
+                params + [limit]).fetchall()
+        if not result:
+            return [], after_key
+        return [r[2:] for r in result], tuple(result[-1][:2])
+
+    @timed
+    def count_books(self, query):
+        """符合搜尋條件的書籍總數"""
+        if not query.split():
+            return 0
+        clause, params, _ = self._search_clause(query)
+        with self.pool.connection() as conn:
+            return conn.execute(f"SELECT COUNT(*) {clause}", params).fetchone()[0]
+
+    @timed
     def get_book_by_title(self, title):
-        self.cursor.execute("SELECT * FROM Books WHERE Title LIKE ?", ('%' + title + '%',))
-        return self.cursor.fetchone()
+        """回傳最相關的一本書 (沒有則回傳 None)"""
+        def load():
+            result = self.search_books(title, limit=1)
+            return result[0][0] if result else None
+        # 書名 -> BookID 的對應很少變；庫存等內容另外用 BookID 快取，借還書時只需清除那一本
+        bid = self.title_cache.get_or_load(title, load)
+        return self.get_book_by_id(bid) if bid else None
+
+    @timed
+    def get_book_by_id(self, bid):
+        def load():
+            with self.pool.connection() as conn:
+                return conn.execute("SELECT * FROM Books WHERE BookID = ?", (bid,)).fetchone()
+        return self.book_cache.get_or_load(bid, load)
+
+    def clear_book_caches(self):
+        """書目大量變動 (例如匯入) 後呼叫"""
+        self.book_cache.clear()
+        self.title_cache.clear()
+        self.catalogue_version += 1
 
+    @timed
+    def load_suggest_index(self):
+        """
+        讀出全部書名、作者、ISBN 建立搜尋建議用的 PrefixIndex (一百萬本書約需數秒，請在背景執行緒呼叫)
+        索引記下建立時的 catalogue_version，之後版本不同就代表需要重建
+        """
+        version = self.catalogue_version
+        with self.pool.connection() as conn:
+            # 直接迭代 cursor，不用 fetchall() 先把整個結果集放進記憶體
+            return PrefixIndex.build(conn.execute("SELECT Title, Author, ISBN FROM Books"), version)
+
+    def perf_stats(self):
+        """每個 DBManager 方法的呼叫次數與延遲 (instrumentation.timings)，以及最慢的幾次呼叫"""
+        return timings.snapshot('DBManager.'), timings.slowest()
+
+    def cache_stats(self):
+        return {
+            'readers': self.reader_cache.stats(),
+            'books': self.book_cache.stats(),
+            'titles': self.title_cache.stats(),
+        }
+
+    @timed(record_args=False)
     def register_reader(self, rid, name, email, pwd):
+        # 雜湊很花時間 (刻意的)，在交易外先算好，不要拿著寫入鎖等它
+        hashed = hash_password(pwd, self.password_cost)
         try:
-            self.cursor.execute("INSERT INTO Readers VALUES (?, ?, ?, ?, ?)", (rid, name, email, pwd, 100))
-            self.conn.commit()
+            with self.pool.transaction() as conn:
+                conn.execute("INSERT INTO Readers VALUES (?, ?, ?, ?, ?)", (rid, name, email, hashed, 100))
+            self.reader_cache.invalidate(rid)
             return True
         except: return False
 
+    @timed
     def get_all_readers(self):
-        self.cursor.execute("SELECT ReaderID, Name, Email, Credit FROM Readers WHERE ReaderID != 'admin'")
-        return self.cursor.fetchall()
+        with self.pool.connection() as conn:
+            return conn.execute("SELECT ReaderID, Name, Email, Credit FROM Readers WHERE ReaderID != 'admin'").fetchall()
+
+    # 讀者清單可排序的欄位 (清單欄位順序: 讀者編號, 姓名, E-Mail, 信用分)
+    READER_SORT_COLUMNS = ('ReaderID', 'Name', 'Email', 'Credit')
 
+    def _reader_filter(self, filter_text):
+        """
+        讀者清單的搜尋條件，回傳 (FROM/WHERE 子句, 參數)
+        3 個字元以上用 trigram 全文索引做子字串搜尋；1~2 個字元改用各欄位索引做前綴搜尋
+        """
+        text = filter_text.strip()
+        if len(text) >= 3:
+            match = '"' + text.replace('"', '""') + '"'
+            return ("FROM ReadersFTS f JOIN Readers r ON r.rowid = f.rowid "
+                    "WHERE ReadersFTS MATCH ? AND r.ReaderID != 'admin'"), [match]
+        if text:
+            upper = text + '\U0010ffff'
+            return ("FROM Readers r WHERE r.ReaderID != 'admin' AND ("
+                    "(r.ReaderID >= ? AND r.ReaderID < ?) OR (r.Name >= ? AND r.Name < ?) OR (r.Email >= ? AND r.Email < ?))"
+                    ), [text, upper] * 3
+        return "FROM Readers r WHERE r.ReaderID != 'admin'", []
+
+    @timed
+    def get_readers_page(self, after_key=None, limit=100, sort='ReaderID', descending=False, filter_text=''):
+        """
+        讀者清單的 keyset 分頁，排序與搜尋都在 SQL 端完成
+        sort: READER_SORT_COLUMNS 其中之一；after_key 為上一頁最後一筆的 (排序欄位值, ReaderID)
+        排序欄位都有 (欄位, ReaderID) 索引，翻到哪一頁都不需要 OFFSET
+        回傳: ([(ReaderID, Name, Email, Credit), ...], 最後一筆的 key)
+        """
+        if sort not in self.READER_SORT_COLUMNS:
+            raise ValueError(f"不支援的排序欄位: {sort}")
+        clause, params = self._reader_filter(filter_text)
+        op, direction = ('<', 'DESC') if descending else ('>', 'ASC')
+        if after_key is not None:
+            if sort == 'ReaderID':
+                clause += f" AND r.ReaderID {op} ?"
+                params = params + [after_key[1]]
+            else:
+                clause += f" AND (r.{sort}, r.ReaderID) {op} (?, ?)"
+                params = params + list(after_key)
+        order = f"r.ReaderID {direction}" if sort == 'ReaderID' else f"r.{sort} {direction}, r.ReaderID {direction}"
+
+        with self.pool.connection() as conn:
+            rows = conn.execute(
+                f"SELECT r.ReaderID, r.Name, r.Email, r.Credit {clause} ORDER BY {order} LIMIT ?",
+                params + [limit]).fetchall()
+        if not rows:
+            return rows, after_key
+        last = rows[-1]
+        return rows, (last[self.READER_SORT_COLUMNS.index(sort)], last[0])
+
+    @timed
+    def count_readers(self, filter_text=''):
+        with self.pool.connection() as conn:
+            if not filter_text.strip():
+                # 沒有 WHERE 的 COUNT(*) SQLite 會直接數 B-tree 頁面，比逐筆比對 ReaderID 快很多
+                total = conn.execute("SELECT COUNT(*) FROM Readers").fetchone()[0]
+                has_admin = conn.execute("SELECT 1 FROM Readers WHERE ReaderID = 'admin'").fetchone()
+                return total - (1 if has_admin else 0)
+            clause, params = self._reader_filter(filter_text)
+            return conn.execute(f"SELECT COUNT(*) {clause}", params).fetchone()[0]
+
+    @timed
+    def get_reader_row(self, rid):
+        """讀者清單用的單列資料 (ReaderID, Name, Email, Credit)"""
+        with self.pool.connection() as conn:
+            return conn.execute("SELECT ReaderID, Name, Email, Credit FROM Readers WHERE ReaderID = ?", (rid,)).fetchone()
+
+    @timed(record_args=False)
+    def verify_login(self, rid, pwd):
+        """
+        檢查帳號密碼，正確時回傳讀者資料 (同 get_reader_by_id)，否則回傳 None
+        雜湊驗證刻意很慢 (credentials.DEFAULT_COST)，請在背景執行緒呼叫。
+        舊的明文密碼或成本過時的雜湊在登入成功時改存新的雜湊；
+        UPDATE 帶上舊值當條件，兩個櫃台同時登入也只會有一個寫入。
+        """
+        with self.pool.connection() as conn:
+            row = conn.execute("SELECT Password FROM Readers WHERE ReaderID = ?", (rid,)).fetchone()
+        if row is None:
+            dummy_verify(pwd, self.password_cost)
+            return None
+        stored = row[0]
+        ok, rehash = verify_password(pwd, stored, self.password_cost)
+        if not ok:
+            return None
+        if rehash:
+            hashed = hash_password(pwd, self.password_cost)
+            with self.pool.transaction() as conn:
+                conn.execute("UPDATE Readers SET Password = ? WHERE ReaderID = ? AND Password = ?", (hashed, rid, stored))
+            self.reader_cache.invalidate(rid)
+        return self.get_reader_by_id(rid)
+
+    @timed
     def get_reader_by_id(self, rid):
-        self.cursor.execute("SELECT * FROM Readers WHERE ReaderID = ?", (rid,))
-        return self.cursor.fetchone()
+        def load():
+            with self.pool.connection() as conn:
+                return conn.execute("SELECT * FROM Readers WHERE ReaderID = ?", (rid,)).fetchone()
+        return self.reader_cache.get_or_load(rid, load)
 
+    @timed
     def borrow_book(self, rid, bid):
         """
         rid: 讀者 ID, bid: 書籍 ID
+        回傳 BorrowResult，成功時 bool(result) 為 True，result.barcode 是借出的那一冊
+
+        整個借閱在同一個 BEGIN IMMEDIATE 交易內完成：
+        從 idx_copies_book_status 挑一冊在架上的，用條件式 UPDATE 改成借出 (Status = 'available' 才改)，
+        兩個櫃台同時借最後一本時只有一個會成功；Books.Available 由觸發器跟著減一。
+        讀者預約的書已經到館保留時，直接借走保留的那一冊。
+        借閱上限看 ReaderLoans 的計數 (主鍵查找)，不必數讀者的借閱紀錄。
         """
-        # 1. 檢查讀者是否存在
-        self.cursor.execute("SELECT * FROM Readers WHERE ReaderID = ?", (rid,))
-        if not self.cursor.fetchone():
-            print("❌ 借閱失敗：讀者帳號無效")
-            return False
+        return self._borrow(rid, bid=bid)
+
+    @timed
+    def borrow_by_barcode(self, rid, barcode):
+        """
+        櫃台刷條碼借書：借的是手上這一冊 (主鍵查找就知道是哪本書、目前狀態)
+        讀者有一冊保留中的預約書，卻拿了架上另一冊來借時，保留的那一冊轉給下一位排隊的讀者或放回架上
+        """
+        return self._borrow(rid, barcode=barcode)
+
+    def _borrow(self, rid, bid=None, barcode=None):
+        # 借閱日與到期日 (整數天數)，借期 LOAN_DAYS 天
+        b_date = to_day(date.today())
+        d_date = b_date + LOAN_DAYS
 
-        # 2. 檢查書籍庫存
-        self.cursor.execute("SELECT Available FROM Books WHERE BookID = ?", (bid,))
-        res = self.cursor.fetchone()
-        
-        if res and res[0] > 0:
-            try:
-                # 3. 扣除庫存
-                self.cursor.execute("UPDATE Books SET Available = Available - 1 WHERE BookID = ?", (bid,))
-                
-                # 4. 計算日期
-                b_date = datetime.now().strftime("%Y-%m-%d")
-                # 借期 14 天
-                d_date = (datetime.now() + timedelta(days=14)).strftime("%Y-%m-%d")
-                
-                # 5. 新增借閱紀錄 (對應 Borrows 的 6 個欄位: BorrowID(自動), BookID, ReaderID, BorrowDate, DueDate, ReturnDate)
-                # 我們不填寫 BorrowID (自動增加) 和 ReturnDate (目前為 None)
-                sql = "INSERT INTO Borrows (BookID, ReaderID, BorrowDate, DueDate, ReturnDate) VALUES (?, ?, ?, ?, ?)"
-                self.cursor.execute(sql, (bid, rid, b_date, d_date, None))
-                
-                self.conn.commit()
-                print(f"✅ 借閱成功！書籍 {bid} 已借給讀者 {rid}")
-                return True
-            except Exception as e:
-                # 如果發生錯誤，將印在 Terminal (黑框) 給你看
-                print(f"❌ 借閱資料庫操作失敗，錯誤原因: {e}")
-                self.conn.rollback()
+        try:
+            with self.pool.transaction() as conn:
+                if self._loan_room(conn, rid) <= 0:
+                    log.info("借閱失敗：讀者 %s 已達借閱上限 %s 本", rid, self.loan_limit)
+                    return BorrowResult(BorrowResult.LIMIT_REACHED)
+                if not conn.execute("SELECT 1 FROM Readers WHERE ReaderID = ?", (rid,)).fetchone():
+                    log.info("借閱失敗：讀者帳號無效 (%s)", rid)
+                    return BorrowResult(BorrowResult.UNKNOWN_READER)
+                if barcode is not None:
+                    copy = conn.execute("SELECT BookID, Status FROM Copies WHERE Barcode = ?", (barcode,)).fetchone()
+                    if copy is None:
+                        log.info("借閱失敗：查無條碼 %s", barcode)
+                        return BorrowResult(BorrowResult.UNKNOWN_COPY)
+                    bid, copy_status = copy
+
+                # 這位讀者有沒有預約這本書 (走 idx_reservations_active，只查進行中的預約)
+                reservation = conn.execute("""
+                    SELECT ReservationID, Status, Barcode FROM Reservations
+                    WHERE BookID = ? AND ReaderID = ? AND Status IN ('waiting', 'ready')
+                """, (bid, rid)).fetchone()
+                held = reservation[2] if reservation and reservation[1] == 'ready' else None
+
+                if barcode is None and held:
+                    barcode = held
+                elif barcode is None:
+                    # 沒指定哪一冊：挑一冊在架上的直接改成借出
+                    row = conn.execute("""
+                        UPDATE Copies SET Status = 'on_loan'
+                        WHERE Barcode = (SELECT Barcode FROM Copies WHERE BookID = ? AND Status = 'available' LIMIT 1)
+                        RETURNING Barcode
+                    """, (bid,)).fetchone()
+                    if row is None:
+                        if not conn.execute("SELECT 1 FROM Books WHERE BookID = ?", (bid,)).fetchone():
+                            log.info("借閱失敗：書籍 %s 不存在", bid)
+                            return BorrowResult(BorrowResult.UNKNOWN_BOOK)
+                        log.info("借閱失敗：書籍 %s 已無庫存", bid)
+                        return BorrowResult(BorrowResult.OUT_OF_STOCK)
+                    barcode = row[0]
+                elif copy_status != 'available' and barcode != held:
+                    log.info("借閱失敗：%s 目前狀態為 %s", barcode, copy_status)
+                    return BorrowResult(BorrowResult.COPY_UNAVAILABLE)
+
+                conn.execute("UPDATE Copies SET Status = 'on_loan' WHERE Barcode = ? AND Status != 'on_loan'", (barcode,))
+                if held and held != barcode:
+                    self._allocate_holds(conn, [(held, bid)], b_date)
+                if reservation:
+                    conn.execute("UPDATE Reservations SET Status = 'fulfilled' WHERE ReservationID = ?", (reservation[0],))
+
+                # 新增借閱紀錄 (BorrowID 自動編號，ReturnDate 歸還時才填)
+                sql = "INSERT INTO Borrows (BookID, ReaderID, BorrowDate, DueDate, ReturnDate, Barcode) VALUES (?, ?, ?, ?, NULL, ?)"
+                borrow_id = conn.execute(sql, (bid, rid, b_date, d_date, barcode)).lastrowid
+
+            self.book_cache.invalidate(bid)
+            log.info("借閱成功：書籍 %s (%s) 已借給讀者 %s", bid, barcode, rid)
+            return BorrowResult(BorrowResult.OK, borrow_id, barcode)
+        except Exception as e:
+            # 交易已自動 rollback，錯誤連同 traceback 寫進日誌
+            log.exception("借閱資料庫操作失敗: %s", e)
+            return BorrowResult(BorrowResult.ERROR)
+
+    def _loan_room(self, conn, rid):
+        """讀者還能再借幾本 (在交易內呼叫；不限本數時回傳無限大)"""
+        if self.loan_limit is None:
+            return float('inf')
+        row = conn.execute("SELECT ActiveLoans FROM ReaderLoans WHERE ReaderID = ?", (rid,)).fetchone()
+        return self.loan_limit - (row[0] if row else 0)
+
+    @timed
+    def borrow_many(self, rid, bids):
+        """
+        一次借多本書 (櫃台一次刷 5~20 本)，全部在同一個交易內完成
+        回傳: [(BookID, BorrowResult), ...]，順序與 bids 相同；同一本書刷兩次會借兩冊
+
+        拿到寫入鎖後先一次讀出每本書在架上的冊 (每本最多讀需要的冊數)，在 Python 端分配，
+        再用 executemany 批次改館藏狀態、新增借閱紀錄，不必每本書各自一個交易。
+        """
+        bids = list(bids)
+        if not bids:
+            return []
+        b_date = to_day(date.today())
+        d_date = b_date + LOAN_DAYS
+
+        try:
+            with self.pool.transaction() as conn:
+                if not conn.execute("SELECT 1 FROM Readers WHERE ReaderID = ?", (rid,)).fetchone():
+                    log.info("借閱失敗：讀者帳號無效 (%s)", rid)
+                    return [(bid, BorrowResult(BorrowResult.UNKNOWN_READER)) for bid in bids]
+
+                wanted = Counter(bids)
+                known = set()
+                shelf = defaultdict(list)  # BookID -> 在架上的條碼
+                reservations = {}  # BookID -> (ReservationID, Status, Barcode)，這位讀者進行中的預約
+                for chunk in _chunks(list(wanted)):
+                    marks = ','.join('?' * len(chunk))
+                    known.update(row[0] for row in conn.execute(f"SELECT BookID FROM Books WHERE BookID IN ({marks})", chunk))
+                    for bid, barcode in conn.execute(f"""
+                        SELECT BookID, Barcode FROM (
+                            SELECT BookID, Barcode, ROW_NUMBER() OVER (PARTITION BY BookID) AS n
+                            FROM Copies WHERE BookID IN ({marks}) AND Status = 'available'
+                        ) WHERE n <= ?
+                    """, chunk + [max(wanted.values())]):
+                        shelf[bid].append(barcode)
+                    for bid, res_id, status, barcode in conn.execute(f"""
+                        SELECT BookID, ReservationID, Status, Barcode FROM Reservations
+                        WHERE ReaderID = ? AND BookID IN ({marks}) AND Status IN ('waiting', 'ready')
+                    """, [rid] + chunk):
+                        reservations[bid] = (res_id, status, barcode)
+                # 已經保留給這位讀者的冊
+                holds = {bid: barcode for bid, (_, status, barcode) in reservations.items() if status == 'ready'}
+                room = self._loan_room(conn, rid)
+
+                outcomes = []  # (status, barcode)
+                for bid in bids:
+                    if bid not in known:
+                        outcomes.append((BorrowResult.UNKNOWN_BOOK, None))
+                    elif room <= 0:
+                        outcomes.append((BorrowResult.LIMIT_REACHED, None))
+                    elif bid in holds or shelf[bid]:
+                        room -= 1
+                        outcomes.append((BorrowResult.OK, holds.pop(bid) if bid in holds else shelf[bid].pop()))
+                    else:
+                        outcomes.append((BorrowResult.OUT_OF_STOCK, None))
+
+                loans = [(bid, rid, b_date, d_date, barcode)
+                         for bid, (st, barcode) in zip(bids, outcomes) if st == BorrowResult.OK]
+                if loans:
+                    conn.executemany("UPDATE Copies SET Status = 'on_loan' WHERE Barcode = ?", [(loan[4],) for loan in loans])
+                    conn.executemany("UPDATE Reservations SET Status = 'fulfilled' WHERE ReservationID = ?",
+                                     [(reservations[bid][0],) for bid in {loan[0] for loan in loans} if bid in reservations])
+                    conn.executemany("""
+                        INSERT INTO Borrows (BookID, ReaderID, BorrowDate, DueDate, ReturnDate, Barcode) VALUES (?, ?, ?, ?, NULL, ?)
+                    """, loans)
+                    # 持有寫入鎖且 BorrowID 為 AUTOINCREMENT，這批紀錄的編號是連續的
+                    last_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+                    borrow_ids = iter(range(last_id - len(loans) + 1, last_id + 1))
+        except Exception as e:
+            log.exception("批次借閱失敗: %s", e)
+            return [(bid, BorrowResult(BorrowResult.ERROR)) for bid in bids]
+
+        self.book_cache.invalidate(*{loan[0] for loan in loans})
+        log.info("批次借閱：讀者 %s 借出 %d/%d 本", rid, len(loans), len(bids))
+        return [(bid, BorrowResult(st, next(borrow_ids), barcode) if st == BorrowResult.OK else BorrowResult(st))
+                for bid, (st, barcode) in zip(bids, outcomes)]
+
+    @timed
+    def return_many(self, ids, by_book=False, by_barcode=False):
+        """
+        一次歸還多筆借閱，全部在同一個交易內完成
+        ids: BorrowID 清單；by_book=True 時改為 BookID 清單 (還掉該書最早借出、尚未歸還的那一筆)；
+             by_barcode=True 時改為條碼清單 (櫃台刷書上的條碼)
+        回傳: [(id, ReturnResult), ...]，順序與 ids 相同
+        """
+        ids = list(ids)
+        if not ids:
+            return []
+        r_date = to_day(date.today())
+        column = "Barcode" if by_barcode else "BookID" if by_book else "BorrowID"
+
+        try:
+            with self.pool.transaction() as conn:
+                # 借出中的紀錄 (走 idx_borrows_open_book、idx_borrows_open_barcode 或主鍵)
+                open_loans = defaultdict(list)
+                for chunk in _chunks(list(set(ids))):
+                    rows = conn.execute(f"""
+                        SELECT BorrowID, BookID, Barcode, {column} FROM Borrows
+                        WHERE {column} IN ({','.join('?' * len(chunk))}) AND ReturnDate IS NULL
+                        ORDER BY BorrowID
+                    """, chunk)
+                    for borrow_id, bid, barcode, key in rows:
+                        open_loans[key].append((borrow_id, bid, barcode))
+
+                matched = []  # (item, BorrowID, BookID, Barcode)；沒有借出中的紀錄時 BorrowID 為 None
+                for item in ids:
+                    if open_loans[item]:
+                        matched.append((item, *open_loans[item].pop(0)))
+                    else:
+                        matched.append((item, None, None, None))
+
+                closed = [(r_date, borrow_id) for _, borrow_id, _, _ in matched if borrow_id]
+                holds = {}
+                if closed:
+                    conn.executemany("UPDATE Borrows SET ReturnDate = ? WHERE BorrowID = ?", closed)
+                    # 有人排隊的書先保留給預約的讀者，其餘放回架上
+                    holds = self._allocate_holds(conn, [(barcode, bid) for _, borrow_id, bid, barcode in matched
+                                                        if borrow_id and barcode], r_date)
+        except Exception as e:
+            log.exception("批次還書失敗: %s", e)
+            return [(item, ReturnResult(ReturnResult.ERROR)) for item in ids]
+
+        results = []
+        for item, borrow_id, bid, barcode in matched:
+            if borrow_id:
+                results.append((item, ReturnResult(ReturnResult.OK, borrow_id, holds.get(barcode))))
+            else:
+                results.append((item, ReturnResult(ReturnResult.NOT_BORROWED)))
+
+        self.book_cache.invalidate(*{bid for _, borrow_id, bid, _ in matched if borrow_id})
+        held = sum(1 for _, r in results if r.hold_for)
+        log.info("批次還書：歸還 %d/%d 本，其中 %d 本保留給預約讀者", len(closed), len(ids), held)
+        return results
+
+    @timed
+    def return_book(self, borrow_id):
+        """歸還單筆借閱，回傳 ReturnResult"""
+        return self.return_many([borrow_id])[0][1]
+
+    @timed
+    def return_by_barcode(self, barcode):
+        """櫃台刷條碼還書 (走 idx_borrows_open_barcode)，回傳 ReturnResult"""
+        return self.return_many([barcode], by_barcode=True)[0][1]
+
+    # --- 館藏 (每一冊) ---
+    @timed
+    def add_copies(self, counts, branch=DEFAULT_BRANCH, top_up=False):
+        """
+        新增館藏。counts: [(BookID, 冊數), ...]；top_up=True 時冊數代表「總共要有幾冊」，只補不足的部分
+        條碼接著這本書現有的冊數編號 (BookID-001、BookID-002...)，館藏不刪除、只改成 withdrawn，編號就不會重複。
+        有人排隊預約的書，新的冊直接保留給排隊的讀者。回傳新增的條碼清單。
+        整批在資料庫裡完成：暫存表 + 遞迴 CTE 產生編號，一個 INSERT 寫入，不在 Python 逐冊處理。
+        """
+        merge = "MAX(Wanted, excluded.Wanted)" if top_up else "Wanted + excluded.Wanted"
+        with self.pool.transaction() as conn:
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS new_copies (BookID TEXT PRIMARY KEY, Wanted INTEGER, Have INTEGER)")
+            conn.execute("DELETE FROM temp.new_copies")
+            conn.executemany(f"""
+                INSERT INTO temp.new_copies (BookID, Wanted) VALUES (?, ?)
+                ON CONFLICT(BookID) DO UPDATE SET Wanted = {merge}
+            """, counts)
+            conn.execute("UPDATE temp.new_copies SET Have = (SELECT COUNT(*) FROM Copies c WHERE c.BookID = new_copies.BookID)")
+            if top_up:
+                conn.execute("UPDATE temp.new_copies SET Wanted = Wanted - Have")
+            added = conn.execute("""
+                WITH RECURSIVE seq(n) AS (
+                    SELECT 1 UNION ALL SELECT n + 1 FROM seq WHERE n < (SELECT MAX(Wanted) FROM temp.new_copies)
+                )
+                INSERT INTO Copies (Barcode, BookID, Branch)
+                SELECT printf('%s-%03d', w.BookID, w.Have + seq.n), w.BookID, ?
+                FROM temp.new_copies w CROSS JOIN Books b ON b.BookID = w.BookID CROSS JOIN seq ON seq.n <= w.Wanted
+                RETURNING Barcode, BookID
+            """, (branch,)).fetchall()
+            # 新的冊預設在架上；只有這批裡有人排隊的書才需要分配保留 (大量匯入時通常一本都沒有)
+            # 暫存表沒有統計資料，規劃器會改成掃整個 Books / Reservations 索引；CROSS JOIN 固定從暫存表逐筆查
+            queued = {row[0] for row in conn.execute("""
+                SELECT DISTINCT r.BookID FROM temp.new_copies w CROSS JOIN Reservations r ON r.BookID = w.BookID
+                WHERE r.Status = 'waiting' AND w.Wanted > 0
+            """)}
+            if queued:
+                self._allocate_holds(conn, [row for row in added if row[1] in queued], to_day(date.today()),
+                                     already_available=True)
+        self.book_cache.invalidate(*{bid for _, bid in added})
+        return sorted(barcode for barcode, _ in added)
+
+    @timed
+    def get_copies(self, bid):
+        """某本書的每一冊: [(條碼, 分館, 狀態, 書況), ...]"""
+        with self.pool.connection() as conn:
+            return conn.execute("""
+                SELECT Barcode, Branch, Status, Condition FROM Copies WHERE BookID = ? ORDER BY Barcode
+            """, (bid,)).fetchall()
+
+    @timed
+    def update_copy(self, barcode, status=None, branch=None, condition=None):
+        """
+        修改一冊的狀態 (COPY_STATUSES)、分館或書況，沒給的欄位不變；回傳是否成功
+        借出中或保留中的冊不能手動改狀態；修好、找回的冊改回 available 時，有人排隊就直接保留給他
+        """
+        if status is not None and status not in COPY_STATUSES:
+            raise ValueError(f"不支援的館藏狀態: {status}")
+        with self.pool.transaction() as conn:
+            row = conn.execute("SELECT BookID, Status FROM Copies WHERE Barcode = ?", (barcode,)).fetchone()
+            if row is None:
                 return False
-        else:
-            print("❌ 借閱失敗：該書已無庫存或不存在")
-            return False
+            bid, current = row
+            if status is not None and status != current and current in ('on_loan', 'held'):
+                return False
+            conn.execute("""
+                UPDATE Copies SET Branch = COALESCE(?, Branch), Condition = COALESCE(?, Condition) WHERE Barcode = ?
+            """, (branch, condition, barcode))
+            if status == 'available' and current != 'available':
+                self._allocate_holds(conn, [(barcode, bid)], to_day(date.today()))
+            elif status is not None and status != current:
+                conn.execute("UPDATE Copies SET Status = ? WHERE Barcode = ?", (status, barcode))
+        self.book_cache.invalidate(bid)
+        return True
+
+    # --- 預約 ---
+    def _allocate_holds(self, conn, copies, today, already_available=False):
+        """
+        把回到架上的冊 (copies: [(Barcode, BookID), ...]) 依序保留給排隊的讀者，其餘改成在架上
+        必須在交易內呼叫。回傳 {Barcode: ReaderID}
+        already_available: 這些冊本來就是 available (新增的冊)，沒被保留的不必再寫一次
+
+        先用一個查詢找出這批書裡哪些有人排隊，沒人排隊的書 (絕大多數) 一次 executemany 放回架上；
+        有人排隊的書從 idx_reservations_queue 取隊伍最前面的幾位，不論隊伍多長都不必整個掃過。
+        """
+        by_book = defaultdict(list)
+        for barcode, bid in copies:
+            by_book[bid].append(barcode)
+        books = list(by_book)
+        queued = set()
+        for chunk in _chunks(books):
+            queued.update(row[0] for row in conn.execute(f"""
+                SELECT DISTINCT BookID FROM Reservations WHERE BookID IN ({','.join('?' * len(chunk))}) AND Status = 'waiting'
+            """, chunk))
+
+        holds = {}
+        hold_until = today + HOLD_DAYS
+        for bid in queued:
+            barcodes = sorted(by_book[bid])
+            waiting = conn.execute("""
+                SELECT ReservationID, ReaderID FROM Reservations WHERE BookID = ? AND Status = 'waiting'
+                ORDER BY ReservationID LIMIT ?
+            """, (bid, len(barcodes))).fetchall()
+            conn.executemany("UPDATE Reservations SET Status = 'ready', HoldUntil = ?, Barcode = ? WHERE ReservationID = ?",
+                             [(hold_until, barcode, res_id) for barcode, (res_id, _) in zip(barcodes, waiting)])
+            holds.update((barcode, reader) for barcode, (_, reader) in zip(barcodes, waiting))
+
+        conn.executemany("UPDATE Copies SET Status = ? WHERE Barcode = ?",
+                         [('held' if barcode in holds else 'available', barcode) for barcode, _ in copies
+                          if barcode in holds or not already_available])
+        return holds
+
+    @timed
+    def reserve_book(self, rid, bid):
+        """
+        預約沒有庫存的書，排在這本書隊伍的最後面；書還回來時依預約順序保留給讀者
+        回傳 ReserveResult，成功時 position 是目前排第幾位
+        """
+        today = to_day(date.today())
+        try:
+            with self.pool.transaction() as conn:
+                if not conn.execute("SELECT 1 FROM Readers WHERE ReaderID = ?", (rid,)).fetchone():
+                    return ReserveResult(ReserveResult.UNKNOWN_READER)
+                book = conn.execute("SELECT Available FROM Books WHERE BookID = ?", (bid,)).fetchone()
+                if book is None:
+                    return ReserveResult(ReserveResult.UNKNOWN_BOOK)
+                if book[0] > 0:
+                    return ReserveResult(ReserveResult.AVAILABLE)
+                if conn.execute("""
+                    SELECT 1 FROM Reservations WHERE BookID = ? AND ReaderID = ? AND Status IN ('waiting', 'ready')
+                """, (bid, rid)).fetchone():
+                    return ReserveResult(ReserveResult.ALREADY_RESERVED)
+
+                res_id = conn.execute("INSERT INTO Reservations (BookID, ReaderID, ReservedDate) VALUES (?, ?, ?)",
+                                      (bid, rid, today)).lastrowid
+                # 排在前面的人數 (只數索引裡這本書的排隊範圍)
+                position = conn.execute("""
+                    SELECT COUNT(*) FROM Reservations WHERE BookID = ? AND Status = 'waiting' AND ReservationID <= ?
+                """, (bid, res_id)).fetchone()[0]
+        except Exception as e:
+            log.exception("預約失敗: %s", e)
+            return ReserveResult(ReserveResult.ERROR)
+
+        log.info("讀者 %s 預約了 %s，排第 %d 位", rid, bid, position)
+        return ReserveResult(ReserveResult.OK, res_id, position)
+
+    @timed
+    def cancel_reservation(self, reservation_id):
+        """取消預約；書已經保留給這位讀者時，保留的那一冊改給下一位或放回架上。回傳是否成功"""
+        with self.pool.transaction() as conn:
+            row = conn.execute("""
+                SELECT BookID, Status, Barcode FROM Reservations WHERE ReservationID = ? AND Status IN ('waiting', 'ready')
+            """, (reservation_id,)).fetchone()
+            if row is None:
+                return False
+            bid, status, barcode = row
+            conn.execute("UPDATE Reservations SET Status = 'cancelled' WHERE ReservationID = ?", (reservation_id,))
+            if status == 'ready' and barcode:
+                self._allocate_holds(conn, [(barcode, bid)], to_day(date.today()))
+        self.book_cache.invalidate(bid)
+        return True
+
+    @timed
+    def expire_holds(self, as_of=None):
+        """
+        把超過 HOLD_DAYS 沒來取的保留書轉給下一位排隊的讀者 (或放回架上)，回傳處理的筆數
+        每天執行一次即可 (fines.py 的每晚批次工作會呼叫)
+        """
+        today = to_day(as_of or date.today())
+        with self.pool.transaction() as conn:
+            expired = conn.execute("""
+                UPDATE Reservations SET Status = 'expired' WHERE Status = 'ready' AND HoldUntil < ? RETURNING Barcode, BookID
+            """, (today,)).fetchall()
+            if expired:
+                self._allocate_holds(conn, [row for row in expired if row[0]], today)
+        self.book_cache.invalidate(*{bid for _, bid in expired})
+        return len(expired)
+
+    # --- 借閱中本數 ---
+    @timed
+    def get_active_loans(self, rid):
+        """讀者目前借出中的本數 (ReaderLoans 計數，由觸發器維護)"""
+        with self.pool.connection() as conn:
+            row = conn.execute("SELECT ActiveLoans FROM ReaderLoans WHERE ReaderID = ?", (rid,)).fetchone()
+        return row[0] if row else 0
+
+    @timed
+    def check_loan_counters(self, fix=True):
+        """
+        從 Borrows 重新數一次每位讀者借出中的本數，和 ReaderLoans 比對
+        回傳對不上的 [(ReaderID, 計數, 實際), ...]；fix=True 時順便改正
+        只掃一遍借出中的紀錄 (走部分索引，不讀歷史紀錄)，只改寫有差異的讀者；
+        在寫入交易內執行，比對期間不會有人借還書
+        """
+        with self.pool.transaction() as conn:
+            conn.execute("DROP TABLE IF EXISTS temp.loan_actual")
+            conn.execute("CREATE TEMP TABLE loan_actual (ReaderID TEXT PRIMARY KEY, ActiveLoans INTEGER)")
+            conn.execute("""
+                INSERT INTO loan_actual SELECT ReaderID, COUNT(*) FROM Borrows WHERE ReturnDate IS NULL GROUP BY ReaderID
+            """)
+            drift = conn.execute("""
+                SELECT a.ReaderID, COALESCE(l.ActiveLoans, 0), a.ActiveLoans
+                FROM loan_actual a LEFT JOIN ReaderLoans l ON l.ReaderID = a.ReaderID
+                WHERE l.ActiveLoans IS NOT a.ActiveLoans
+                UNION ALL
+                SELECT l.ReaderID, l.ActiveLoans, 0 FROM ReaderLoans l
+                WHERE l.ActiveLoans != 0 AND NOT EXISTS (SELECT 1 FROM loan_actual a WHERE a.ReaderID = l.ReaderID)
+            """).fetchall()
+            if drift and fix:
+                conn.executemany("""
+                    INSERT INTO ReaderLoans (ReaderID, ActiveLoans) VALUES (?, ?)
+                    ON CONFLICT(ReaderID) DO UPDATE SET ActiveLoans = excluded.ActiveLoans
+                """, [(rid, actual) for rid, _, actual in drift])
+            conn.execute("DROP TABLE temp.loan_actual")
+        return sorted(drift)
+
+    @timed
+    def get_borrow_history_page(self, rid, after_key=None, limit=50):
+        """
+        讀者的借閱紀錄，新的在前 (借閱日、BorrowID 遞減)，keyset 分頁
+        after_key 為上一頁最後一筆的 (借閱日整數, BorrowID)；
+        idx_borrows_reader_date 本身就帶著 rowid (= BorrowID)，反向掃描就是這個順序，不用排序也不用 OFFSET
+        回傳: ([(BorrowID, 書名, 借閱日 date, 到期日 date, 歸還日 date 或 None), ...], 最後一筆的 key)
+        """
+        clause = "WHERE br.ReaderID = ?"
+        params = [rid]
+        if after_key is not None:
+            clause += " AND (br.BorrowDate, br.BorrowID) < (?, ?)"
+            params += list(after_key)
+        with self.pool.connection() as conn:
+            rows = conn.execute(f"""
+                SELECT br.BorrowID, COALESCE(b.Title, br.BookID), br.BorrowDate, br.DueDate, br.ReturnDate
+                FROM Borrows br LEFT JOIN Books b ON b.BookID = br.BookID
+                {clause} ORDER BY br.BorrowDate DESC, br.BorrowID DESC LIMIT ?
+            """, params + [limit]).fetchall()
+        if not rows:
+            return rows, after_key
+        last = rows[-1]
+        return ([(borrow_id, title, from_day(b), from_day(d), from_day(r)) for borrow_id, title, b, d, r in rows],
+                (last[2], last[0]))
+
+    @timed
+    def count_borrows(self, rid):
+        """讀者借閱紀錄總筆數 (只數索引，不讀資料表)"""
+        with self.pool.connection() as conn:
+            return conn.execute("SELECT COUNT(*) FROM Borrows WHERE ReaderID = ?", (rid,)).fetchone()[0]
 
-    def get_borrow_history(self, rid):
-        self.cursor.execute("""
-            SELECT Books.Title, Borrows.BorrowDate, Borrows.DueDate FROM Borrows 
-            JOIN Books ON Borrows.BookID = Books.BookID WHERE Borrows.ReaderID = ?
-        """, (rid,))
-        return self.cursor.fetchall()
-    # db_manager.py
+    @timed
+    def get_latest_borrow(self, rid):
+        """最新一筆借閱 (書名, 借閱日 date, 到期日 date, 歸還日 date 或 None)，沒有借過書回傳 None"""
+        with self.pool.connection() as conn:
+            row = conn.execute("""
+                SELECT COALESCE(b.Title, br.BookID), br.BorrowDate, br.DueDate, br.ReturnDate
+                FROM Borrows br LEFT JOIN Books b ON b.BookID = br.BookID
+                WHERE br.ReaderID = ? ORDER BY br.BorrowDate DESC, br.BorrowID DESC LIMIT 1
+            """, (rid,)).fetchone()
+        if row is None:
+            return None
+        title, b, d, r = row
+        return title, from_day(b), from_day(d), from_day(r)
 
+    @timed
+    def get_borrow_summary(self, rid):
+        """借閱紀錄畫面上方的摘要 (總筆數, 最新一筆, 借閱中本數)；透過服務時一個請求就拿齊"""
+        return self.count_borrows(rid), self.get_latest_borrow(rid), self.get_active_loans(rid)
+
+    @timed
     def update_reader_info(self, rid, name, email, credit):
         """更新現有讀者資料 """
         try:
-            self.cursor.execute(
-            "UPDATE Readers SET Name=?, Email=?, Credit=? WHERE ReaderID=?",
-            (name, email, credit, rid)
-            )
-            self.conn.commit()
+            with self.pool.transaction() as conn:
+                conn.execute(
+                "UPDATE Readers SET Name=?, Email=?, Credit=? WHERE ReaderID=?",
+                (name, email, credit, rid)
+                )
+            self.reader_cache.invalidate(rid)
             return True
         except Exception as e:
-            print(f"更新失敗: {e}")
+            log.exception("更新讀者 %s 失敗: %s", rid, e)
             return False
 
+    @timed
     def add_reader(self, rid, name, email, credit): # 修正：加入 rid 參數 
-        """新增讀者資料 """
+        """新增讀者資料 (密碼為 INITIAL_PASSWORD 的雜湊) """
+        hashed = hash_password(INITIAL_PASSWORD, self.password_cost)
         try:
             # 注意：Readers 表格有 5 個欄位 (ID, Name, Email, Password, Credit) [cite: 1, 3]
-            self.cursor.execute(
-            "INSERT INTO Readers (ReaderID, Name, Email, Password, Credit) VALUES (?, ?, ?, ?, ?)",
-            (rid, name, email, '123456', credit) # 補上預設密碼 
-            )
-            self.conn.commit() 
+            with self.pool.transaction() as conn:
+                conn.execute(
+                "INSERT INTO Readers (ReaderID, Name, Email, Password, Credit) VALUES (?, ?, ?, ?, ?)",
+                (rid, name, email, hashed, credit) # 補上預設密碼 
+                )
+            self.reader_cache.invalidate(rid)
             return True 
         except Exception as e:
-            print(f"新增失敗: {e}")
+            log.exception("新增讀者 %s 失敗: %s", rid, e)
             return False 
     
-    def close(self): self.conn.close()
+    @timed
+    def delete_reader(self, rid):
+        """
+        刪除讀者，回傳是否成功；還有書沒還或有進行中的預約時不能刪 (管理員帳號也不能刪)
+        借閱中本數直接看 ReaderLoans，不必數借閱紀錄
+        """
+        with self.pool.transaction() as conn:
+            row = conn.execute("SELECT ActiveLoans FROM ReaderLoans WHERE ReaderID = ?", (rid,)).fetchone()
+            if row and row[0] > 0:
+                return False
+            if conn.execute("""
+                SELECT 1 FROM Reservations WHERE ReaderID = ? AND Status IN ('waiting', 'ready') LIMIT 1
+            """, (rid,)).fetchone():
+                return False
+            deleted = conn.execute("DELETE FROM Readers WHERE ReaderID = ? AND ReaderID != 'admin'", (rid,)).rowcount
+            conn.execute("DELETE FROM ReaderLoans WHERE ReaderID = ?", (rid,))
+        self.reader_cache.invalidate(rid)
+        return deleted > 0
+
+    def close(self): self.pool.close_all()
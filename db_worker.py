@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+###########################################################################
+## db_worker.py - 在背景執行緒跑資料庫查詢，結果再送回 UI 執行緒
+###########################################################################
+
+import itertools
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+log = logging.getLogger(__name__)
+
+
+class DBWorker:
+    """
+    把耗時的資料庫呼叫丟到執行緒池，UI 主迴圈不會因為 SQLite 卡住。
+
+    dispatch: 把函式排到 UI 執行緒執行的方法，wx 程式傳入 wx.CallAfter
+    on_busy:  忙碌狀態改變時呼叫 on_busy(True/False) (在 UI 執行緒上)，用來顯示忙碌游標
+
+    submit() 可以帶 key：同一個 key 送出新工作時，舊的工作如果還沒開始就直接取消，
+    已經在跑的則讓它跑完但丟掉結果，畫面上只會出現最後一次查詢的結果。
+    busy=False 的工作 (例如啟動時在背景建索引) 不算進忙碌狀態，不會出現忙碌游標。
+    submit()/on_done/on_error 都只應該在 UI 執行緒上呼叫。
+    """
+
+    def __init__(self, dispatch, max_workers=4, on_busy=None):
+        self.dispatch = dispatch
+        self.on_busy = on_busy
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='db-worker')
+        self._lock = threading.Lock()
+        self._latest = {}   # key -> (最新的世代編號, 還沒送回的 future 或 None)；項目不刪除，編號只增不減
+        self._generations = itertools.count(1)
+        self._busy = 0
+        self._pending = 0   # 已送出、結果還沒送回 UI 執行緒的工作 (含 busy=False)
+
+    def submit(self, func, *args, on_done=None, on_error=None, key=None, busy=True):
+        generation = None
+        if key is not None:
+            with self._lock:
+                _, previous = self._latest.get(key, (None, None))
+                if previous is not None:
+                    previous.cancel()
+                generation = next(self._generations)
+
+        self._pending += 1
+        if busy:
+            self._busy += 1
+            if self._busy == 1 and self.on_busy:
+                self.on_busy(True)
+
+        future = self._executor.submit(func, *args)
+        if key is not None:
+            with self._lock:
+                self._latest[key] = (generation, future)
+        future.add_done_callback(lambda f: self.dispatch(self._deliver, f, key, generation, on_done, on_error, busy))
+        return future
+
+    def _deliver(self, future, key, generation, on_done, on_error, busy):
+        """在 UI 執行緒上把結果交給 callback"""
+        self._pending -= 1
+        if busy:
+            self._busy -= 1
+            if self._busy == 0 and self.on_busy:
+                self.on_busy(False)
+
+        if future.cancelled():
+            return
+        if key is not None:
+            with self._lock:
+                if self._latest[key][0] != generation:
+                    return  # 已經有更新的查詢，這個結果過時了
+                # 只留世代編號 (不能刪掉：編號重新從頭算的話，還在跑的舊工作會被當成最新的)
+                self._latest[key] = (generation, None)
+
+        error = future.exception()
+        if error is not None:
+            if on_error:
+                on_error(error)
+            else:
+                log.error("背景資料庫工作失敗: %s", error, exc_info=error)
+        elif on_done:
+            on_done(future.result())
+
+    @property
+    def pending(self):
+        """還在排隊、執行中或等著送回 UI 執行緒的工作數 (benchmarks/bench_ui.py 用它判斷畫面是否已經靜止)"""
+        return self._pending
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+###########################################################################
+## fines.py - 逾期偵測與罰款計算 (每晚執行一次的批次工作，同時處理逾期未取的預約書、核對借閱中本數)
+## 命令列: python fines.py
+##         python fines.py --as-of 2024-05-01 --daily-fine 10 --max-fine 300
+###########################################################################
+
+import argparse
+from collections import namedtuple
+from datetime import date
+
+from db_manager import DB_PATH, DBManager, from_day, to_day
+from instrumentation import setup_logging
+
+JOB_NAME = 'overdue_fines'
+
+
+class FinePolicy(namedtuple('FinePolicy', ['daily_fine', 'grace_days', 'max_fine', 'credit_per_day', 'min_credit'],
+                            defaults=(5, 0, 500, 1, 0))):
+    """
+    罰款規則
+    daily_fine:     逾期每天罰款 (元)
+    grace_days:     寬限天數；超過到期日這幾天內不算逾期，之後從寬限期結束起算
+    max_fine:       每筆借閱的罰款上限，None 代表不設上限
+    credit_per_day: 逾期每天扣的信用分
+    min_credit:     信用分最低只扣到這裡
+    """
+    __slots__ = ()
+
+
+FineRun = namedtuple('FineRun', ['as_of', 'since', 'loans', 'readers', 'days', 'amount'])
+# days: 這次新增的逾期天數 (信用分依它扣除)；amount: 這次新增的罰款
+
+
+def overdue_loans(db, as_of=None, limit=100):
+    """
+    目前未歸還且已過到期日的借閱，依到期日排序 (最久的在前)
+    走 idx_borrows_open_due 部分索引，只看未歸還的紀錄
+    回傳: [(BorrowID, ReaderID, BookID, DueDate date), ...]
+    """
+    with db.pool.connection() as conn:
+        rows = conn.execute("""
+            SELECT BorrowID, ReaderID, BookID, DueDate FROM Borrows
+            WHERE ReturnDate IS NULL AND DueDate < ? ORDER BY DueDate LIMIT ?
+        """, (to_day(as_of or date.today()), limit)).fetchall()
+    return [(borrow_id, rid, bid, from_day(due)) for borrow_id, rid, bid, due in rows]
+
+
+def run_overdue_fines(db, policy=FinePolicy(), as_of=None):
+    """
+    計算到 as_of (預設今天) 為止的逾期罰款並扣信用分，回傳 FineRun。
+
+    全部在資料庫裡以集合運算完成，不在 Python 逐筆處理：
+    1. 用兩個部分索引找出候選借閱：未還且已逾期的，以及上次執行後才逾期歸還的
+    2. 算出每筆的逾期天數與罰款，和 Fines 裡上次的結果比較，只留下有增加的
+    3. 一個 INSERT ... ON CONFLICT 更新 Fines，一個 UPDATE ... FROM 依讀者彙總扣信用分
+
+    上次算到哪天記在 JobState (high-water mark)，已經算過的天數不會重複扣；
+    同一天重複執行、或中斷後重跑都是安全的。第一次執行只處理目前未歸還的逾期借閱。
+    """
+    today = to_day(as_of or date.today())
+    params = {
+        'as_of': today,
+        'cutoff': today - policy.grace_days,
+        'grace': policy.grace_days,
+        'daily_fine': policy.daily_fine,
+        'max_fine': policy.max_fine,
+        'credit_per_day': policy.credit_per_day,
+        'min_credit': policy.min_credit,
+    }
+
+    with db.pool.transaction() as conn:
+        row = conn.execute("SELECT HighWater FROM JobState WHERE Name = ?", (JOB_NAME,)).fetchone()
+        params['since'] = row[0] if row else today
+
+        conn.execute("DROP TABLE IF EXISTS temp.fine_delta")
+        conn.execute("""
+            CREATE TEMP TABLE fine_delta AS
+            WITH overdue AS (
+                SELECT BorrowID, ReaderID, (:as_of - DueDate) - :grace AS Days
+                FROM Borrows WHERE ReturnDate IS NULL AND DueDate < :cutoff
+                UNION ALL
+                -- 上次執行之後才歸還的逾期書：算到歸還日為止
+                SELECT BorrowID, ReaderID, (ReturnDate - DueDate) - :grace
+                FROM Borrows WHERE ReturnDate > DueDate AND ReturnDate >= :since AND ReturnDate <= :as_of
+            )
+            SELECT o.BorrowID, o.ReaderID, o.Days,
+                   MIN(o.Days * :daily_fine, COALESCE(:max_fine, o.Days * :daily_fine)) AS Amount,
+                   o.Days - COALESCE(f.Days, 0) AS NewDays,
+                   COALESCE(f.Amount, 0) AS OldAmount
+            FROM overdue o LEFT JOIN Fines f ON f.BorrowID = o.BorrowID
+            WHERE o.Days > COALESCE(f.Days, 0)
+        """, params)
+
+        loans, readers, days, amount = conn.execute("""
+            SELECT COUNT(*), COUNT(DISTINCT ReaderID), COALESCE(SUM(NewDays), 0), COALESCE(SUM(Amount - OldAmount), 0)
+            FROM fine_delta
+        """).fetchone()
+
+        # WHERE true：讓 SQLite 分得出 ON CONFLICT 是 upsert 而不是 JOIN 的一部分
+        conn.execute("""
+            INSERT INTO Fines (BorrowID, ReaderID, Days, Amount)
+            SELECT BorrowID, ReaderID, Days, Amount FROM fine_delta WHERE true
+            ON CONFLICT(BorrowID) DO UPDATE SET Days = excluded.Days, Amount = excluded.Amount
+        """)
+        conn.execute("""
+            UPDATE Readers SET Credit = MAX(:min_credit, Credit - d.NewDays * :credit_per_day)
+            FROM (SELECT ReaderID, SUM(NewDays) AS NewDays FROM fine_delta GROUP BY ReaderID) AS d
+            WHERE Readers.ReaderID = d.ReaderID AND Readers.Credit > :min_credit
+        """, params)
+        conn.execute("""
+            INSERT INTO JobState (Name, HighWater) VALUES (?, ?)
+            ON CONFLICT(Name) DO UPDATE SET HighWater = MAX(HighWater, excluded.HighWater)
+        """, (JOB_NAME, params['as_of']))
+        conn.execute("DROP TABLE temp.fine_delta")
+
+    if readers:
+        db.reader_cache.clear()
+    return FineRun(from_day(today), from_day(params['since']), loans, readers, days, amount)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="計算逾期罰款並扣除讀者信用分")
+    parser.add_argument('--as-of', type=date.fromisoformat, help="計算到哪一天 (YYYY-MM-DD)，預設今天")
+    parser.add_argument('--daily-fine', type=int, default=FinePolicy().daily_fine, help="逾期每天罰款")
+    parser.add_argument('--grace-days', type=int, default=FinePolicy().grace_days, help="寬限天數")
+    parser.add_argument('--max-fine', type=int, default=FinePolicy().max_fine, help="每筆罰款上限 (0 = 不設上限)")
+    parser.add_argument('--credit-per-day', type=int, default=FinePolicy().credit_per_day, help="逾期每天扣的信用分")
+    parser.add_argument('--min-credit', type=int, default=FinePolicy().min_credit, help="信用分下限")
+    parser.add_argument('--db', default=DB_PATH)
+    args = parser.parse_args()
+
+    setup_logging()
+    policy = FinePolicy(args.daily_fine, args.grace_days, args.max_fine or None, args.credit_per_day, args.min_credit)
+    db = DBManager(args.db)
+    result = run_overdue_fines(db, policy, args.as_of)
+    print(f"💰 逾期罰款計算至 {result.as_of} (上次: {result.since})：{result.loans} 筆借閱、{result.readers} 位讀者，"
+          f"新增逾期 {result.days} 天、罰款 {result.amount} 元")
+    expired = db.expire_holds(args.as_of)
+    print(f"📌 逾期未取的預約書: {expired} 本，已轉給下一位預約讀者或放回書架")
+    drift = db.check_loan_counters()
+    if drift:
+        print(f"⚠️ 借閱中本數與借閱紀錄不一致，已更正 {len(drift)} 位讀者: "
+              + "、".join(f"{rid} ({stored} -> {actual})" for rid, stored, actual in drift[:10]))
+    db.close()
+
+
+if __name__ == '__main__':
+    main()
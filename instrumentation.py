@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+###########################################################################
+## instrumentation.py - 日誌設定 (非同步寫出) 與熱門路徑的延遲統計
+## 各模組用 logging.getLogger(__name__) 記錄；程式進入點呼叫 setup_logging() 一次
+## 環境變數: LIBRARY_LOG_LEVEL (預設 INFO)、LIBRARY_LOG_FILE (另外寫一份到檔案)、
+##           LIBRARY_SLOW_MS (單次呼叫超過幾毫秒記一筆 WARNING，預設 200)
+###########################################################################
+
+import atexit
+import functools
+import heapq
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+log = logging.getLogger(__name__)
+
+SLOW_MS = float(os.environ.get('LIBRARY_SLOW_MS') or 200)
+LOG_FORMAT = '%(asctime)s %(levelname)-7s %(threadName)s %(name)s: %(message)s'
+
+_listener = None
+
+
+def setup_logging(level=None, path=None):
+    """
+    讓 logging 的輸出不卡住呼叫端：所有紀錄先放進佇列 (QueueHandler，只是 put 一下)，
+    由背景執行緒 (QueueListener) 寫到 stderr / 檔案。UI 執行緒記錄時不會等 I/O。
+    重複呼叫不會重複加 handler；程式結束時自動把佇列裡剩下的寫完。
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+    level = level or os.environ.get('LIBRARY_LOG_LEVEL', 'INFO')
+    path = path or os.environ.get('LIBRARY_LOG_FILE')
+
+    formatter = logging.Formatter(LOG_FORMAT)
+    handlers = [logging.StreamHandler()]
+    if path:
+        handlers.append(logging.handlers.RotatingFileHandler(path, maxBytes=5 << 20, backupCount=3, encoding='utf-8'))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    records = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(logging.handlers.QueueHandler(records))
+    _listener = logging.handlers.QueueListener(records, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+    return _listener
+
+
+class Timings:
+    """
+    每個名稱 (通常是 'DBManager.方法名') 的呼叫次數、總時間與最近 window 次的延遲，
+    另外保留整體最慢的 keep 次呼叫 (含參數摘要)，給管理員的效能統計畫面看。
+    記錄一次只是一次 perf_counter 相減加上 deque.append，開銷約 1 微秒。
+    """
+
+    def __init__(self, window=2048, keep=20):
+        self.window = window
+        self.keep = keep
+        self._lock = threading.Lock()
+        self._stats = {}    # name -> [次數, 總毫秒, deque(毫秒)]
+        self._slowest = []  # min-heap: (毫秒, 時間, name, 參數摘要)
+
+    def record(self, name, elapsed_ms, detail=''):
+        with self._lock:
+            entry = self._stats.get(name)
+            if entry is None:
+                entry = self._stats[name] = [0, 0.0, deque(maxlen=self.window)]
+            entry[0] += 1
+            entry[1] += elapsed_ms
+            entry[2].append(elapsed_ms)
+            if len(self._slowest) < self.keep:
+                heapq.heappush(self._slowest, (elapsed_ms, time.time(), name, detail))
+            elif elapsed_ms > self._slowest[0][0]:
+                heapq.heapreplace(self._slowest, (elapsed_ms, time.time(), name, detail))
+
+    def snapshot(self, prefix=''):
+        """{name: {count, total_ms, p50_ms, p95_ms, p99_ms, max_ms}}，百分位數用最近 window 次計算"""
+        with self._lock:
+            items = [(name, count, total, sorted(samples)) for name, (count, total, samples) in self._stats.items()
+                     if name.startswith(prefix)]
+        return {name: {'count': count, 'total_ms': round(total, 3),
+                       'p50_ms': percentile(ordered, 50), 'p95_ms': percentile(ordered, 95),
+                       'p99_ms': percentile(ordered, 99), 'max_ms': round(ordered[-1], 3)}
+                for name, count, total, ordered in sorted(items)}
+
+    def floor(self):
+        """保留的最慢呼叫裡最快的那一筆 (還沒滿時為 0)；比它快的呼叫不會被保留，不必產生參數摘要"""
+        slowest = self._slowest
+        return slowest[0][0] if len(slowest) >= self.keep else 0.0
+
+    def slowest(self):
+        """整體最慢的幾次呼叫，最慢的在前: [(毫秒, 時間 epoch 秒, name, 參數摘要), ...]"""
+        with self._lock:
+            return sorted(self._slowest, reverse=True)
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self._slowest.clear()
+
+
+def percentile(ordered, pct):
+    """已排序樣本的百分位數 (nearest-rank)"""
+    if not ordered:
+        return None
+    rank = max(0, min(len(ordered) - 1, -(-pct * len(ordered) // 100) - 1))
+    return round(ordered[rank], 3)
+
+
+timings = Timings()
+
+
+def _summary(args, kwargs, limit=80):
+    text = ', '.join([repr(a) for a in args] + [f"{k}={v!r}" for k, v in kwargs.items()])
+    return text if len(text) <= limit else text[:limit - 3] + '...'
+
+
+def timed(func=None, *, name=None, skip_self=True, record_args=True):
+    """
+    記錄函式每次呼叫的延遲到 timings；超過 SLOW_MS 的呼叫另外記一筆 WARNING
+    用法: @timed 或 @timed(name='search')；方法預設略過 self，不把它放進參數摘要
+    參數含密碼等不能寫進日誌的內容時用 @timed(record_args=False)
+    """
+    if func is None:
+        return functools.partial(timed, name=name, skip_self=skip_self, record_args=record_args)
+    label = name or func.__qualname__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            # 參數摘要只在夠慢、會被保留下來時才產生
+            slow = elapsed >= SLOW_MS
+            detail = ''
+            if record_args and (slow or elapsed > timings.floor()):
+                detail = _summary(args[1:] if skip_self else args, kwargs)
+            timings.record(label, elapsed, detail)
+            if slow:
+                log.warning("慢呼叫 %s (%.1f ms): %s", label, elapsed, detail)
+    return wrapper
+
+
+def format_report(stats, slowest=(), limit=15):
+    """把 snapshot()/slowest() 排成文字表格 (管理員效能畫面、命令列輸出用)，依總耗時排序"""
+    lines = [f"{'呼叫':<36}{'次數':>8}{'總計 ms':>11}{'p50':>9}{'p95':>9}{'p99':>9}{'最慢':>9}"]
+    ranked = sorted(stats.items(), key=lambda item: item[1]['total_ms'], reverse=True)[:limit]
+    for name, s in ranked:
+        lines.append(f"{name:<36}{s['count']:>8}{s['total_ms']:>11.1f}{s['p50_ms']:>9.2f}"
+                     f"{s['p95_ms']:>9.2f}{s['p99_ms']:>9.2f}{s['max_ms']:>9.2f}")
+    if slowest:
+        lines += ['', "最慢的呼叫:"]
+        for elapsed, when, name, detail in slowest:
+            lines.append(f"  {time.strftime('%H:%M:%S', time.localtime(when))} {elapsed:>9.2f} ms  {name}({detail})")
+    return '\n'.join(lines)
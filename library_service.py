@@ -0,0 +1,595 @@
+# -*- coding: utf-8 -*-
+###########################################################################
+## library_service.py - 不含 GUI 的 JSON 服務：多個借閱櫃台、網頁 OPAC 共用同一個資料庫
+## 執行: python library_service.py --port 8765 --workers 8
+##       (或用任何 ASGI 伺服器: LIBRARY_DB=library.db uvicorn library_service:app)
+## GUI 設定環境變數 LIBRARY_SERVICE_URL=http://127.0.0.1:8765 後改當這個服務的用戶端 (service_client.py)
+###########################################################################
+##
+## 端點 (回應一律是 JSON；日期為 'YYYY-MM-DD'):
+##   GET    /health                          服務狀態、結構版本、借閱上限
+##   GET    /metrics                         每個端點與每個 DBManager 方法的次數、延遲 p50/p95/p99 (ms)、最慢的呼叫
+##   GET    /books?q=&after=&limit=          搜尋 (keyset 分頁，next 傳回 after 取下一頁)
+##   GET    /books/count?q=                  搜尋結果筆數
+##   GET    /books/{id}                      單本書
+##   GET    /books/{id}/copies               每一冊的條碼、分館、狀態
+##   GET    /suggest?q=&limit=               搜尋建議
+##   GET    /suggest/terms                   建議索引的全部項目 (GUI 用戶端在本機建索引)
+##   POST   /borrow                          {reader_id, book_id | barcode | book_ids}
+##   POST   /return                          {borrow_id | barcode | borrow_ids | barcodes}
+##   POST   /reservations                    {reader_id, book_id}
+##   DELETE /reservations/{id}
+##   GET    /readers?q=&sort=&desc=&after=&limit=     讀者清單 (after 為 JSON 陣列)
+##   GET    /readers/count?q=
+##   POST   /login                           {reader_id, password}，密碼錯誤回 401
+##   POST   /readers                         {reader_id, name, email, password | credit}
+##   GET    /readers/{id}                    讀者資料與借閱中本數
+##   PUT    /readers/{id}                    {name, email, credit}
+##   DELETE /readers/{id}
+##   GET    /readers/{id}/history?after=&limit=       借閱紀錄 (新的在前，after 為 JSON 陣列)
+##   GET    /readers/{id}/summary            借閱紀錄筆數、最新一筆、借閱中本數
+##
+## 每個回應都帶 X-Catalogue-Version 標頭 (書目版本)，用戶端據此判斷搜尋建議是否過時。
+## 沒有登入驗證，預設只聽 127.0.0.1；要對外開放請放在有驗證的反向代理後面。
+
+import argparse
+import asyncio
+import functools
+import json
+import logging
+import re
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from urllib.parse import parse_qs, urlsplit
+
+from db_manager import DB_PATH, SCHEMA_VERSION, DBManager
+from instrumentation import percentile, setup_logging, timings
+
+MAX_BODY = 1 << 20        # 請求內容上限 1 MB
+MAX_HEADER_LINES = 100
+log = logging.getLogger(__name__)
+STATUS_TEXT = {200: 'OK', 201: 'Created', 400: 'Bad Request', 401: 'Unauthorized', 404: 'Not Found', 405: 'Method Not Allowed',
+               409: 'Conflict', 413: 'Payload Too Large', 500: 'Internal Server Error', 503: 'Service Unavailable'}
+
+
+class ServiceError(Exception):
+    """處理請求時要回傳給用戶端的錯誤 (HTTP 狀態碼 + 說明)"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class RouteMetrics:
+    """
+    每個端點 (依路徑樣板，例如 'GET /books/{id}') 的請求數、錯誤數與最近 window 筆的延遲
+    百分位數用最近的樣本計算，記憶體用量固定；只在事件迴圈執行緒上更新，不需要鎖
+    """
+
+    def __init__(self, window=2048):
+        self.window = window
+        self._routes = {}   # route -> [請求數, 錯誤數, deque(延遲 ms)]
+
+    def record(self, route, elapsed_ms, error=False):
+        entry = self._routes.get(route)
+        if entry is None:
+            entry = self._routes[route] = [0, 0, deque(maxlen=self.window)]
+        entry[0] += 1
+        entry[1] += bool(error)
+        entry[2].append(elapsed_ms)
+
+    def snapshot(self):
+        result = {}
+        for route, (count, errors, samples) in sorted(self._routes.items()):
+            ordered = sorted(samples)
+            result[route] = {
+                'count': count, 'errors': errors,
+                'p50_ms': percentile(ordered, 50), 'p95_ms': percentile(ordered, 95),
+                'p99_ms': percentile(ordered, 99), 'max_ms': round(ordered[-1], 3) if ordered else None,
+            }
+        return result
+
+
+def _result(result):
+    """BorrowResult / ReturnResult / ReserveResult -> dict (namedtuple 直接 json.dumps 會變成陣列)"""
+    data = result._asdict()
+    data['ok'] = bool(result)
+    message = getattr(result, 'message', None)
+    if message is not None:
+        data['message'] = message
+    return data
+
+
+def _json_default(value):
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f"無法轉成 JSON: {type(value).__name__}")
+
+
+def _int(query, name, default, low=1, high=1000):
+    try:
+        return max(low, min(high, int(query.get(name, default))))
+    except ValueError:
+        raise ServiceError(400, f"{name} 必須是整數")
+
+
+def _to_int(value, name):
+    """請求內容或網址參數裡的整數欄位，格式不對回 400 (不要讓 ValueError 變成 500)"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ServiceError(400, f"{name} 必須是整數")
+
+
+def _is(value, kind):
+    """型別檢查 (JSON 的 true/false 不算整數)"""
+    return isinstance(value, kind) and not isinstance(value, bool)
+
+
+def _list(body, name, kind):
+    """批次請求的清單欄位 (book_ids、borrow_ids、barcodes)，每個元素都要是 kind"""
+    value = body[name]
+    if not isinstance(value, list) or not all(_is(item, kind) for item in value):
+        raise ServiceError(400, f"{name} 必須是陣列，元素型別為 {kind.__name__}")
+    return value
+
+
+def _json_param(query, name):
+    """分頁的 after 參數：JSON 編碼的 key (上一頁回傳的 next)"""
+    if name not in query:
+        return None
+    try:
+        return json.loads(query[name])
+    except ValueError:
+        raise ServiceError(400, f"{name} 不是有效的 JSON")
+
+
+def _key_param(query, name, *kinds):
+    """
+    keyset 分頁的 after 參數：上一頁回傳的 next (JSON 陣列)，長度與每個元素的型別要對得上 kinds，
+    否則到了 SQL 才會出錯 (變成 500)
+    """
+    key = _json_param(query, name)
+    if key is None:
+        return None
+    if not isinstance(key, list) or len(key) != len(kinds) or not all(map(_is, key, kinds)):
+        raise ServiceError(400, f"{name} 必須是上一頁回傳的 next")
+    return tuple(key)
+
+
+def _require(body, *names, kind=str):
+    """必填欄位：不能缺少或空白，型別要是 kind (預設字串：編號、姓名、密碼)"""
+    missing = [name for name in names if body.get(name) in (None, '')]
+    if missing:
+        raise ServiceError(400, f"缺少欄位: {', '.join(missing)}")
+    wrong = [name for name in names if not _is(body[name], kind)]
+    if wrong:
+        raise ServiceError(400, f"欄位型別錯誤: {', '.join(wrong)}")
+
+
+def _optional(body, name, default=''):
+    """選填的文字欄位 (email 等)"""
+    value = body.get(name)
+    if value is None:
+        return default
+    if not isinstance(value, str):
+        raise ServiceError(400, f"欄位型別錯誤: {name}")
+    return value
+
+
+class LibraryService:
+    """
+    把 DBManager 包成 JSON 端點。請求在 asyncio 事件迴圈上解析、分派，
+    會卡住的 SQLite 呼叫一律丟到有上限的執行緒池 (max_workers 條執行緒，每條各自一條連線)。
+    同時處理中的請求超過 max_workers + max_pending 時直接回 503，不讓排隊無限制地變長。
+
+    handle() 與傳輸層無關；serve() 是標準函式庫的 HTTP/1.1 伺服器，__call__ 是 ASGI 介面。
+    """
+
+    ROUTES = [
+        ('GET', '/health', 'health'),
+        ('GET', '/metrics', 'metrics'),
+        ('GET', '/books', 'search_books'),
+        ('GET', '/books/count', 'count_books'),
+        ('GET', '/books/{id}', 'get_book'),
+        ('GET', '/books/{id}/copies', 'get_copies'),
+        ('GET', '/suggest', 'suggest'),
+        ('GET', '/suggest/terms', 'suggest_terms'),
+        ('POST', '/borrow', 'borrow'),
+        ('POST', '/return', 'return_books'),
+        ('POST', '/reservations', 'reserve'),
+        ('DELETE', '/reservations/{id}', 'cancel_reservation'),
+        ('POST', '/login', 'login'),
+        ('GET', '/readers', 'list_readers'),
+        ('GET', '/readers/count', 'count_readers'),
+        ('POST', '/readers', 'create_reader'),
+        ('GET', '/readers/{id}', 'get_reader'),
+        ('PUT', '/readers/{id}', 'update_reader'),
+        ('DELETE', '/readers/{id}', 'delete_reader'),
+        ('GET', '/readers/{id}/history', 'reader_history'),
+        ('GET', '/readers/{id}/summary', 'reader_summary'),
+    ]
+
+    def __init__(self, db, max_workers=8, max_pending=64):
+        self.db = db
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='service-db')
+        self.metrics = RouteMetrics()
+        self._in_flight = 0
+        self._suggest_index_cache = None  # 伺服器端的搜尋建議索引 (PrefixIndex)
+        self._suggest_task = None
+        # 路徑樣板 -> 正規表示式；{id} 比對一段路徑 (不含 /)
+        self._routes = [(method, template, re.compile('^' + re.sub(r'\{(\w+)\}', r'(?P<\1>[^/]+)', template) + '$'),
+                         getattr(self, '_' + name)) for method, template, name in self.ROUTES]
+
+    # --- 分派 ---
+    async def handle(self, method, target, body=b''):
+        """處理一個請求，回傳 (狀態碼, JSON bytes, 額外標頭)"""
+        start = time.perf_counter()
+        url = urlsplit(target)
+        route, status = f"{method} (unmatched)", 500
+        try:
+            handler, params, route = self._match(method, url.path)
+            query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            if body:
+                try:
+                    payload = json.loads(body)
+                except ValueError:
+                    raise ServiceError(400, "請求內容不是有效的 JSON")
+                if not isinstance(payload, dict):
+                    raise ServiceError(400, "請求內容必須是 JSON 物件")
+            else:
+                payload = {}
+            status, data = await handler(params, query, payload)
+        except ServiceError as e:
+            status, data = e.status, {'error': e.message}
+        except Exception as e:
+            log.exception("服務處理 %s %s 失敗: %s", method, url.path, e)
+            status, data = 500, {'error': "伺服器內部錯誤"}
+        self.metrics.record(route, (time.perf_counter() - start) * 1000, error=status >= 500)
+        headers = [('X-Catalogue-Version', str(self.db.catalogue_version))]
+        return status, json.dumps(data, ensure_ascii=False, default=_json_default).encode('utf-8'), headers
+
+    def _match(self, method, path):
+        allowed = False
+        for route_method, template, pattern, handler in self._routes:
+            m = pattern.match(path)
+            if m:
+                if route_method == method:
+                    return handler, m.groupdict(), f"{method} {template}"
+                allowed = True
+        raise ServiceError(405 if allowed else 404, "不支援的請求方法" if allowed else "找不到這個端點")
+
+    async def call(self, func, *args, **kwargs):
+        """在執行緒池上執行會卡住的資料庫呼叫"""
+        if self._in_flight >= self.max_workers + self.max_pending:
+            raise ServiceError(503, "服務忙碌中，請稍後再試")
+        self._in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+        finally:
+            self._in_flight -= 1
+
+    # --- 系統 ---
+    async def _health(self, params, query, body):
+        return 200, {'status': 'ok', 'schema': SCHEMA_VERSION, 'loan_limit': self.db.loan_limit,
+                     'catalogue_version': self.db.catalogue_version, 'in_flight': self._in_flight}
+
+    async def _metrics(self, params, query, body):
+        slowest = [{'ms': round(ms, 3), 'at': when, 'call': name, 'args': detail}
+                   for ms, when, name, detail in timings.slowest()]
+        return 200, {'routes': self.metrics.snapshot(), 'db': timings.snapshot('DBManager.'), 'slowest': slowest,
+                     'caches': self.db.cache_stats(), 'in_flight': self._in_flight, 'workers': self.max_workers}
+
+    # --- 書籍 ---
+    async def _search_books(self, params, query, body):
+        # after = [相關度 (數字) 或書名, rowid]
+        after = _key_param(query, 'after', (int, float, str), int)
+        rows, key = await self.call(self.db.search_books_after, query.get('q', ''), after,
+                                    _int(query, 'limit', 50, high=500))
+        return 200, {'rows': rows, 'next': key}
+
+    async def _count_books(self, params, query, body):
+        return 200, {'count': await self.call(self.db.count_books, query.get('q', ''))}
+
+    async def _get_book(self, params, query, body):
+        book = await self.call(self.db.get_book_by_id, params['id'])
+        if book is None:
+            raise ServiceError(404, "查無此書")
+        return 200, dict(zip(('book_id', 'title', 'author', 'isbn', 'available'), book))
+
+    async def _get_copies(self, params, query, body):
+        copies = await self.call(self.db.get_copies, params['id'])
+        return 200, {'copies': [dict(zip(('barcode', 'branch', 'status', 'condition'), c)) for c in copies]}
+
+    async def _suggest_index(self):
+        """伺服器端的建議索引；書目版本變了就在背景重建 (同一時間只建一次，建好前沿用舊的)"""
+        index, task = self._suggest_index_cache, self._suggest_task
+        if task is not None and task.done():
+            self._suggest_task = None
+            if not task.cancelled() and task.exception() is None:
+                self._suggest_index_cache = index = task.result()
+        if index is None or index.version != self.db.catalogue_version:
+            if self._suggest_task is None:
+                self._suggest_task = asyncio.ensure_future(self.call(self.db.load_suggest_index))
+            if index is None:
+                # 第一次只能等它建好；失敗時下一個請求會重建
+                self._suggest_index_cache = index = await asyncio.shield(self._suggest_task)
+        return index
+
+    async def _suggest(self, params, query, body):
+        index = await self._suggest_index()
+        return 200, {'suggestions': index.suggest(query.get('q', ''), _int(query, 'limit', 10, high=50))}
+
+    async def _suggest_terms(self, params, query, body):
+        index = await self._suggest_index()
+        return 200, {'version': index.version, 'terms': list(index)}
+
+    # --- 借還書與預約 ---
+    async def _borrow(self, params, query, body):
+        _require(body, 'reader_id')
+        rid = body['reader_id']
+        if body.get('book_ids') is not None:
+            results = await self.call(self.db.borrow_many, rid, _list(body, 'book_ids', str))
+            return 200, {'results': [dict(_result(r), book_id=bid) for bid, r in results]}
+        if body.get('barcode'):
+            _require(body, 'barcode')
+            result = await self.call(self.db.borrow_by_barcode, rid, body['barcode'])
+        else:
+            _require(body, 'book_id')
+            result = await self.call(self.db.borrow_book, rid, body['book_id'])
+        return 200, _result(result)
+
+    async def _return_books(self, params, query, body):
+        for name, kind, kwargs in (('borrow_ids', int, {}), ('barcodes', str, {'by_barcode': True})):
+            if body.get(name) is not None:
+                results = await self.call(self.db.return_many, _list(body, name, kind), **kwargs)
+                return 200, {'results': [dict(_result(r), id=item) for item, r in results]}
+        if body.get('barcode'):
+            _require(body, 'barcode')
+            result = await self.call(self.db.return_by_barcode, body['barcode'])
+        else:
+            _require(body, 'borrow_id', kind=int)
+            result = await self.call(self.db.return_book, body['borrow_id'])
+        return 200, _result(result)
+
+    async def _reserve(self, params, query, body):
+        _require(body, 'reader_id', 'book_id')
+        return 200, _result(await self.call(self.db.reserve_book, body['reader_id'], body['book_id']))
+
+    async def _cancel_reservation(self, params, query, body):
+        try:
+            reservation_id = int(params['id'])
+        except ValueError:
+            raise ServiceError(400, "預約編號必須是整數")
+        if not await self.call(self.db.cancel_reservation, reservation_id):
+            raise ServiceError(404, "沒有這筆進行中的預約")
+        return 200, {'ok': True}
+
+    # --- 讀者 ---
+    async def _login(self, params, query, body):
+        _require(body, 'reader_id', 'password')
+        # 雜湊驗證在執行緒池上跑 (hashlib 計算時會放開 GIL)，不會卡住事件迴圈
+        user = await self.call(self.db.verify_login, body['reader_id'], body['password'])
+        if user is None:
+            raise ServiceError(401, "帳號或密碼錯誤")
+        return 200, {'reader_id': user[0], 'name': user[1], 'email': user[2], 'credit': user[4]}
+
+    async def _list_readers(self, params, query, body):
+        sort = query.get('sort', 'ReaderID')
+        if sort not in DBManager.READER_SORT_COLUMNS:
+            raise ServiceError(400, f"不支援的排序欄位: {sort}")
+        # after = [排序欄位值, ReaderID]；Email 可能是 null、Credit 是數字
+        after = _key_param(query, 'after', (str, int, float, type(None)), str)
+        rows, key = await self.call(self.db.get_readers_page, after,
+                                    _int(query, 'limit', 100, high=1000), sort,
+                                    query.get('desc') in ('1', 'true'), query.get('q', ''))
+        return 200, {'rows': rows, 'next': key}
+
+    async def _count_readers(self, params, query, body):
+        return 200, {'count': await self.call(self.db.count_readers, query.get('q', ''))}
+
+    async def _create_reader(self, params, query, body):
+        _require(body, 'reader_id', 'name')
+        email = _optional(body, 'email')
+        if body.get('password'):
+            _require(body, 'password')
+            ok = await self.call(self.db.register_reader, body['reader_id'], body['name'], email, body['password'])
+        else:
+            credit = _to_int(body.get('credit', 100), 'credit')
+            ok = await self.call(self.db.add_reader, body['reader_id'], body['name'], email, credit)
+        if not ok:
+            raise ServiceError(409, "讀者編號已被使用")
+        return 201, {'ok': True, 'reader_id': body['reader_id']}
+
+    async def _get_reader(self, params, query, body):
+        row = await self.call(self.db.get_reader_row, params['id'])
+        if row is None:
+            raise ServiceError(404, "查無此讀者")
+        data = dict(zip(('reader_id', 'name', 'email', 'credit'), row))
+        data['active_loans'] = await self.call(self.db.get_active_loans, params['id'])
+        data['loan_limit'] = self.db.loan_limit
+        return 200, data
+
+    async def _update_reader(self, params, query, body):
+        _require(body, 'name')
+        _require(body, 'credit', kind=(int, str))
+        credit = _to_int(body['credit'], 'credit')
+        email = _optional(body, 'email')
+        if await self.call(self.db.get_reader_row, params['id']) is None:
+            raise ServiceError(404, "查無此讀者")
+        if not await self.call(self.db.update_reader_info, params['id'], body['name'], email, credit):
+            raise ServiceError(500, "更新失敗")
+        return 200, {'ok': True}
+
+    async def _delete_reader(self, params, query, body):
+        if await self.call(self.db.get_reader_row, params['id']) is None:
+            raise ServiceError(404, "查無此讀者")
+        if not await self.call(self.db.delete_reader, params['id']):
+            raise ServiceError(409, "讀者還有借閱中的書或進行中的預約，不能刪除")
+        return 200, {'ok': True}
+
+    async def _reader_history(self, params, query, body):
+        # after = [BorrowDate (天數), BorrowID]
+        after = _key_param(query, 'after', int, int)
+        rows, key = await self.call(self.db.get_borrow_history_page, params['id'], after,
+                                    _int(query, 'limit', 50, high=500))
+        fields = ('borrow_id', 'title', 'borrow_date', 'due_date', 'return_date')
+        return 200, {'rows': [dict(zip(fields, row)) for row in rows], 'next': key}
+
+    async def _reader_summary(self, params, query, body):
+        count, latest, active = await self.call(self.db.get_borrow_summary, params['id'])
+        if latest is not None:
+            latest = dict(zip(('title', 'borrow_date', 'due_date', 'return_date'), latest))
+        return 200, {'count': count, 'latest': latest, 'active_loans': active, 'loan_limit': self.db.loan_limit}
+
+    # --- 標準函式庫的 HTTP/1.1 伺服器 ---
+    async def serve(self, host='127.0.0.1', port=8765):
+        server = await asyncio.start_server(self._connection, host, port)
+        addresses = ', '.join(f"http://{sock.getsockname()[0]}:{sock.getsockname()[1]}" for sock in server.sockets)
+        log.info("圖書館服務已啟動: %s (資料庫執行緒 %d 條)", addresses, self.max_workers)
+        async with server:
+            await server.serve_forever()
+
+    async def _connection(self, reader, writer):
+        """一條連線可以連續送多個請求 (keep-alive)；格式錯誤或用戶端關閉時結束"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    await self._write(writer, 400, b'{"error": "bad request"}', [], keep_alive=False)
+                    break
+                headers = {}
+                for _ in range(MAX_HEADER_LINES):
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                try:
+                    length = int(headers.get('content-length') or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    await self._write(writer, 400, b'{"error": "bad content-length"}', [], keep_alive=False)
+                    break
+                if length > MAX_BODY:
+                    await self._write(writer, 413, b'{"error": "payload too large"}', [], keep_alive=False)
+                    break
+                body = await reader.readexactly(length) if length else b''
+                keep_alive = (headers.get('connection', '').lower() != 'close'
+                              and not (version == 'HTTP/1.0' and headers.get('connection', '').lower() != 'keep-alive'))
+                status, data, extra = await self.handle(method.upper(), target, body)
+                await self._write(writer, status, data, extra, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _write(self, writer, status, data, extra, keep_alive):
+        head = [f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}",
+                "Content-Type: application/json; charset=utf-8",
+                f"Content-Length: {len(data)}",
+                f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        head += [f"{name}: {value}" for name, value in extra]
+        writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + data)
+        await writer.drain()
+
+    # --- ASGI ---
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            while True:
+                message = await receive()
+                if message['type'] == 'lifespan.startup':
+                    await send({'type': 'lifespan.startup.complete'})
+                elif message['type'] == 'lifespan.shutdown':
+                    self.close()
+                    await send({'type': 'lifespan.shutdown.complete'})
+                    return
+        if scope['type'] != 'http':
+            return
+        body = b''
+        while True:
+            message = await receive()
+            body += message.get('body', b'')
+            if len(body) > MAX_BODY:
+                status, data, extra = 413, b'{"error": "payload too large"}', []
+                break
+            if not message.get('more_body'):
+                target = scope['path'] + ('?' + scope['query_string'].decode('latin-1') if scope.get('query_string') else '')
+                status, data, extra = await self.handle(scope['method'], target, body)
+                break
+        headers = [(b'content-type', b'application/json; charset=utf-8'), (b'content-length', str(len(data)).encode())]
+        headers += [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in extra]
+        await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+        await send({'type': 'http.response.body', 'body': data})
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        self.db.close()
+
+
+async def asgi_request(app, method, path, payload=None):
+    """
+    不開網路連線、直接呼叫 ASGI app 的測試用請求，回傳 (狀態碼, JSON 解析後的內容, 標頭 dict)
+    例: status, data, _ = asyncio.run(asgi_request(service, 'GET', '/books?q=Python'))
+    """
+    split = urlsplit(path)
+    body = json.dumps(payload).encode('utf-8') if payload is not None else b''
+    scope = {'type': 'http', 'method': method, 'path': split.path, 'query_string': split.query.encode('latin-1'),
+             'headers': [(b'content-type', b'application/json')]}
+    messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0) if messages else {'type': 'http.disconnect'}
+
+    async def send(message):
+        sent.append(message)
+
+    await app(scope, receive, send)
+    headers = {k.decode('latin-1'): v.decode('latin-1') for k, v in sent[0]['headers']}
+    return sent[0]['status'], json.loads(sent[1]['body']), headers
+
+
+def __getattr__(name):
+    # `uvicorn library_service:app` 時才建立服務並開啟資料庫 (import 這個模組本身不會碰資料庫)
+    if name == 'app':
+        global app
+        app = LibraryService(DBManager(DB_PATH))
+        return app
+    raise AttributeError(name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="圖書館 JSON 服務")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--db', default=DB_PATH)
+    parser.add_argument('--workers', type=int, default=8, help="執行資料庫呼叫的執行緒數")
+    parser.add_argument('--max-pending', type=int, default=64, help="超過這麼多請求在排隊時回 503")
+    args = parser.parse_args()
+
+    setup_logging()
+    service = LibraryService(DBManager(args.db), max_workers=args.workers, max_pending=args.max_pending)
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+
+
+if __name__ == '__main__':
+    main()
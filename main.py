@@ -6,6 +6,7 @@
 
 import wx
 from app_logic import MainFrame
+from instrumentation import setup_logging
 
 class MyApp(wx.App):
     def OnInit(self):
@@ -21,6 +22,8 @@ class MyApp(wx.App):
         return True
 
 if __name__ == '__main__':
+    # 日誌由背景執行緒寫出，UI 執行緒記錄時不會卡在 I/O
+    setup_logging()
     # 運行應用程式
     app = MyApp(0)
     app.MainLoop()
\ No newline at end of file
@@ -0,0 +1,393 @@
+# -*- coding: utf-8 -*-
+###########################################################################
+## migrations.py - 資料庫結構版本管理 (PRAGMA user_version)
+###########################################################################
+##
+## 每個步驟 (版本號, 說明, 函式) 只會執行一次，執行完把 user_version 設成該版本號。
+## 新增結構變更時：在 MIGRATIONS 最後面加一個新步驟，不要修改已經發佈的步驟。
+## 程式啟動時 DBManager 會自動把舊資料庫升級到最新版本。
+
+import logging
+
+log = logging.getLogger(__name__)
+
+
+def _initial_schema(conn):
+    """基本資料表 (舊版程式建立的資料庫已經有這些表格，IF NOT EXISTS 直接略過)"""
+    conn.execute("CREATE TABLE IF NOT EXISTS Books (BookID TEXT PRIMARY KEY, Title TEXT, Author TEXT, ISBN TEXT, Available INTEGER)")
+    conn.execute("CREATE TABLE IF NOT EXISTS Readers (ReaderID TEXT PRIMARY KEY, Name TEXT, Email TEXT, Password TEXT, Credit INTEGER)")
+    conn.execute("CREATE TABLE IF NOT EXISTS Borrows (BorrowID INTEGER PRIMARY KEY AUTOINCREMENT, BookID TEXT, ReaderID TEXT, BorrowDate TEXT, DueDate TEXT, ReturnDate TEXT)")
+
+
+def create_search_triggers(conn):
+    """
+    讓 BooksFTS 跟著 Books 同步的觸發器
+    (批次匯入時會先拿掉觸發器、匯入完再呼叫這裡重建，所以獨立成一個函式)
+    """
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS Books_fts_insert AFTER INSERT ON Books BEGIN
+            INSERT INTO BooksFTS(rowid, Title, Author, ISBN) VALUES (new.rowid, new.Title, new.Author, new.ISBN);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS Books_fts_delete AFTER DELETE ON Books BEGIN
+            INSERT INTO BooksFTS(BooksFTS, rowid, Title, Author, ISBN) VALUES ('delete', old.rowid, old.Title, old.Author, old.ISBN);
+        END
+    """)
+    # 只在書名/作者/ISBN 變動時更新索引，借還書改 Available 不會動到 FTS
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS Books_fts_update AFTER UPDATE OF Title, Author, ISBN ON Books BEGIN
+            INSERT INTO BooksFTS(BooksFTS, rowid, Title, Author, ISBN) VALUES ('delete', old.rowid, old.Title, old.Author, old.ISBN);
+            INSERT INTO BooksFTS(rowid, Title, Author, ISBN) VALUES (new.rowid, new.Title, new.Author, new.ISBN);
+        END
+    """)
+
+
+def restore_search_index(conn):
+    """
+    裝回書名索引與全文索引觸發器，並依 Books 重建 BooksFTS (呼叫端負責交易)
+    批次匯入結束時呼叫；匯入中途程式被關掉的話，下次啟動由 check_search_index 補回
+    """
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_books_title ON Books(Title)")
+    create_search_triggers(conn)
+    conn.execute("INSERT INTO BooksFTS(BooksFTS) VALUES ('rebuild')")
+
+
+def check_search_index(conn):
+    """
+    確認批次匯入拿掉的書名索引與全文索引觸發器都還在，缺少的話補回並重建全文索引，回傳是否有修復
+    平常只多一次 sqlite_master 查詢；conn 必須是 autocommit 模式，結構要已經是第 3 版以上
+    """
+    names = ('idx_books_title', 'Books_fts_insert', 'Books_fts_update', 'Books_fts_delete')
+    present = conn.execute(f"SELECT COUNT(*) FROM sqlite_master WHERE name IN ({','.join('?' * len(names))})",
+                           names).fetchone()[0]
+    if present == len(names):
+        return False
+    log.warning("書名索引或全文索引觸發器不見了 (批次匯入中途中斷？)，重新建立")
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        restore_search_index(conn)
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+    return True
+
+
+def _search_index(conn):
+    """
+    書籍全文檢索索引 (FTS5, trigram 分詞)
+    trigram 以每 3 個字元為一組建索引，不需要斷詞，中文書名/作者也能做子字串搜尋。
+    BooksFTS 是 external content table，內容直接讀 Books，由觸發器保持同步。
+    """
+    exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'BooksFTS'").fetchone() is not None
+
+    conn.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS BooksFTS USING fts5(
+            Title, Author, ISBN, content='Books', content_rowid='rowid', tokenize='trigram'
+        )
+    """)
+    create_search_triggers(conn)
+
+    # 舊資料庫第一次建立索引時，把既有書籍全部灌進去
+    if not exists:
+        conn.execute("INSERT INTO BooksFTS(BooksFTS) VALUES ('rebuild')")
+
+
+def _lookup_indexes(conn):
+    """
+    借閱紀錄查詢用的索引
+    - 讀者借閱歷史: WHERE ReaderID = ? ORDER BY BorrowDate
+    - 某本書目前借出中的紀錄 (還書、逾期檢查)：部分索引只收 ReturnDate IS NULL 的資料，
+      歷史紀錄再多，索引大小只跟「目前借出的數量」有關
+    """
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_borrows_reader_date ON Borrows(ReaderID, BorrowDate)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_borrows_open_book ON Borrows(BookID) WHERE ReturnDate IS NULL")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_books_title ON Books(Title)")
+    conn.execute("ANALYZE")
+
+
+def _reader_list_indexes(conn):
+    """
+    管理員讀者清單的排序與搜尋
+    - (排序欄位, ReaderID) 複合索引：依姓名/Email/信用分排序時可以直接用 keyset 分頁
+    - ReadersFTS (trigram)：讀者編號/姓名/Email 的子字串搜尋
+    """
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_readers_name ON Readers(Name, ReaderID)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_readers_email ON Readers(Email, ReaderID)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_readers_credit ON Readers(Credit, ReaderID)")
+
+    conn.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS ReadersFTS USING fts5(
+            ReaderID, Name, Email, content='Readers', content_rowid='rowid', tokenize='trigram'
+        )
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS Readers_fts_insert AFTER INSERT ON Readers BEGIN
+            INSERT INTO ReadersFTS(rowid, ReaderID, Name, Email) VALUES (new.rowid, new.ReaderID, new.Name, new.Email);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS Readers_fts_delete AFTER DELETE ON Readers BEGIN
+            INSERT INTO ReadersFTS(ReadersFTS, rowid, ReaderID, Name, Email) VALUES ('delete', old.rowid, old.ReaderID, old.Name, old.Email);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS Readers_fts_update AFTER UPDATE OF ReaderID, Name, Email ON Readers BEGIN
+            INSERT INTO ReadersFTS(ReadersFTS, rowid, ReaderID, Name, Email) VALUES ('delete', old.rowid, old.ReaderID, old.Name, old.Email);
+            INSERT INTO ReadersFTS(rowid, ReaderID, Name, Email) VALUES (new.rowid, new.ReaderID, new.Name, new.Email);
+        END
+    """)
+    conn.execute("INSERT INTO ReadersFTS(ReadersFTS) VALUES ('rebuild')")
+    conn.execute("ANALYZE Readers")
+
+
+def _fines(conn):
+    """
+    逾期罰款 (fines.py)
+    - Fines：每筆逾期借閱一列，記錄目前累計的逾期天數與罰款
+    - JobState：批次工作的進度 (high-water mark)，下次從這裡接著算
+    - 兩個部分索引只收逾期相關的資料，借閱紀錄再多也很小：
+      未還書依到期日排序，以及逾期後才歸還的紀錄依歸還日排序
+    """
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS Fines (
+            BorrowID INTEGER PRIMARY KEY, ReaderID TEXT NOT NULL,
+            Days INTEGER NOT NULL, Amount INTEGER NOT NULL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_fines_reader ON Fines(ReaderID)")
+    conn.execute("CREATE TABLE IF NOT EXISTS JobState (Name TEXT PRIMARY KEY, HighWater TEXT)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_borrows_open_due ON Borrows(DueDate) WHERE ReturnDate IS NULL")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_borrows_late_return ON Borrows(ReturnDate) WHERE ReturnDate > DueDate")
+
+
+def _epoch_day(column):
+    """把 'YYYY-MM-DD' 文字轉成 1970-01-01 起算的天數 (與 db_manager.to_day 相同)"""
+    return f"CAST(julianday({column}) - 2440587.5 AS INTEGER)"
+
+
+def _integer_dates(conn):
+    """
+    借閱日期改存整數天數 (1970-01-01 起算)
+    原本的 'YYYY-MM-DD' 文字每個值 10 bytes，整數只要 2~3 bytes，日期比較也從字串比較變成整數比較。
+    SQLite 不能直接改欄位型別，所以建新表、複製、換名，再把索引建回來。
+    """
+    conn.execute("""
+        CREATE TABLE Borrows_new (
+            BorrowID INTEGER PRIMARY KEY AUTOINCREMENT, BookID TEXT, ReaderID TEXT,
+            BorrowDate INTEGER, DueDate INTEGER, ReturnDate INTEGER
+        )
+    """)
+    conn.execute(f"""
+        INSERT INTO Borrows_new (BorrowID, BookID, ReaderID, BorrowDate, DueDate, ReturnDate)
+        SELECT BorrowID, BookID, ReaderID, {_epoch_day('BorrowDate')}, {_epoch_day('DueDate')}, {_epoch_day('ReturnDate')}
+        FROM Borrows
+    """)
+    # 保留 AUTOINCREMENT 的計數 (刪除過的最大編號不會被重新使用)
+    row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'Borrows'").fetchone()
+    conn.execute("DROP TABLE Borrows")
+    conn.execute("ALTER TABLE Borrows_new RENAME TO Borrows")
+    if row:
+        conn.execute("UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = 'Borrows'", row)
+
+    conn.execute("CREATE INDEX idx_borrows_reader_date ON Borrows(ReaderID, BorrowDate)")
+    conn.execute("CREATE INDEX idx_borrows_open_book ON Borrows(BookID) WHERE ReturnDate IS NULL")
+    conn.execute("CREATE INDEX idx_borrows_open_due ON Borrows(DueDate) WHERE ReturnDate IS NULL")
+    conn.execute("CREATE INDEX idx_borrows_late_return ON Borrows(ReturnDate) WHERE ReturnDate > DueDate")
+
+    # 罰款工作的進度也是日期
+    conn.execute("CREATE TABLE JobState_new (Name TEXT PRIMARY KEY, HighWater INTEGER)")
+    conn.execute(f"INSERT INTO JobState_new SELECT Name, {_epoch_day('HighWater')} FROM JobState")
+    conn.execute("DROP TABLE JobState")
+    conn.execute("ALTER TABLE JobState_new RENAME TO JobState")
+    conn.execute("ANALYZE Borrows")
+
+
+def _reservations(conn):
+    """
+    預約 (沒有庫存時排隊)
+    Status: waiting 排隊中 / ready 書已保留待取 / fulfilled 已借走 / cancelled 取消 / expired 逾期未取
+    ReservationID 遞增，同一本書依 ReservationID 先到先得。
+    幾個部分索引都只收「還在進行中」的預約，歷史預約再多也不影響：
+    - idx_reservations_queue：某本書下一位排隊的讀者 (還書時用)，不必掃過整個隊伍
+    - idx_reservations_active：同一位讀者對同一本書只能有一筆進行中的預約，借書時也用它找保留的書
+    - idx_reservations_hold：找出超過保留期限沒來取書的預約
+    """
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS Reservations (
+            ReservationID INTEGER PRIMARY KEY AUTOINCREMENT, BookID TEXT NOT NULL, ReaderID TEXT NOT NULL,
+            ReservedDate INTEGER NOT NULL, Status TEXT NOT NULL DEFAULT 'waiting', HoldUntil INTEGER
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_reservations_queue ON Reservations(BookID, ReservationID) WHERE Status = 'waiting'")
+    conn.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_reservations_active ON Reservations(BookID, ReaderID)
+        WHERE Status IN ('waiting', 'ready')
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_reservations_hold ON Reservations(HoldUntil) WHERE Status = 'ready'")
+
+
+def create_loan_triggers(conn):
+    """
+    讓 ReaderLoans.ActiveLoans 跟著 Borrows 同步的觸發器
+    (之後如果又要重建 Borrows 資料表，DROP TABLE 會一併刪掉觸發器，重建完要再呼叫這裡)
+    """
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS Borrows_loans_insert AFTER INSERT ON Borrows
+        WHEN new.ReturnDate IS NULL BEGIN
+            INSERT INTO ReaderLoans (ReaderID, ActiveLoans) VALUES (new.ReaderID, 1)
+            ON CONFLICT(ReaderID) DO UPDATE SET ActiveLoans = ActiveLoans + 1;
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS Borrows_loans_delete AFTER DELETE ON Borrows
+        WHEN old.ReturnDate IS NULL BEGIN
+            UPDATE ReaderLoans SET ActiveLoans = ActiveLoans - 1 WHERE ReaderID = old.ReaderID;
+        END
+    """)
+    # 還書 (ReturnDate 由 NULL 變成日期) 減一；更正紀錄把 ReturnDate 清掉或改了讀者時也照樣對得上
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS Borrows_loans_update AFTER UPDATE OF ReturnDate, ReaderID ON Borrows
+        WHEN (old.ReturnDate IS NULL) != (new.ReturnDate IS NULL) OR old.ReaderID IS NOT new.ReaderID BEGIN
+            UPDATE ReaderLoans SET ActiveLoans = ActiveLoans - 1
+            WHERE ReaderID = old.ReaderID AND old.ReturnDate IS NULL;
+            INSERT INTO ReaderLoans (ReaderID, ActiveLoans) SELECT new.ReaderID, 1 WHERE new.ReturnDate IS NULL
+            ON CONFLICT(ReaderID) DO UPDATE SET ActiveLoans = ActiveLoans + 1;
+        END
+    """)
+
+
+def _loan_counters(conn):
+    """
+    每位讀者目前借出中的本數 (借閱上限檢查、狀態顯示用)
+    ReaderLoans 由 Borrows 上的觸發器維護，查詢只要一次主鍵查找，不必每次 COUNT 借閱紀錄。
+    另外開一張表而不是在 Readers 加欄位：既有程式都用 INSERT INTO Readers VALUES (5 個值) 新增讀者。
+    """
+    conn.execute("CREATE TABLE IF NOT EXISTS ReaderLoans (ReaderID TEXT PRIMARY KEY, ActiveLoans INTEGER NOT NULL DEFAULT 0)")
+    conn.execute("""
+        INSERT INTO ReaderLoans (ReaderID, ActiveLoans)
+        SELECT ReaderID, COUNT(*) FROM Borrows WHERE ReturnDate IS NULL GROUP BY ReaderID
+    """)
+    create_loan_triggers(conn)
+
+
+def create_copy_triggers(conn):
+    """
+    讓 Books.Available 等於這本書 Status = 'available' 的冊數：每一冊狀態改變時加減一
+    (不能直接改 Available；新增館藏、借還書都是改 Copies，計數交給觸發器)
+    """
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS Copies_available_insert AFTER INSERT ON Copies
+        WHEN new.Status = 'available' BEGIN
+            UPDATE Books SET Available = Available + 1 WHERE BookID = new.BookID;
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS Copies_available_delete AFTER DELETE ON Copies
+        WHEN old.Status = 'available' BEGIN
+            UPDATE Books SET Available = Available - 1 WHERE BookID = old.BookID;
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS Copies_available_update AFTER UPDATE OF Status, BookID ON Copies
+        WHEN (old.Status = 'available') != (new.Status = 'available') OR old.BookID IS NOT new.BookID BEGIN
+            UPDATE Books SET Available = Available - 1 WHERE BookID = old.BookID AND old.Status = 'available';
+            UPDATE Books SET Available = Available + 1 WHERE BookID = new.BookID AND new.Status = 'available';
+        END
+    """)
+
+
+def _copies(conn):
+    """
+    館藏改為一冊一筆 (Copies)，每一冊有自己的條碼、所在分館、狀態與書況
+    Status: available 在架上 / on_loan 借出中 / held 保留給預約讀者 / repair 修補中 / lost 遺失 / withdrawn 已註銷
+    - Barcode 是主鍵 (WITHOUT ROWID)，刷條碼只要一次主鍵查找
+    - idx_copies_book_status：某本書在架上的冊、某本書全部的冊
+    - Borrows.Barcode 記錄借走的是哪一冊 (還書時刷條碼走 idx_borrows_open_barcode)；
+      Reservations.Barcode 記錄保留給讀者的是哪一冊
+    既有資料依 Available、借出中的紀錄、保留中的預約各自產生一冊，條碼為 BookID-001、BookID-002...
+    Books.Available 之後改由 Copies 上的觸發器維護。
+    """
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS Copies (
+            Barcode TEXT PRIMARY KEY, BookID TEXT NOT NULL, Branch TEXT NOT NULL DEFAULT '總館',
+            Status TEXT NOT NULL DEFAULT 'available', Condition TEXT
+        ) WITHOUT ROWID
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_copies_book_status ON Copies(BookID, Status)")
+    conn.execute("ALTER TABLE Borrows ADD COLUMN Barcode TEXT")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_borrows_open_barcode ON Borrows(Barcode) WHERE ReturnDate IS NULL")
+    conn.execute("ALTER TABLE Reservations ADD COLUMN Barcode TEXT")
+
+    conn.execute("""
+        CREATE TEMP TABLE copy_plan AS
+        WITH RECURSIVE seq(n) AS (
+            SELECT 1 UNION ALL SELECT n + 1 FROM seq WHERE n < (SELECT MAX(Available) FROM Books)
+        ),
+        units(BookID, Kind, RefID, Status) AS (
+            SELECT b.BookID, 0, NULL, 'available' FROM Books b JOIN seq ON seq.n <= b.Available
+            UNION ALL
+            SELECT BookID, 1, BorrowID, 'on_loan' FROM Borrows WHERE ReturnDate IS NULL
+            UNION ALL
+            SELECT BookID, 2, ReservationID, 'held' FROM Reservations WHERE Status = 'ready'
+        )
+        SELECT printf('%s-%03d', BookID, ROW_NUMBER() OVER (PARTITION BY BookID ORDER BY Kind, RefID)) AS Barcode,
+               BookID, Kind, RefID, Status
+        FROM units
+    """)
+    conn.execute("INSERT INTO Copies (Barcode, BookID, Status) SELECT Barcode, BookID, Status FROM copy_plan")
+    conn.execute("UPDATE Borrows SET Barcode = p.Barcode FROM copy_plan p WHERE p.Kind = 1 AND Borrows.BorrowID = p.RefID")
+    conn.execute("""
+        UPDATE Reservations SET Barcode = p.Barcode FROM copy_plan p WHERE p.Kind = 2 AND Reservations.ReservationID = p.RefID
+    """)
+    conn.execute("DROP TABLE temp.copy_plan")
+    create_copy_triggers(conn)
+    conn.execute("ANALYZE Copies")
+
+
+MIGRATIONS = [
+    (1, "基本資料表", _initial_schema),
+    (2, "書籍全文檢索索引", _search_index),
+    (3, "借閱紀錄與書名索引", _lookup_indexes),
+    (4, "讀者清單排序與搜尋索引", _reader_list_indexes),
+    (5, "逾期罰款", _fines),
+    (6, "借閱日期改存整數", _integer_dates),
+    (7, "預約排隊", _reservations),
+    (8, "讀者借閱中本數", _loan_counters),
+    (9, "館藏分冊與條碼", _copies),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def current_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn, target=SCHEMA_VERSION):
+    """
+    把資料庫升級到 target 版本，回傳實際執行的步驟數
+    conn 必須是 autocommit 模式 (isolation_level=None)，每個步驟各自一個交易，
+    中途失敗時已完成的步驟會保留，下次啟動從失敗的步驟繼續。
+    """
+    applied = 0
+    for version, description, step in MIGRATIONS:
+        if version > target or version <= current_version(conn):
+            continue
+        conn.execute("BEGIN IMMEDIATE")
+        # 拿到寫入鎖後再確認一次，避免兩個程式同時啟動時重複執行同一個步驟
+        if version <= current_version(conn):
+            conn.rollback()
+            continue
+        log.info("資料庫升級至第 %d 版: %s", version, description)
+        try:
+            step(conn)
+            # PRAGMA 不能用參數綁定；version 是程式內的整數
+            conn.execute(f"PRAGMA user_version = {int(version)}")
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+        applied += 1
+    return applied
@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+###########################################################################
+## paged_cache.py - 虛擬清單 (wx.LC_VIRTUAL) 用的分頁資料快取
+###########################################################################
+
+import logging
+import threading
+from collections import OrderedDict
+
+log = logging.getLogger(__name__)
+
+
+class PagedRowCache:
+    """
+    依「第幾列」取資料，背後用 keyset 分頁向資料庫一頁一頁讀取。
+
+    fetch_page(after_key, limit) -> (rows, last_key)
+        after_key 為 None 代表從頭開始；last_key 是這頁最後一筆的排序鍵，
+        下一頁就從它之後開始讀。
+
+    只保留最近用過的 max_pages 頁，不論結果有幾萬筆，記憶體用量都是固定的。
+    每一頁的起始 key 會記下來 (每頁一個值)，之後跳回已經看過的位置不必重新從頭走。
+    可以在背景執行緒呼叫 get_page() 預先載入，UI 執行緒用 get_row(index, load=False) 只讀快取。
+    """
+
+    def __init__(self, fetch_page, page_size=50, max_pages=20):
+        self.fetch_page = fetch_page
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self._lock = threading.Lock()        # 保護快取內容，只會短暫持有
+        self._load_lock = threading.Lock()   # 同一時間只有一個執行緒在向資料庫讀取
+        self._generation = 0
+        self.reset()
+
+    def reset(self):
+        """清空快取 (換了查詢條件時呼叫)"""
+        with self._lock:
+            self._generation += 1
+            self.pages = OrderedDict()
+            self.page_keys = [None]  # page_keys[p] = 第 p 頁開始前的最後一個 key
+            self.exhausted = False   # 已經讀到最後一頁
+            self.total = None        # 讀到最後一頁之後才知道的實際筆數
+
+    def get_row(self, index, load=True):
+        """取得第 index 列，超出範圍回傳 None；load=False 時只查快取，不在快取裡也回傳 None"""
+        page_no, offset = divmod(index, self.page_size)
+        if load:
+            page = self.get_page(page_no)
+        else:
+            with self._lock:
+                page = self.pages.get(page_no)
+        if page is None or offset >= len(page):
+            return None
+        return page[offset]
+
+    def get_page(self, page_no):
+        with self._load_lock:
+            with self._lock:
+                if page_no in self.pages:
+                    self.pages.move_to_end(page_no)
+                    return self.pages[page_no]
+
+            # 還不知道這頁的起始 key：從已知的最後一頁往後一頁一頁走過去
+            while len(self.page_keys) <= page_no:
+                if self.exhausted:
+                    return None
+                self._load(len(self.page_keys) - 1)
+            return self._load(page_no)
+
+    def _load(self, page_no):
+        generation = self._generation
+        rows, last_key = self.fetch_page(self.page_keys[page_no], self.page_size)
+        with self._lock:
+            if generation != self._generation:
+                return None  # 讀取期間被 reset 了，這頁資料已經過時
+            if len(rows) < self.page_size:
+                self.exhausted = True
+                total = page_no * self.page_size + len(rows)
+                self.total = total if self.total is None else min(self.total, total)
+            if rows and page_no == len(self.page_keys) - 1:
+                self.page_keys.append(last_key)
+
+            self.pages[page_no] = rows
+            if len(self.pages) > self.max_pages:
+                self.pages.popitem(last=False)
+        return rows
+
+    def replace_row(self, match, row):
+        """
+        把快取中第一筆 match(row) 為 True 的資料換成 row，回傳它的列號 (不在快取中回傳 None)
+        只修改一筆資料時用，不必整個清單重新讀取
+        """
+        with self._lock:
+            for page_no, page in self.pages.items():
+                for offset, old in enumerate(page):
+                    if match(old):
+                        page[offset] = row
+                        return page_no * self.page_size + offset
+        return None
+
+
+class VirtualListModel:
+    """
+    把 PagedRowCache 接到虛擬清單 (gui.VirtualListCtrl)：
+    清單要畫哪一列，才請 worker 在背景讀那一頁，還沒讀到的列先顯示「載入中」。
+
+    fetch_page(after_key, limit) 在背景執行緒被呼叫；
+    每次 reset 都換一個新的 PagedRowCache，舊查詢還在背景讀取的頁面不會混進新結果。
+    """
+
+    def __init__(self, list_ctrl, worker, fetch_page, page_size=50, loading_col=1):
+        self.list_ctrl = list_ctrl
+        self.worker = worker
+        self.fetch_page = fetch_page
+        self.page_size = page_size
+        self.loading_col = loading_col
+        list_ctrl.item_text_getter = self.get_item_text
+        self.reset(0)
+
+    def reset(self, count, fetch_page=None):
+        if fetch_page is not None:
+            self.fetch_page = fetch_page
+        self.rows = PagedRowCache(self.fetch_page, page_size=self.page_size)
+        self.pending_pages = set()  # 已經請背景執行緒讀取、還沒回來的頁
+        self.list_ctrl.SetItemCount(count)
+        self.list_ctrl.Refresh()
+
+    def get_row(self, index):
+        """只查快取 (畫面上看得到的列一定已經讀進來了)"""
+        return self.rows.get_row(index, load=False)
+
+    def get_item_text(self, item, col):
+        row = self.rows.get_row(item, load=False)
+        if row is None:
+            self.request_page(item // self.page_size)
+            return "載入中..." if col == self.loading_col else ""
+        return str(row[col])
+
+    def request_page(self, page_no):
+        if page_no in self.pending_pages:
+            return
+        self.pending_pages.add(page_no)
+        rows = self.rows
+        # 捲動時一直在讀，不顯示忙碌游標
+        self.worker.submit(rows.get_page, page_no, on_done=lambda _: self._page_loaded(rows, page_no),
+                           on_error=lambda error: self._page_failed(rows, page_no, error), busy=False)
+
+    def _page_loaded(self, rows, page_no):
+        if rows is not self.rows:
+            return  # 已經 reset 過
+        self.pending_pages.discard(page_no)
+        # 清單的筆數是先 COUNT 出來的，之後資料被刪掉就會比實際多；
+        # 多出來的列永遠讀不到，不縮回去的話每次重畫都會再請背景讀一次
+        if rows.total is not None and rows.total < self.list_ctrl.GetItemCount():
+            self.list_ctrl.SetItemCount(rows.total)
+            self.list_ctrl.Refresh()
+            return
+        first = page_no * self.page_size
+        last = min(first + self.page_size, self.list_ctrl.GetItemCount()) - 1
+        if last >= first:
+            self.list_ctrl.RefreshItems(first, last)
+
+    def _page_failed(self, rows, page_no, error):
+        """讀取失敗：記下錯誤，這頁不再算「讀取中」，下次重畫到這些列時會重新請背景讀取"""
+        log.error("讀取第 %d 頁失敗: %s", page_no, error, exc_info=error)
+        if rows is self.rows:
+            self.pending_pages.discard(page_no)
+
+    def replace_row(self, match, row):
+        """更新單一列的資料並只重畫那一列"""
+        index = self.rows.replace_row(match, row)
+        if index is not None:
+            self.list_ctrl.RefreshItem(index)
+        return index
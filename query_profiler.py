@@ -0,0 +1,315 @@
+# -*- coding: utf-8 -*-
+###########################################################################
+## query_profiler.py - SQL 查詢剖析 (預設關閉)：每個 SQL 的次數、時間、回傳筆數、VM 步數與查詢計畫
+## 開啟: LIBRARY_PROFILE_SQL=50 python main.py   (超過 50 ms 的 SQL 自動記下 EXPLAIN QUERY PLAN)
+##       或 DBManager(path, profiler=QueryProfiler(slow_ms=50, explain_all=True))
+## 報表: profiler.report()；檢查: profiler.assert_no_full_scans(allow={'Books'})
+###########################################################################
+##
+## 做法：連線池用 ProfilingConnection 開連線，execute / executemany 回傳 ProfilingCursor，
+## 執行與讀取結果的時間、筆數都累加到同一個 SQL 的 QueryStats；
+## set_progress_handler 每 PROGRESS_STEPS 個 VM 指令加一次計數 (和機器快慢無關的工作量)，
+## set_trace_callback 拿到帶入參數後的 SQL 原文 (慢查詢日誌用)。
+## 只在剖析模式下才用這些類別，一般執行完全沒有額外開銷。
+
+import logging
+import re
+import sqlite3
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+PROGRESS_STEPS = 1000
+# 這些語句沒有查詢計畫可看
+_NO_PLAN = re.compile(r'\s*(BEGIN|COMMIT|ROLLBACK|END|SAVEPOINT|RELEASE|PRAGMA|CREATE|DROP|ALTER|ANALYZE|VACUUM|EXPLAIN)\b',
+                      re.IGNORECASE)
+# SCAN x、SCAN x USING [COVERING] INDEX i (整個索引從頭讀到尾也算)；虛擬表、常數列、主鍵範圍不符合
+_SCAN = re.compile(r'^SCAN (\w+)(?: AS \w+)?(?: USING (?:COVERING )?INDEX \w+)?$')
+# FROM / JOIN / UPDATE 後面的表名與別名 (計畫裡只寫別名)
+_TABLE_REF = re.compile(r'\b(?:FROM|JOIN|UPDATE|INTO)\s+(?:\w+\.)?(\w+)(?:\s+(?:AS\s+)?(\w+))?', re.IGNORECASE)
+_NOT_ALIAS = {'WHERE', 'ON', 'USING', 'SET', 'JOIN', 'LEFT', 'INNER', 'CROSS', 'NATURAL', 'ORDER', 'GROUP', 'LIMIT',
+              'VALUES', 'SELECT', 'UNION', 'EXCEPT', 'INTERSECT', 'HAVING', 'WINDOW', 'DEFAULT', 'AS', 'INDEXED',
+              'NOT', 'RETURNING', 'OR', 'AND', 'DO'}
+
+
+def normalize(sql):
+    """把空白壓成一個，當作彙總的 key"""
+    return ' '.join(sql.split())
+
+
+def table_aliases(sql):
+    """SQL 裡 別名 -> 資料表名稱 (暫存表去掉 temp. 前綴)"""
+    aliases = {}
+    for table, alias in _TABLE_REF.findall(sql):
+        aliases.setdefault(table, table)
+        if alias and alias.upper() not in _NOT_ALIAS:
+            aliases[alias] = table
+    return aliases
+
+
+def outer_sql(sql):
+    """只留下最外層的 SQL：括號裡的子查詢、CTE 內容與字串常數都拿掉"""
+    kept, depth, quote = [], 0, None
+    for ch in sql:
+        if quote:
+            if ch == quote:
+                quote = None
+        elif ch in "'\"":
+            quote = ch
+        elif ch == '(':
+            depth += 1
+        elif ch == ')':
+            depth -= 1
+        elif depth == 0:
+            kept.append(ch)
+    return ''.join(kept)
+
+
+def full_scans(plan, sql=''):
+    """
+    查詢計畫 (EXPLAIN QUERY PLAN 的 (id, parent, detail) 列) 裡整張表 (或整個索引) 掃描的資料表名稱，
+    別名依 sql 換回表名。
+    例外：最外層的語句有 LIMIT、而且最外層不必另外排序時 (keyset 分頁的第一頁)，最外層沿著索引依序讀，
+    讀到筆數就停，不算；子查詢裡的掃描、或 LIMIT 只出現在子查詢裡時照算。
+    """
+    aliases = table_aliases(sql)
+    top = [detail for _, parent, detail in plan if parent == 0]
+    ordered_limit = (re.search(r'\bLIMIT\b', outer_sql(sql), re.IGNORECASE)
+                     and not any('TEMP B-TREE FOR ORDER BY' in d for d in top))
+    tables = []
+    for _, parent, detail in plan:
+        m = _SCAN.match(detail)
+        if m and not (ordered_limit and parent == 0 and ' INDEX ' in detail):
+            tables.append(aliases.get(m.group(1), m.group(1)))
+    return tables
+
+
+class QueryStats:
+    """同一個 SQL (正規化後) 的彙總"""
+    __slots__ = ('sql', 'calls', 'total_ms', 'max_ms', 'rows', 'steps', 'plan', 'scans', 'slowest_sql')
+
+    def __init__(self, sql):
+        self.sql = sql
+        self.calls = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows = 0
+        self.steps = 0
+        self.plan = None        # EXPLAIN QUERY PLAN 的 detail 欄位 (list)，還沒擷取時為 None
+        self.scans = []         # 計畫裡整張表掃描的資料表
+        self.slowest_sql = ''   # 最慢那一次帶入參數後的 SQL
+
+
+class QueryProfiler:
+    """
+    收集所有經過 ProfilingConnection 的 SQL。
+    slow_ms:     超過這個時間的 SQL 記一筆 WARNING，並擷取查詢計畫
+    explain_all: 每個不同的 SQL 第一次執行時都擷取查詢計畫 (測試、CI 檢查全表掃描時用)
+    """
+
+    def __init__(self, slow_ms=50, explain_all=False):
+        self.slow_ms = slow_ms
+        self.explain_all = explain_all
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def connection_factory(self):
+        """給 sqlite3.connect(factory=...) / ConnectionPool(factory=...) 用"""
+        profiler = self
+
+        class Connection(ProfilingConnection):
+            pass
+        Connection.profiler = profiler
+        return Connection
+
+    def _stats_for(self, sql):
+        key = normalize(sql)
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = QueryStats(key)
+        return stats
+
+    def record(self, conn, sql, elapsed_ms, call_ms, rows, steps, first):
+        """
+        累加一段執行或讀取結果的時間、筆數、VM 步數
+        call_ms: 這次執行到目前為止的總時間；first: 這次執行的第一筆紀錄 (之後讀取結果時 calls 不重複計算)
+        """
+        stats = self._stats_for(sql)
+        with self._lock:
+            if first:
+                stats.calls += 1
+            stats.total_ms += elapsed_ms
+            stats.rows += rows
+            stats.steps += steps
+            if call_ms > stats.max_ms:
+                stats.max_ms = call_ms
+                stats.slowest_sql = conn.last_expanded_sql or sql
+        return stats
+
+    def inspect(self, conn, stats, sql, params, call_ms):
+        """執行完第一段、或剛超過 slow_ms 時呼叫：必要時擷取查詢計畫，慢的記一筆 WARNING"""
+        slow = call_ms >= self.slow_ms
+        with self._lock:
+            need_plan = stats.plan is None and (slow or self.explain_all) and not _NO_PLAN.match(sql)
+        if need_plan:
+            plan = conn.explain(sql, params)
+            with self._lock:
+                stats.plan = [detail for _, _, detail in plan]
+                stats.scans = full_scans(plan, sql)
+        if slow:
+            log.warning("慢查詢 (%.1f ms): %s | 計畫: %s", call_ms, normalize(conn.last_expanded_sql or sql),
+                        '; '.join(stats.plan or []))
+        return slow
+
+    # --- 結果 ---
+    def stats(self):
+        """全部 SQL 的彙總，依總時間排序 (最花時間的在前)"""
+        with self._lock:
+            return sorted(self._stats.values(), key=lambda s: s.total_ms, reverse=True)
+
+    def full_scan_queries(self, allow=()):
+        """計畫裡有整張表掃描的 SQL: [(QueryStats, [表名, ...]), ...]；allow 裡的表不算"""
+        allow = set(allow)
+        result = []
+        for stats in self.stats():
+            tables = [t for t in stats.scans if t not in allow]
+            if tables:
+                result.append((stats, tables))
+        return result
+
+    def assert_no_full_scans(self, allow=()):
+        """有任何 SQL 會整張表掃描 (allow 以外的表) 時丟出 AssertionError，列出 SQL 與查詢計畫"""
+        offenders = self.full_scan_queries(allow)
+        if offenders:
+            lines = [f"{len(offenders)} 個 SQL 整張表掃描:"]
+            for stats, tables in offenders:
+                lines.append(f"  [{', '.join(tables)}] {stats.sql[:160]}")
+                lines.append(f"      計畫: {'; '.join(stats.plan)}")
+            raise AssertionError('\n'.join(lines))
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+    def report(self, limit=20):
+        """文字報表：最花時間的 limit 個 SQL (次數、總計、最慢、筆數、VM 步數)，有全表掃描的標出表名"""
+        lines = [f"{'次數':>7}{'總計 ms':>11}{'最慢 ms':>10}{'筆數':>10}{'VM 步數(千)':>12}  SQL"]
+        for stats in self.stats()[:limit]:
+            flag = f" ⚠ SCAN {', '.join(stats.scans)}" if stats.scans else ''
+            lines.append(f"{stats.calls:>7}{stats.total_ms:>11.1f}{stats.max_ms:>10.2f}{stats.rows:>10}"
+                         f"{stats.steps:>12}  {stats.sql[:100]}{flag}")
+            if stats.plan and (stats.scans or stats.max_ms >= self.slow_ms):
+                lines.append(f"{'':>50}計畫: {'; '.join(stats.plan)}")
+        return '\n'.join(lines)
+
+
+class ProfilingConnection(sqlite3.Connection):
+    """execute / executemany 改用 ProfilingCursor；開啟時裝上 progress handler 與 trace callback"""
+    profiler = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.steps = 0
+        self.last_expanded_sql = None
+        self._explaining = False
+        self.set_progress_handler(self._on_progress, PROGRESS_STEPS)
+        self.set_trace_callback(self._on_trace)
+
+    def _on_progress(self):
+        self.steps += 1
+        return 0  # 回傳非 0 會中斷查詢
+
+    def _on_trace(self, sql):
+        # 觸發器、FTS 內部執行的語句以 '-- ' 開頭，不是呼叫端送出的 SQL
+        if not self._explaining and not sql.startswith('-- '):
+            self.last_expanded_sql = sql
+
+    def cursor(self, factory=None):
+        return super().cursor(factory or ProfilingCursor)
+
+    def execute(self, sql, params=()):
+        return self.cursor().execute(sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        return self.cursor().executemany(sql, seq_of_params)
+
+    def explain(self, sql, params):
+        """
+        在同一條連線上跑 EXPLAIN QUERY PLAN (不列入統計)，回傳 [(id, parent, detail), ...]
+        失敗時 (例如暫存表已經刪掉) 回傳一列錯誤說明
+        """
+        self._explaining = True
+        try:
+            cursor = sqlite3.Connection.cursor(self)
+            return [(row[0], row[1], row[3]) for row in cursor.execute("EXPLAIN QUERY PLAN " + sql, params)]
+        except sqlite3.Error as e:
+            return [(0, 0, f"(無法取得查詢計畫: {e})")]
+        finally:
+            self._explaining = False
+
+
+class ProfilingCursor(sqlite3.Cursor):
+    """把執行與讀取結果的時間、筆數、VM 步數累加到目前這個 SQL 的統計"""
+
+    def _begin(self, sql, params):
+        self._sql, self._params = sql, params
+        self._stats = None
+        self._call_ms = 0.0
+        self._slow = False
+
+    def _account(self, start, steps_before, rows, first=False):
+        conn = self.connection
+        profiler = conn.profiler
+        elapsed = (time.perf_counter() - start) * 1000
+        self._call_ms += elapsed
+        self._stats = profiler.record(conn, self._sql, elapsed, self._call_ms, rows, conn.steps - steps_before, first)
+        # 第一次執行時看要不要擷取計畫；讀取結果讀到超過門檻時再檢查一次 (每次執行最多警告一次)
+        if first or (not self._slow and self._call_ms >= profiler.slow_ms):
+            self._slow = profiler.inspect(conn, self._stats, self._sql, self._params, self._call_ms)
+
+    def execute(self, sql, params=()):
+        self._begin(sql, params)
+        steps, start = self.connection.steps, time.perf_counter()
+        try:
+            return super().execute(sql, params)
+        finally:
+            changed = self.rowcount if self.rowcount > 0 else 0
+            self._account(start, steps, changed, first=True)
+
+    def executemany(self, sql, seq_of_params):
+        seq_of_params = list(seq_of_params)
+        self._begin(sql, seq_of_params[0] if seq_of_params else ())
+        steps, start = self.connection.steps, time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_params)
+        finally:
+            self._account(start, steps, max(self.rowcount, 0), first=True)
+
+    def _fetch(self, method, *args):
+        if getattr(self, '_stats', None) is None:
+            return method(*args)
+        steps, start = self.connection.steps, time.perf_counter()
+        result = method(*args)
+        rows = (1 if result is not None else 0) if method.__name__ == 'fetchone' else len(result)
+        self._account(start, steps, rows)
+        return result
+
+    def fetchone(self):
+        return self._fetch(super().fetchone)
+
+    def fetchmany(self, size=None):
+        return self._fetch(super().fetchmany, self.arraysize if size is None else size)
+
+    def fetchall(self):
+        return self._fetch(super().fetchall)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        row = self.fetchone()
+        if row is None:
+            raise StopIteration
+        return row
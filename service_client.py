@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+###########################################################################
+## service_client.py - library_service.py 的用戶端，介面與 DBManager 相同 (GUI 用的那些方法)
+## 設定環境變數 LIBRARY_SERVICE_URL=http://127.0.0.1:8765 後，GUI 會改用這個類別，
+## 多個櫃台共用同一個服務，不再各自開啟資料庫檔案
+###########################################################################
+
+import http.client
+import json
+import threading
+from datetime import date
+from urllib.parse import quote, urlencode, urlsplit
+
+from db_manager import LOAN_LIMIT, BorrowResult, ReserveResult, ReturnResult
+from library_service import ServiceError
+from suggest_index import PrefixIndex
+
+
+def _date(text):
+    return date.fromisoformat(text) if text else None
+
+
+class ServiceClient:
+    """
+    透過 HTTP/JSON 呼叫 library_service；方法名稱、參數、回傳值都和 DBManager 一樣，
+    GUI 的程式碼不用改。每條執行緒各自保留一條 keep-alive 連線 (DBWorker 的背景執行緒會同時呼叫)。
+    服務回傳錯誤時拋出 ServiceError；查無資料的 404 依 DBManager 的慣例回傳 None / False。
+    """
+
+    def __init__(self, url, timeout=30):
+        parts = urlsplit(url)
+        self.host = parts.hostname or '127.0.0.1'
+        self.port = parts.port or 8765
+        self.timeout = timeout
+        self.loan_limit = LOAN_LIMIT
+        self.catalogue_version = 0   # 每個回應的 X-Catalogue-Version 標頭會更新它
+        self._local = threading.local()
+
+    @property
+    def pool(self):
+        # book_importer 等批次工作直接操作資料庫連線，只能在伺服器那台機器上執行
+        raise ServiceError(400, "連線到圖書館服務時不能直接存取資料庫，請在伺服器上執行 book_importer.py")
+
+    def _request(self, method, path, params=None, payload=None):
+        if params:
+            path += '?' + urlencode({k: v for k, v in params.items() if v is not None})
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8') if payload is not None else None
+        headers = {'Content-Type': 'application/json'} if body is not None else {}
+        for attempt in range(2):
+            conn = getattr(self._local, 'conn', None)
+            reused = conn is not None
+            if conn is None:
+                conn = self._local.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            sent = False
+            try:
+                conn.request(method, path, body, headers)
+                sent = True
+                response = conn.getresponse()
+                data = json.loads(response.read() or b'null')
+                break
+            except (ConnectionError, http.client.HTTPException) as e:
+                conn.close()
+                self._local.conn = None
+                # 閒置的 keep-alive 連線可能已經被伺服器關掉，送出時不一定會出錯，要等讀回應才發現
+                # (伺服器一個位元組都沒回就斷線)：這種情況請求沒有被處理，重新連線再送一次
+                # 全新的連線送出後才斷線，伺服器可能已經處理過借還書，重送會借兩次，只有 GET 重試
+                stale = reused and isinstance(e, (ConnectionResetError, BrokenPipeError,
+                                                  http.client.RemoteDisconnected))
+                if attempt or (sent and method != 'GET' and not stale):
+                    raise
+        version = response.getheader('X-Catalogue-Version')
+        if version is not None:
+            self.catalogue_version = int(version)
+        return response.status, data
+
+    def _get(self, path, params=None, missing=None):
+        status, data = self._request('GET', path, params)
+        if status == 404:
+            return missing
+        if status >= 400:
+            raise ServiceError(status, data.get('error', ''))
+        return data
+
+    def _send(self, method, path, payload=None):
+        status, data = self._request(method, path, payload=payload)
+        if status >= 400 and status not in (401, 404, 409):
+            raise ServiceError(status, data.get('error', ''))
+        return status, data
+
+    # --- 書籍 ---
+    def search_books_after(self, query, after_key=None, limit=50):
+        data = self._get('/books', {'q': query, 'after': json.dumps(after_key, ensure_ascii=False) if after_key else None,
+                                    'limit': limit})
+        return [tuple(row) for row in data['rows']], data['next'] and tuple(data['next'])
+
+    def count_books(self, query):
+        return self._get('/books/count', {'q': query})['count']
+
+    def get_book_by_id(self, bid):
+        book = self._get(f"/books/{quote(bid, safe='')}")
+        return book and (book['book_id'], book['title'], book['author'], book['isbn'], book['available'])
+
+    def get_copies(self, bid):
+        data = self._get(f"/books/{quote(bid, safe='')}/copies")
+        return [(c['barcode'], c['branch'], c['status'], c['condition']) for c in data['copies']]
+
+    def load_suggest_index(self):
+        data = self._get('/suggest/terms')
+        return PrefixIndex.build(((term,) for term in data['terms']), data['version'])
+
+    # --- 借還書與預約 ---
+    def borrow_book(self, rid, bid):
+        _, data = self._send('POST', '/borrow', {'reader_id': rid, 'book_id': bid})
+        return BorrowResult(data['status'], data['borrow_id'], data['barcode'])
+
+    def borrow_by_barcode(self, rid, barcode):
+        _, data = self._send('POST', '/borrow', {'reader_id': rid, 'barcode': barcode})
+        return BorrowResult(data['status'], data['borrow_id'], data['barcode'])
+
+    def return_book(self, borrow_id):
+        _, data = self._send('POST', '/return', {'borrow_id': borrow_id})
+        return ReturnResult(data['status'], data['borrow_id'], data['hold_for'])
+
+    def return_by_barcode(self, barcode):
+        _, data = self._send('POST', '/return', {'barcode': barcode})
+        return ReturnResult(data['status'], data['borrow_id'], data['hold_for'])
+
+    def reserve_book(self, rid, bid):
+        _, data = self._send('POST', '/reservations', {'reader_id': rid, 'book_id': bid})
+        return ReserveResult(data['status'], data['reservation_id'], data['position'])
+
+    def cancel_reservation(self, reservation_id):
+        status, _ = self._send('DELETE', f"/reservations/{int(reservation_id)}")
+        return status == 200
+
+    # --- 讀者 ---
+    def get_reader_by_id(self, rid):
+        """服務不會傳回密碼，密碼欄位一律是 None"""
+        reader = self._get(f"/readers/{quote(rid, safe='')}")
+        return reader and (reader['reader_id'], reader['name'], reader['email'], None, reader['credit'])
+
+    def verify_login(self, rid, pwd):
+        """密碼錯誤或查無帳號回傳 None；成功時回傳的讀者資料密碼欄位是 None"""
+        status, data = self._send('POST', '/login', {'reader_id': rid, 'password': pwd})
+        if status == 401:
+            return None
+        return data['reader_id'], data['name'], data['email'], None, data['credit']
+
+    def get_reader_row(self, rid):
+        reader = self._get(f"/readers/{quote(rid, safe='')}")
+        return reader and (reader['reader_id'], reader['name'], reader['email'], reader['credit'])
+
+    def register_reader(self, rid, name, email, pwd):
+        status, _ = self._send('POST', '/readers', {'reader_id': rid, 'name': name, 'email': email, 'password': pwd})
+        return status == 201
+
+    def add_reader(self, rid, name, email, credit):
+        status, _ = self._send('POST', '/readers', {'reader_id': rid, 'name': name, 'email': email, 'credit': credit})
+        return status == 201
+
+    def update_reader_info(self, rid, name, email, credit):
+        status, _ = self._send('PUT', f"/readers/{quote(rid, safe='')}", {'name': name, 'email': email, 'credit': credit})
+        return status == 200
+
+    def delete_reader(self, rid):
+        status, _ = self._send('DELETE', f"/readers/{quote(rid, safe='')}")
+        return status == 200
+
+    def get_readers_page(self, after_key=None, limit=100, sort='ReaderID', descending=False, filter_text=''):
+        data = self._get('/readers', {'after': json.dumps(after_key, ensure_ascii=False) if after_key else None,
+                                      'limit': limit, 'sort': sort, 'desc': int(descending), 'q': filter_text})
+        return [tuple(row) for row in data['rows']], data['next'] and tuple(data['next'])
+
+    def count_readers(self, filter_text=''):
+        return self._get('/readers/count', {'q': filter_text})['count']
+
+    # --- 借閱紀錄 ---
+    def get_borrow_history_page(self, rid, after_key=None, limit=50):
+        data = self._get(f"/readers/{quote(rid, safe='')}/history",
+                         {'after': json.dumps(after_key) if after_key else None, 'limit': limit})
+        rows = [(r['borrow_id'], r['title'], _date(r['borrow_date']), _date(r['due_date']), _date(r['return_date']))
+                for r in data['rows']]
+        return rows, data['next'] and tuple(data['next'])
+
+    def _summary(self, rid):
+        data = self._get(f"/readers/{quote(rid, safe='')}/summary")
+        self.loan_limit = data['loan_limit']
+        return data
+
+    @staticmethod
+    def _latest(latest):
+        return latest and (latest['title'], _date(latest['borrow_date']), _date(latest['due_date']),
+                           _date(latest['return_date']))
+
+    def get_borrow_summary(self, rid):
+        data = self._summary(rid)
+        return data['count'], self._latest(data['latest']), data['active_loans']
+
+    def count_borrows(self, rid):
+        return self._summary(rid)['count']
+
+    def get_latest_borrow(self, rid):
+        return self._latest(self._summary(rid)['latest'])
+
+    def get_active_loans(self, rid):
+        return self._summary(rid)['active_loans']
+
+    def perf_stats(self):
+        """服務端每個 DBManager 方法的延遲統計與最慢的呼叫 (格式同 DBManager.perf_stats)"""
+        data = self._get('/metrics')
+        return data['db'], [(s['ms'], s['at'], s['call'], s['args']) for s in data['slowest']]
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
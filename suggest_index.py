@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+###########################################################################
+## suggest_index.py - 搜尋框即時建議用的前綴索引 (排序陣列 + bisect)
+###########################################################################
+
+from bisect import bisect_left
+
+
+class PrefixIndex:
+    """
+    把書名、作者、ISBN 放進一個排序好的陣列，用二分搜尋找出以某個前綴開頭的項目。
+
+    比 trie 省記憶體很多：每筆只有一個字串加上兩個 list 指標，
+    中文、數字這類 lower() 後不變的字串，比對用的 key 直接共用同一個字串物件。
+    查詢是 O(log n + 結果數)，一百萬筆書名也只要幾微秒。
+    """
+
+    def __init__(self, version=None):
+        self._keys = []     # 小寫的比對用字串，已排序
+        self._values = []   # 與 _keys 對應的原始字串 (顯示用)
+        self.version = version  # 建立時的書目版本 (DBManager.catalogue_version)
+
+    @classmethod
+    def build(cls, rows, version=None):
+        """rows: 可迭代的 (Title, Author, ISBN, ...)，收集完一次排序建立；同一個字串只收一次"""
+        seen = set()
+        for row in rows:
+            seen.update(row)
+        seen.discard(None)
+        seen.discard('')
+        values = sorted(seen, key=_key)
+        del seen
+
+        index = cls(version)
+        index._keys = [_key(text) for text in values]
+        index._values = values
+        return index
+
+    def add(self, *texts):
+        """加入少量項目 (例如新增了一本書)；大量變動時用 build 重建比較快"""
+        for text in texts:
+            if not text:
+                continue
+            key = _key(text)
+            i = bisect_left(self._keys, key)
+            while i < len(self._keys) and self._keys[i] == key:
+                if self._values[i] == text:
+                    break
+                i += 1
+            else:
+                self._keys.insert(i, key)
+                self._values.insert(i, text)
+
+    def suggest(self, prefix, limit=10):
+        """回傳以 prefix 開頭 (不分大小寫) 的前 limit 個項目，依字母順序"""
+        prefix = _key(prefix.strip())
+        if not prefix:
+            return []
+        keys = self._keys
+        i = bisect_left(keys, prefix)
+        end = min(i + limit, len(keys))
+        result = []
+        while i < end and keys[i].startswith(prefix):
+            result.append(self._values[i])
+            i += 1
+        return result
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __iter__(self):
+        """依排序順序列出所有項目 (原始字串)"""
+        return iter(self._values)
+
+
+def _key(text):
+    key = text.lower()
+    return text if key == text else key
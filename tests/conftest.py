@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+# 模組都放在專案根目錄 (python main.py 直接執行)，測試從 tests/ 匯入前先把根目錄加進 sys.path
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from credentials import HashCost  # noqa: E402
+from db_manager import DBManager  # noqa: E402
+
+# 測試不需要安全的密碼雜湊，用最便宜的成本讓登入相關的測試跑得快
+FAST_COST = HashCost('pbkdf2_sha256', 1000)
+
+
+def open_db(path, **kwargs):
+    """建立/開啟 DBManager，密碼雜湊改用 FAST_COST"""
+    db = DBManager(str(path), **kwargs)
+    db.password_cost = FAST_COST
+    return db
@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+# book_importer：CSV 裡格式錯誤的列要略過並回報行號，不能讓匯入做到一半才中斷
+
+from book_importer import import_books, read_csv
+from conftest import open_db
+
+CSV = """BookID,Title,Author,ISBN,Available
+N001,第一本,作者甲,978-1,2
+N002,庫存寫錯,作者乙,978-2,two
+,沒有書號,作者丙,978-3,1
+N004,負的庫存,作者丁,978-4,-1
+N005,沒寫庫存,作者戊,978-5,
+"""
+
+
+def test_bad_rows_are_skipped_and_reported(tmp_path):
+    path = tmp_path / 'books.csv'
+    path.write_text(CSV, encoding='utf-8')
+    db = open_db(tmp_path / 'import.db')
+    errors = []
+    # batch_size=1：第一本已經寫進資料庫之後才讀到錯誤的列
+    assert import_books(db, read_csv(path, errors=errors), batch_size=1) == 2
+    assert [line for line, _ in errors] == [3, 4, 5]
+    assert db.get_book_by_id('N001')[4] == 2
+    assert db.get_book_by_id('N005')[4] == 1
+    assert db.get_book_by_id('N002') is None
+    assert db.count_books('第一本') == 1
+    db.close()
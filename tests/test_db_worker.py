@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+# DBWorker：同一個 key 只送回最新一次的結果，錯誤交給 on_error，忙碌狀態成對出現
+
+import queue
+import threading
+
+import pytest
+
+from db_worker import DBWorker
+
+
+class FakeUI:
+    """代替 wx.CallAfter：dispatch 只排隊，pump() 時才在測試執行緒 (當作 UI 執行緒) 上執行"""
+
+    def __init__(self):
+        self.calls = queue.Queue()
+        self.busy = []
+
+    def dispatch(self, func, *args):
+        self.calls.put((func, args))
+
+    def pump(self, count=1):
+        for _ in range(count):
+            func, args = self.calls.get(timeout=5)
+            func(*args)
+
+
+@pytest.fixture
+def ui():
+    return FakeUI()
+
+
+@pytest.fixture
+def worker(ui):
+    worker = DBWorker(ui.dispatch, max_workers=3, on_busy=ui.busy.append)
+    yield worker
+    worker.shutdown()
+
+
+def blocked(value, release):
+    release.wait(5)
+    return value
+
+
+def test_stale_result_after_newer_one_was_delivered(ui, worker):
+    results = []
+    release_a, release_c = threading.Event(), threading.Event()
+    worker.submit(blocked, 'A', release_a, on_done=results.append, key='search')
+    worker.submit(lambda: 'B', on_done=results.append, key='search')
+    ui.pump()                      # B 送回
+    worker.submit(blocked, 'C', release_c, on_done=results.append, key='search')
+    release_a.set()
+    ui.pump()                      # A 跑完，但已經被 B、C 取代
+    release_c.set()
+    ui.pump()
+    assert results == ['B', 'C']
+    assert worker.pending == 0
+
+
+def test_keys_are_independent(ui, worker):
+    results = []
+    worker.submit(lambda: 'history', on_done=results.append, key='history')
+    worker.submit(lambda: 'search', on_done=results.append, key='search')
+    ui.pump(2)
+    assert sorted(results) == ['history', 'search']
+
+
+def test_errors_go_to_on_error(ui, worker):
+    errors = []
+    worker.submit(lambda: 1 / 0, on_done=pytest.fail, on_error=errors.append)
+    ui.pump()
+    assert isinstance(errors[0], ZeroDivisionError)
+
+
+def test_busy_state(ui, worker):
+    worker.submit(lambda: None)
+    worker.submit(lambda: None, busy=False)
+    assert ui.busy == [True] and worker.pending == 2
+    ui.pump(2)
+    assert ui.busy == [True, False] and worker.pending == 0
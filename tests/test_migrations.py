@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+# 舊版程式留下的資料庫 (沒有 user_version、日期是文字、密碼是明文、沒有館藏分冊) 升級到最新版
+
+import sqlite3
+from datetime import date
+
+import pytest
+
+from conftest import open_db
+from migrations import SCHEMA_VERSION, current_version
+
+BOOKS = [('B1', 'Python 入門指南', '張大文', '978-001', 2),
+         ('B2', '資料庫實務', '王老五', '978-003', 0),
+         ('B3', '演算法概論', '李小美', '978-004', 1)]
+READERS = [('R1', '王小明', 'r1@mail.com', 'pw1', 100),
+           ('R2', '陳小華', 'r2@mail.com', 'pw2', 90)]
+# (BookID, ReaderID, 借閱日, 到期日, 歸還日)；沒有歸還日的是借出中
+BORROWS = [('B1', 'R1', '2023-01-05', '2023-01-19', '2023-01-10'),
+           ('B2', 'R1', '2024-03-01', '2024-03-15', None),
+           ('B2', 'R2', '2024-03-02', '2024-03-16', None),
+           ('B3', 'R2', '2024-02-01', '2024-02-15', '2024-02-20'),
+           ('B1', 'R2', '2024-04-01', '2024-04-15', None)]
+
+
+@pytest.fixture
+def legacy_path(tmp_path):
+    """用舊版程式的資料表格式建立的資料庫"""
+    path = tmp_path / 'legacy.db'
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE Books (BookID TEXT PRIMARY KEY, Title TEXT, Author TEXT, ISBN TEXT, Available INTEGER)")
+    conn.execute("CREATE TABLE Readers (ReaderID TEXT PRIMARY KEY, Name TEXT, Email TEXT, Password TEXT, Credit INTEGER)")
+    conn.execute("CREATE TABLE Borrows (BorrowID INTEGER PRIMARY KEY AUTOINCREMENT, BookID TEXT, ReaderID TEXT, "
+                 "BorrowDate TEXT, DueDate TEXT, ReturnDate TEXT)")
+    conn.executemany("INSERT INTO Books VALUES (?, ?, ?, ?, ?)", BOOKS)
+    conn.executemany("INSERT INTO Readers VALUES (?, ?, ?, ?, ?)", READERS)
+    conn.executemany("INSERT INTO Borrows (BookID, ReaderID, BorrowDate, DueDate, ReturnDate) VALUES (?, ?, ?, ?, ?)",
+                     BORROWS)
+    conn.commit()
+    conn.close()
+    return path
+
+
+@pytest.fixture
+def upgraded(legacy_path):
+    db = open_db(legacy_path)
+    yield db
+    db.close()
+
+
+def test_upgrades_to_latest_version(upgraded):
+    with upgraded.pool.connection() as conn:
+        assert current_version(conn) == SCHEMA_VERSION
+        assert conn.execute("SELECT COUNT(*) FROM Books").fetchone()[0] == len(BOOKS)
+        assert conn.execute("SELECT COUNT(*) FROM Borrows").fetchone()[0] == len(BORROWS)
+
+
+def test_dates_become_integer_days(upgraded):
+    with upgraded.pool.connection() as conn:
+        types = conn.execute("""
+            SELECT DISTINCT typeof(BorrowDate), typeof(DueDate) FROM Borrows
+        """).fetchall()
+        returned = conn.execute("SELECT DISTINCT typeof(ReturnDate) FROM Borrows").fetchall()
+    assert types == [('integer', 'integer')]
+    assert set(returned) == {('integer',), ('null',)}
+    assert upgraded.get_latest_borrow('R1') == ('資料庫實務', date(2024, 3, 1), date(2024, 3, 15), None)
+    assert upgraded.count_borrows('R2') == 3
+
+
+def test_loan_counters_match_borrows(upgraded):
+    assert upgraded.get_active_loans('R1') == 1
+    assert upgraded.get_active_loans('R2') == 2
+    assert upgraded.check_loan_counters(fix=False) == []
+
+
+def test_copies_match_books_and_loans(upgraded):
+    with upgraded.pool.connection() as conn:
+        # 每本書在架上的冊數 = Available，借出中的紀錄各對應一冊 on_loan
+        for bid, _, _, _, available in BOOKS:
+            on_shelf = conn.execute("SELECT COUNT(*) FROM Copies WHERE BookID = ? AND Status = 'available'",
+                                    (bid,)).fetchone()[0]
+            assert on_shelf == available == conn.execute("SELECT Available FROM Books WHERE BookID = ?",
+                                                         (bid,)).fetchone()[0]
+        open_loans = conn.execute("""
+            SELECT br.BookID, c.Status FROM Borrows br LEFT JOIN Copies c ON c.Barcode = br.Barcode
+            WHERE br.ReturnDate IS NULL
+        """).fetchall()
+        barcodes = conn.execute("SELECT Barcode FROM Copies ORDER BY Barcode").fetchall()
+    assert sorted(open_loans) == [('B1', 'on_loan'), ('B2', 'on_loan'), ('B2', 'on_loan')]
+    assert [b for (b,) in barcodes] == ['B1-001', 'B1-002', 'B1-003', 'B2-001', 'B2-002', 'B3-001']
+
+
+def test_upgraded_database_keeps_working(upgraded):
+    # B2-001 是 R1 借走的那一冊 (條碼依借閱編號順序產生)
+    returned = upgraded.return_by_barcode('B2-001')
+    assert returned and returned.borrow_id == 2
+    assert upgraded.get_book_by_id('B2')[4] == 1
+    assert upgraded.get_active_loans('R1') == 0
+    assert upgraded.borrow_book('R1', 'B3')
+    assert upgraded.get_active_loans('R1') == 1
+    assert upgraded.check_loan_counters(fix=False) == []
+    assert [row[0] for row in upgraded.search_books_after('資料庫')[0]] == ['B2']
+
+
+def test_plaintext_password_is_rehashed_on_login(upgraded):
+    assert upgraded.verify_login('R1', 'wrong') is None
+    assert upgraded.verify_login('R1', 'pw1')[0] == 'R1'
+    with upgraded.pool.connection() as conn:
+        stored = conn.execute("SELECT Password FROM Readers WHERE ReaderID = 'R1'").fetchone()[0]
+    assert stored.startswith('pbkdf2_sha256$')
+    assert upgraded.verify_login('R1', 'pw1')[0] == 'R1'
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+# PagedRowCache 的 keyset 分頁與快取上限，VirtualListModel 的背景讀取 (不需要 wx)
+
+import pytest
+
+from paged_cache import PagedRowCache, VirtualListModel
+
+
+def make_fetch(total, calls=None):
+    """fetch_page(after_key, limit)：資料是 0..total-1，排序鍵就是數值本身"""
+    def fetch_page(after_key, limit):
+        if calls is not None:
+            calls.append(after_key)
+        start = 0 if after_key is None else after_key + 1
+        rows = [(i, f"row {i}") for i in range(start, min(start + limit, total))]
+        return rows, rows[-1][0] if rows else after_key
+    return fetch_page
+
+
+class FakeList:
+    def __init__(self):
+        self.count = 0
+        self.refreshed = []
+
+    def SetItemCount(self, count):
+        self.count = count
+
+    def GetItemCount(self):
+        return self.count
+
+    def Refresh(self):
+        self.refreshed.append('all')
+
+    def RefreshItems(self, first, last):
+        self.refreshed.append((first, last))
+
+    def RefreshItem(self, index):
+        self.refreshed.append(index)
+
+
+class FakeWorker:
+    """把工作記下來，run() 時才執行 (代替 DBWorker 的背景執行緒與 wx.CallAfter)"""
+
+    def __init__(self):
+        self.jobs = []
+
+    def submit(self, func, *args, on_done=None, on_error=None, key=None, busy=True):
+        self.jobs.append((func, args, on_done, on_error, busy))
+
+    def run(self):
+        jobs, self.jobs = self.jobs, []
+        for func, args, on_done, on_error, _ in jobs:
+            try:
+                result = func(*args)
+            except Exception as e:
+                on_error(e)
+            else:
+                on_done(result)
+
+
+def test_rows_across_pages():
+    cache = PagedRowCache(make_fetch(120), page_size=50)
+    assert cache.get_row(0) == (0, 'row 0')
+    assert cache.get_row(119) == (119, 'row 119')
+    assert cache.get_row(120) is None
+    assert cache.exhausted and cache.total == 120
+
+
+def test_known_page_keys_are_reused():
+    calls = []
+    cache = PagedRowCache(make_fetch(500, calls), page_size=50, max_pages=2)
+    cache.get_row(400)
+    walked = len(calls)
+    # 第 0、6 頁已經被擠出快取，但起始 key 還記得：各讀一次就好，不必從頭一頁一頁走
+    cache.get_row(0)
+    cache.get_row(300)
+    assert calls[walked:] == [None, 299]
+    assert len(cache.pages) == 2
+
+
+def test_reset_discards_loading_page():
+    cache = PagedRowCache(make_fetch(100), page_size=10)
+    fetch = cache.fetch_page
+
+    def fetch_and_reset(after_key, limit):
+        result = fetch(after_key, limit)
+        cache.reset()
+        return result
+    cache.fetch_page = fetch_and_reset
+    assert cache.get_page(0) is None
+    assert cache.pages == {}
+
+
+@pytest.fixture
+def model():
+    list_ctrl, worker = FakeList(), FakeWorker()
+    return VirtualListModel(list_ctrl, worker, make_fetch(120), page_size=50, loading_col=1)
+
+
+def test_loads_in_background_without_busy_cursor(model):
+    model.reset(120)
+    assert model.get_item_text(60, 1) == "載入中..."
+    model.get_item_text(61, 1)
+    assert len(model.worker.jobs) == 1 and model.worker.jobs[0][4] is False
+    model.worker.run()
+    assert model.get_item_text(60, 1) == 'row 60'
+    assert (50, 99) in model.list_ctrl.refreshed
+
+
+def test_shrinks_when_rows_disappeared(model):
+    model.reset(200)
+    model.get_item_text(150, 1)
+    model.worker.run()
+    assert model.list_ctrl.count == 120
+
+
+def test_failed_page_is_requested_again(model):
+    fetch = make_fetch(120)
+    failures = [RuntimeError("database is locked")]
+
+    def flaky(after_key, limit):
+        if failures:
+            raise failures.pop()
+        return fetch(after_key, limit)
+    model.reset(120, fetch_page=flaky)
+    model.get_item_text(0, 1)
+    model.worker.run()
+    assert model.pending_pages == set()
+    assert model.get_item_text(0, 1) == "載入中..."
+    model.worker.run()
+    assert model.get_item_text(0, 1) == 'row 0'
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+# 櫃台常見操作的查詢計畫不能整張掃描大表 (和 CI 的 benchmarks.bench_queries 同一套檢查，資料量小很多)
+
+import argparse
+import random
+
+import pytest
+
+from benchmarks.bench_queries import ALLOWED_SCANS, prepare, workload
+from conftest import open_db
+from query_profiler import QueryProfiler, full_scans, outer_sql, table_aliases
+
+
+def rows(*details, parent=0):
+    """測試用的查詢計畫列 (都掛在同一層)"""
+    return [(i + 1, parent, detail) for i, detail in enumerate(details)]
+
+
+def test_full_scans_maps_aliases_to_tables():
+    sql = "SELECT 1 FROM temp.new_copies w JOIN Books AS b ON b.BookID = w.BookID"
+    assert table_aliases(sql) == {'new_copies': 'new_copies', 'w': 'new_copies', 'Books': 'Books', 'b': 'Books'}
+    assert full_scans(rows('SCAN w', 'SEARCH b USING INDEX sqlite_autoindex_Books_1 (BookID=?)'), sql) == ['new_copies']
+
+
+def test_full_index_scan_counts_as_scan():
+    sql = "SELECT w.BookID FROM temp.new_copies w JOIN Books b ON b.BookID = w.BookID"
+    plan = rows('SCAN b USING COVERING INDEX sqlite_autoindex_Books_1', 'SEARCH w USING INDEX x (BookID=?)')
+    assert full_scans(plan, sql) == ['Books']
+
+
+def test_ordered_index_walk_with_limit_is_not_a_scan():
+    sql = "SELECT ReaderID FROM Readers r ORDER BY Name, ReaderID LIMIT ?"
+    assert full_scans(rows('SCAN r USING INDEX idx_readers_name'), sql) == []
+    assert full_scans(rows('SCAN r', 'USE TEMP B-TREE FOR ORDER BY'), sql) == ['Readers']
+
+
+def test_limit_in_subquery_does_not_exempt_outer_scans():
+    sql = ("UPDATE Copies SET Status = 'on_loan' WHERE Barcode = "
+           "(SELECT Barcode FROM Copies c WHERE c.BookID = ? LIMIT 1)")
+    plan = [(2, 0, 'SCAN Copies USING INDEX idx_copies_book_status'), (5, 0, 'SCALAR SUBQUERY 1'),
+            (9, 5, 'SCAN c USING INDEX idx_copies_book_status')]
+    assert outer_sql(sql).strip().endswith('Barcode =')
+    assert full_scans(plan, sql) == ['Copies', 'Copies']
+
+
+@pytest.fixture(scope='module')
+def profiled(tmp_path_factory):
+    profiler = QueryProfiler(slow_ms=10000, explain_all=True)
+    db = open_db(tmp_path_factory.mktemp('plans') / 'plans.db', profiler=profiler)
+    prepare(db, books=2000, readers=500, loans=20000)
+    profiler.reset()
+    yield db, profiler
+    db.close()
+
+
+def test_workload_has_no_full_scans(profiled):
+    db, profiler = profiled
+    workload(db, argparse.Namespace(books=2000, readers=500, rounds=5), random.Random(7))
+    assert profiler.stats(), "剖析器沒有記錄到任何 SQL"
+    profiler.assert_no_full_scans(allow=ALLOWED_SCANS)
+
+
+def test_allow_uses_table_names(profiled):
+    db, profiler = profiled
+    profiler.reset()
+    with db.pool.connection() as conn:
+        conn.execute("SELECT COUNT(Title) FROM Books b").fetchall()
+    assert [tables for _, tables in profiler.full_scan_queries()] == [['Books']]
+    profiler.assert_no_full_scans(allow={'Books'})
+    with pytest.raises(AssertionError):
+        profiler.assert_no_full_scans()
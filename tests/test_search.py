@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+# 書籍搜尋：keyset 分頁要維持相關度排序；太短的查詢改比對書名開頭
+
+import pytest
+
+from conftest import open_db
+
+BOOKS = [(f"B{i:03d}", f"{'Python ' * (i % 4 + 1)}第 {i} 冊", f"作者{i % 7}", f"978-{i:03d}", 1) for i in range(40)]
+BOOKS += [('C001', '資料庫實務', '王老五', '978-900', 1), ('C002', '資料結構', '李小美', '978-901', 1),
+          ('C003', '實用資料庫', '陳大同', '978-902', 1)]
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = open_db(tmp_path / 'search.db')
+    with db.pool.transaction() as conn:
+        conn.execute("DELETE FROM Books")
+        conn.executemany("INSERT INTO Books VALUES (?, ?, ?, ?, ?)", BOOKS)
+    yield db
+    db.close()
+
+
+def all_pages(db, query, limit):
+    rows, key = db.search_books_after(query, limit=limit)
+    result = list(rows)
+    while rows:
+        rows, key = db.search_books_after(query, key, limit=limit)
+        result += rows
+    return result
+
+
+def test_pages_keep_relevance_order(db):
+    ranked = db.search_books('Python', limit=100)
+    paged = all_pages(db, 'Python', limit=7)
+    assert len(paged) == db.count_books('Python') == 40
+    assert [row[0] for row in paged] == [row[0] for row in ranked]
+    # 相關度最高的 (Python 出現 4 次) 排在第一頁
+    assert all(row[1].count('Python') == 4 for row in paged[:7])
+
+
+def test_short_terms_filter_fts_results(db):
+    assert sorted(row[0] for row in all_pages(db, 'Python 12', limit=3)) == ['B012']
+
+
+def test_short_query_matches_title_prefix(db):
+    assert db.count_books('資料') == 2
+    assert [row[0] for row in all_pages(db, '資料', limit=1)] == ['C001', 'C002']
+    assert [row[0] for row in db.search_books('資料')] == ['C001', 'C002']
+    with db.pool.connection() as conn:
+        clause, params, _ = db._search_clause('資料')
+        plan = ' '.join(row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN SELECT COUNT(*) {clause}", params))
+    assert 'idx_books_title' in plan
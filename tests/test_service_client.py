@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+# ServiceClient 的 keep-alive 重試：閒置連線被關掉要重送，全新連線送出後才斷線的寫入不能重送
+
+import http.client
+import socket
+import threading
+
+import pytest
+
+from service_client import ServiceClient
+
+OK = (b'HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nContent-Length: 2\r\n'
+      b'Connection: keep-alive\r\n\r\n{}')
+
+
+def read_request(conn):
+    """讀完一整個請求 (標頭與 Content-Length 長度的內容)，回傳 method"""
+    data = b''
+    while b'\r\n\r\n' not in data:
+        data += conn.recv(65536)
+    head, _, rest = data.partition(b'\r\n\r\n')
+    for line in head.split(b'\r\n'):
+        if line.lower().startswith(b'content-length:'):
+            while len(rest) < int(line.split(b':')[1]):
+                rest += conn.recv(65536)
+    return head.split(b' ')[0].decode()
+
+
+class OneShotServer:
+    """
+    每條連線只處理一個請求：answer 為 True 時回應 (標頭說 keep-alive)，等到下一個請求送來時
+    不處理直接關閉，就像伺服器剛好把閒置連線關掉；False 時不回應直接關閉
+    """
+
+    def __init__(self, answer=True):
+        self.answer = answer
+        self.requests = []
+        self.sock = socket.create_server(('127.0.0.1', 0))
+        self.port = self.sock.getsockname()[1]
+        threading.Thread(target=self.serve, daemon=True).start()
+
+    def serve(self):
+        while True:
+            try:
+                conn, _ = self.sock.accept()
+            except OSError:
+                return
+            with conn:
+                self.requests.append(read_request(conn))
+                if self.answer:
+                    conn.sendall(OK)
+                    read_request(conn)
+
+    def close(self):
+        self.sock.close()
+
+
+@pytest.fixture
+def server():
+    server = OneShotServer()
+    yield server
+    server.close()
+
+
+def test_post_on_stale_keep_alive_connection_is_retried(server):
+    client = ServiceClient(f'http://127.0.0.1:{server.port}', timeout=5)
+    assert client._request('GET', '/stats') == (200, {})
+    assert client._request('POST', '/borrow', payload={'reader_id': 'R1', 'book_id': 'B001'}) == (200, {})
+    # 第二個請求在舊連線上已經送出，但伺服器沒處理就關閉；重新連線後只處理一次
+    assert server.requests == ['GET', 'POST']
+
+
+def test_post_on_fresh_connection_is_not_resent():
+    server = OneShotServer(answer=False)
+    try:
+        client = ServiceClient(f'http://127.0.0.1:{server.port}', timeout=5)
+        with pytest.raises((ConnectionError, http.client.HTTPException)):
+            client._request('POST', '/borrow', payload={'reader_id': 'R1', 'book_id': 'B001'})
+        assert server.requests == ['POST']
+    finally:
+        server.close()
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+# library_service 的 4xx 回應：用戶端送錯的請求要回清楚的錯誤，不能變成 500
+
+import asyncio
+import json
+from urllib.parse import quote
+
+import pytest
+
+from conftest import open_db
+from library_service import LibraryService, asgi_request
+
+
+@pytest.fixture
+def service(tmp_path):
+    service = LibraryService(open_db(tmp_path / 'service.db'), max_workers=2)
+    service.db.add_reader('R1', '王小明', 'r1@mail.com', 100)
+    service.db.register_reader('R2', '陳小華', 'r2@mail.com', 'secret')
+    yield service
+    service.close()
+
+
+def request(service, method, path, payload=None):
+    status, data, _ = asyncio.run(asgi_request(service, method, path, payload))
+    return status, data
+
+
+@pytest.mark.parametrize('method, path, payload, status', [
+    # 路由
+    ('GET', '/nowhere', None, 404),
+    ('PATCH', '/books', None, 405),
+    ('POST', '/books/B001', None, 405),
+    # 查無資料
+    ('GET', '/books/NOPE', None, 404),
+    ('GET', '/readers/NOPE', None, 404),
+    ('PUT', '/readers/NOPE', {'name': 'x', 'credit': 100}, 404),
+    ('DELETE', '/readers/NOPE', None, 404),
+    ('DELETE', '/reservations/999', None, 404),
+    # 網址參數格式錯誤
+    ('GET', '/books?q=Python&after=abc', None, 400),
+    ('GET', '/books?q=Python&limit=many', None, 400),
+    ('GET', '/books?q=Python&after=5', None, 400),
+    ('GET', '/books?q=Python&after=%5B-1.5%2C%22x%22%5D', None, 400),
+    ('GET', '/readers?after=%7Bbroken', None, 400),
+    ('GET', '/readers?sort=Password', None, 400),
+    ('GET', '/readers/R1/history?after=nope', None, 400),
+    # after 必須是上一頁回傳的 next：陣列、長度與元素型別都要對
+    ('GET', '/readers?after=5', None, 400),
+    ('GET', '/readers?after=%22abc%22&sort=Name', None, 400),
+    ('GET', '/readers?after=%5B%22a%22%5D', None, 400),
+    ('GET', '/readers?after=%5B%22a%22%2C5%5D', None, 400),
+    ('GET', '/readers/R1/history?after=5', None, 400),
+    ('GET', '/readers/R1/history?after=%5B1%5D', None, 400),
+    ('GET', '/readers/R1/history?after=%5B1%2C%22x%22%5D', None, 400),
+    ('DELETE', '/reservations/abc', None, 400),
+    # 請求內容缺欄位或型別不對
+    ('POST', '/borrow', {'book_id': 'B001'}, 400),
+    ('POST', '/borrow', {'reader_id': 'R1'}, 400),
+    ('POST', '/borrow', {'reader_id': 'R1', 'book_ids': 'B001'}, 400),
+    ('POST', '/return', {}, 400),
+    ('POST', '/return', {'barcodes': 'B001-001'}, 400),
+    ('POST', '/reservations', {'reader_id': 'R1'}, 400),
+    ('POST', '/login', {'reader_id': 'R2'}, 400),
+    ('POST', '/readers', {'reader_id': 'R9'}, 400),
+    ('POST', '/readers', {'reader_id': 'R9', 'name': 'x', 'credit': 'lots'}, 400),
+    ('PUT', '/readers/R1', {'name': 'x'}, 400),
+    ('PUT', '/readers/R1', {'name': 'x', 'credit': 'lots'}, 400),
+    ('PUT', '/readers/R1', {'name': 'x', 'credit': 100, 'email': 5}, 400),
+    ('POST', '/login', {'reader_id': 'R2', 'password': 123}, 400),
+    ('POST', '/login', {'reader_id': ['R2'], 'password': 'secret'}, 400),
+    ('POST', '/readers', {'reader_id': 'R9', 'name': 'x', 'password': 123}, 400),
+    ('POST', '/readers', {'reader_id': 'R9', 'name': 'x', 'email': ['a']}, 400),
+    ('POST', '/borrow', {'reader_id': 'R1', 'book_id': 5}, 400),
+    ('POST', '/borrow', {'reader_id': 'R1', 'book_ids': ['B001', 5]}, 400),
+    ('POST', '/borrow', {'reader_id': 'R1', 'barcode': 5}, 400),
+    ('POST', '/return', {'borrow_id': '1'}, 400),
+    ('POST', '/return', {'borrow_id': True}, 400),
+    ('POST', '/return', {'borrow_ids': [1, '2']}, 400),
+    ('POST', '/return', {'barcodes': [5]}, 400),
+    ('POST', '/reservations', {'reader_id': 'R1', 'book_id': {'id': 1}}, 400),
+    # 驗證與衝突
+    ('POST', '/login', {'reader_id': 'R2', 'password': 'wrong'}, 401),
+    ('POST', '/readers', {'reader_id': 'R1', 'name': '重複', 'credit': 100}, 409),
+])
+def test_client_errors(service, method, path, payload, status):
+    got, data = request(service, method, path, payload)
+    assert got == status, data
+    assert data['error']
+
+
+def test_errors_are_not_counted_as_server_errors(service):
+    request(service, 'GET', '/books?q=Python&after=abc')
+    request(service, 'POST', '/readers', {'reader_id': 'R9', 'name': 'x', 'credit': 'lots'})
+    _, metrics = request(service, 'GET', '/metrics')
+    assert all(route['errors'] == 0 for route in metrics['routes'].values())
+
+
+def test_next_key_round_trips(service):
+    # 上一頁回傳的 next 原樣送回去要能通過檢查 (排序欄位值可能是字串或數字)
+    for sort in ('ReaderID', 'Name', 'Credit'):
+        status, page = request(service, 'GET', f'/readers?sort={sort}&limit=1')
+        seen = []
+        while page['rows']:
+            seen += [row[0] for row in page['rows']]
+            after = quote(json.dumps(page['next']))
+            status, page = request(service, 'GET', f'/readers?sort={sort}&limit=1&after={after}')
+            assert status == 200, page
+        assert sorted(seen) == ['R1', 'R2']
+
+
+def test_invalid_json_body(service):
+    status, data, _ = asyncio.run(service.handle('POST', '/borrow', b'{not json'))
+    assert status == 400
+    status, data, _ = asyncio.run(service.handle('POST', '/borrow', b'[1, 2]'))
+    assert status == 400
+
+
+def raw_request(service, data):
+    """直接對標準函式庫的 HTTP 伺服器送原始位元組，回傳整個回應"""
+    async def send():
+        server = await asyncio.start_server(service._connection, '127.0.0.1', 0)
+        host, port = server.sockets[0].getsockname()[:2]
+        async with server:
+            reader, writer = await asyncio.open_connection(host, port)
+            writer.write(data)
+            await writer.drain()
+            response = await reader.read()
+            writer.close()
+        return response
+    return asyncio.run(send())
+
+
+@pytest.mark.parametrize('length, status', [(b'abc', 400), (b'-5', 400), (b'999999999', 413)])
+def test_bad_content_length(service, length, status):
+    response = raw_request(service, b'POST /borrow HTTP/1.1\r\nContent-Length: ' + length + b'\r\n\r\n')
+    assert response.startswith(b'HTTP/1.1 %d ' % status)